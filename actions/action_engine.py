@@ -0,0 +1,408 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from actions.action_registry import get_action, select_action
+from utils.logger import get_logger
+from utils.metrics import counter
+
+logger = get_logger(__name__)
+
+# -------------------------------
+# RULE EXTRACTION
+# -------------------------------
+
+DEPARTMENT_KEYWORDS = {
+    "IT": [
+        "vpn", "laptop", "computer", "password", "login", "log in", "locked out", "mfa",
+        "email", "outlook", "teams", "wifi", "wi-fi", "network", "internet", "printer",
+        "software", "install", "monitor", "keyboard", "mouse", "server", "database",
+        "access", "account", "sap", "salesforce", "shared drive",
+    ],
+    "HR": [
+        "leave", "holiday", "vacation", "benefits", "onboarding", "offboarding",
+        "parental", "recruit", "hiring", "contract", "hr",
+    ],
+    "Finance": [
+        "invoice", "expense", "reimburse", "reimbursement", "payroll", "salary",
+        "budget", "purchase order",
+    ],
+    "Facilities": [
+        "desk", "chair", "air con", "aircon", "heating", "lights", "meeting room",
+        "badge", "parking", "cleaning", "projector",
+    ],
+}
+
+_LOW_PRIORITY = re.compile(r"\b(low priority|low-priority|not urgent|no rush|whenever|minor)\b", re.IGNORECASE)
+_HIGH_PRIORITY = re.compile(
+    r"\b(high priority|high-priority|urgent|urgently|asap|critical|emergency|outage|is down|are down"
+    r"|blocked|cannot work|can't work)\b",
+    re.IGNORECASE,
+)
+
+_REQUEST_PREFIX = re.compile(
+    r"^\s*(please\s+)?((can|could) you\s+)?(please\s+)?"
+    r"(create|raise|open|log|file|submit|make)\s+(a\s+|an\s+)?"
+    r"((high|low|medium)[ -]priority\s+|(urgent|new|quick)\s+)?((it|support|hr|finance|facilities)\s+)?"
+    r"(ticket|issue|request|incident|case)\b(\s+(for|about|regarding|because))?\s*[:,-]?\s*",
+    re.IGNORECASE,
+)
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_MONTHS = [
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december",
+]
+
+_MONTH = r"(jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*"
+
+_PARTICIPANTS = re.compile(
+    r"\bwith\s+(.+?)(?=\s+(?:on|at|by|tomorrow|today|next|this|for|about|regarding|from|to discuss)\b|[.?!;]|$)",
+    re.IGNORECASE,
+)
+
+
+def extract_department(query: str):
+    """
+    Department with the most keyword hits; None when no keyword
+    matches or two departments tie.
+    """
+    text = query.lower()
+    scores = {}
+
+    for department, keywords in DEPARTMENT_KEYWORDS.items():
+        hits = sum(1 for k in keywords if re.search(rf"\b{re.escape(k)}\b", text))
+        if hits:
+            scores[department] = hits
+
+    if not scores:
+        return None
+
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+        return None
+
+    return ranked[0][0]
+
+
+def extract_priority(query: str):
+    if _LOW_PRIORITY.search(query):
+        return "Low"
+
+    if _HIGH_PRIORITY.search(query):
+        return "High"
+
+    if re.search(r"\bmedium[ -]priority\b", query, re.IGNORECASE):
+        return "Medium"
+
+    return None
+
+
+def extract_description(query: str) -> str:
+    description = _REQUEST_PREFIX.sub("", query.strip(), count=1).strip(" .")
+
+    if not description:
+        return query.strip()
+
+    return description[0].upper() + description[1:]
+
+
+def extract_date(query: str, today: date):
+    """
+    ISO dates, today/tomorrow, weekdays and "14 March" / "March 14th".
+    """
+    text = query.lower()
+
+    match = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", text)
+    if match:
+        return match.group(0)
+
+    if re.search(r"\bday after tomorrow\b", text):
+        return (today + timedelta(days=2)).isoformat()
+
+    if re.search(r"\btomorrow\b", text):
+        return (today + timedelta(days=1)).isoformat()
+
+    if re.search(r"\btoday\b", text):
+        return today.isoformat()
+
+    match = re.search(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+" + _MONTH + r"\b(?:,?\s+(\d{4}))?", text)
+    if match:
+        day, month, year = match.group(1), match.group(2), match.group(3)
+    else:
+        match = re.search(r"\b" + _MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?", text)
+        month, day, year = (match.group(1), match.group(2), match.group(3)) if match else (None, None, None)
+
+    if month:
+        month_number = next(i for i, m in enumerate(_MONTHS, 1) if m.startswith(month[:3]))
+        try:
+            found = date(int(year) if year else today.year, month_number, int(day))
+        except ValueError:
+            return None
+        if not year and found < today:
+            found = found.replace(year=today.year + 1)
+        return found.isoformat()
+
+    for index, weekday in enumerate(_WEEKDAYS):
+        if re.search(rf"\b{weekday}\b", text):
+            ahead = (index - today.weekday()) % 7 or 7
+            return (today + timedelta(days=ahead)).isoformat()
+
+    return None
+
+
+def extract_time(query: str):
+    """
+    "14:30", "3pm", "3:30 pm", "noon"; a bare "at 3" is read in
+    business hours (3 -> 15:00).
+    """
+    text = query.lower()
+
+    match = re.search(r"\b([01]?\d|2[0-3]):([0-5]\d)\s*(am|pm)?\b", text)
+    if match:
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    else:
+        match = re.search(r"\b(1[0-2]|0?[1-9])\s*(am|pm)\b", text)
+        if match:
+            hour, minute, meridiem = int(match.group(1)), 0, match.group(2)
+        elif re.search(r"\bnoon\b", text):
+            return "12:00"
+        else:
+            match = re.search(r"\bat\s+(\d{1,2})\b(?!\s*[-/:])", text)
+            if not match or int(match.group(1)) > 23:
+                return None
+            hour, minute, meridiem = int(match.group(1)), 0, None
+            if hour < 8:
+                hour += 12
+
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    if meridiem == "am" and hour == 12:
+        hour = 0
+
+    return f"{hour:02d}:{minute:02d}"
+
+
+def extract_participants(query: str):
+    match = _PARTICIPANTS.search(query)
+
+    if not match:
+        return None
+
+    names = re.split(r",|\band\b|&", match.group(1))
+    names = [re.sub(r"^(the|my|our)\s+", "", n.strip(), flags=re.IGNORECASE) for n in names]
+
+    return [n for n in names if n] or None
+
+
+def extract_fields(spec, query: str, today: date) -> dict:
+    """
+    Every field of `spec` the rules can read from the query.
+    """
+    extractors = {
+        "department": lambda: extract_department(query),
+        "priority": lambda: extract_priority(query),
+        "description": lambda: extract_description(query),
+        "date": lambda: extract_date(query, today),
+        "time": lambda: extract_time(query),
+        "participants": lambda: extract_participants(query),
+    }
+
+    fields = {}
+
+    for field in spec.fields:
+        if field in extractors:
+            value = extractors[field]()
+            if value is not None:
+                fields[field] = value
+
+    return fields
+
+
+# -------------------------------
+# CONSTRAINED LLM EXTRACTION
+# -------------------------------
+
+ACTION_PROMPT = """
+Extract the fields of a "{action}" request.
+
+Request:
+"{query}"
+
+Fields already known (keep them):
+{known}
+
+Return ONLY one JSON object with exactly these keys and value formats:
+{schema}
+
+Use null for anything the request does not state. Do not invent dates, times or people.
+"""
+
+# Older prompts answered with these keys
+_FIELD_ALIASES = {"issue_summary": "description", "summary": "description"}
+
+# The LLM writes better free text; rules win for structured fields
+_LLM_PREFERRED = {"description"}
+
+
+def parse_llm_fields(answer: str) -> dict:
+    match = re.search(r"\{.*\}", answer or "", re.DOTALL)
+
+    if not match:
+        return {}
+
+    try:
+        payload = json.loads(match.group(0))
+    except ValueError:
+        return {}
+
+    if not isinstance(payload, dict):
+        return {}
+
+    return {_FIELD_ALIASES.get(k, k): v for k, v in payload.items()}
+
+
+# -------------------------------
+# ENGINE
+# -------------------------------
+
+PATHS = ("rules", "llm", "fallback")
+
+EXTRACTIONS = counter("action_extractions_total", "Actions filled, by extraction path.", ("path",))
+
+
+class PathStats:
+    """Hit count and recent latencies of one extraction path."""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.latencies_ms = deque(maxlen=window)
+
+    def record(self, ms: float):
+        self.count += 1
+        self.latencies_ms.append(ms)
+
+
+class ActionEngine:
+    """
+    Fills an action from a request. Rules first; the LLM is asked
+    only for the fields rules could not read, with the schema in
+    the prompt, and its answer is validated against the schema.
+    """
+
+    def __init__(self, today=None):
+        self.today = today or date.today
+        self._lock = threading.Lock()
+        self.stats = {path: PathStats() for path in PATHS}
+
+    def prepare(self, query: str) -> dict:
+        """
+        {"response": ...} when rules fill every required field,
+        otherwise a pending extraction with the LLM prompt.
+        """
+        started = time.perf_counter()
+
+        spec = select_action(query)
+        rule_fields = extract_fields(spec, query, self.today())
+
+        clean, missing = spec.validate(rule_fields)
+
+        if not missing:
+            return {"response": self._result(spec, clean, "rules", started)}
+
+        known = {k: v for k, v in rule_fields.items() if k not in _LLM_PREFERRED}
+
+        prompt = ACTION_PROMPT.format(
+            action=spec.name,
+            query=query,
+            known=json.dumps(known) if known else "none",
+            schema=json.dumps({f: spec.schema[f] for f in spec.fields}, indent=2),
+        )
+
+        return {
+            "action": spec.name,
+            "query": query,
+            "rule_fields": rule_fields,
+            "prompt": prompt,
+            "started": started,
+        }
+
+    def complete(self, pending: dict, answer: str) -> dict:
+        """
+        Merge the LLM answer into the rule fields. Falls back to
+        defaults when the answer is missing or invalid.
+        """
+        spec = get_action(pending["action"])
+        rule_fields = pending["rule_fields"]
+
+        merged = parse_llm_fields(answer)
+
+        for field, value in rule_fields.items():
+            if field not in _LLM_PREFERRED or merged.get(field) in (None, ""):
+                merged[field] = value
+
+        clean, missing = spec.validate(merged)
+
+        if not missing:
+            return self._result(spec, clean, "llm", pending["started"])
+
+        return self._fallback(spec, pending["query"], clean, missing, pending["started"])
+
+    def run(self, query: str, generate) -> dict:
+        """
+        prepare + generate + complete, for callers without a plan.
+        """
+        pending = self.prepare(query)
+
+        if "response" in pending:
+            return pending["response"]
+
+        try:
+            answer = generate(pending["prompt"])
+        except Exception as e:
+            logger.warning("Action extraction failed", extra={"error": str(e)})
+            answer = ""
+
+        return self.complete(pending, answer)
+
+    def _fallback(self, spec, query, clean, missing, started):
+        # Tickets always go through with safe defaults
+        if spec.name == "create_ticket":
+            clean = {"department": "IT", "description": query, "priority": "Medium", **clean}
+            return self._result(spec, clean, "fallback", started)
+
+        result = self._result(spec, clean, "fallback", started)
+        result["missing"] = missing
+        return result
+
+    def _result(self, spec, fields, path, started):
+        with self._lock:
+            self.stats[path].record((time.perf_counter() - started) * 1000)
+
+        EXTRACTIONS.inc(path=path)
+
+        return {"type": "action", "action": spec.name, **fields}
+
+    def snapshot(self) -> dict:
+        """
+        Hit rate and latency per extraction path.
+        """
+        with self._lock:
+            total = sum(s.count for s in self.stats.values())
+            report = {}
+
+            for path, stats in self.stats.items():
+                latencies = sorted(stats.latencies_ms)
+                report[path] = {
+                    "count": stats.count,
+                    "hit_rate": round(stats.count / total, 3) if total else 0.0,
+                    "p50_ms": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                    "p95_ms": round(latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)], 3) if latencies else None,
+                }
+
+        return report
@@ -0,0 +1,127 @@
+import re
+from datetime import datetime
+
+from config.schemas import CREATE_TICKET_SCHEMA, SCHEDULE_MEETING_SCHEMA
+
+
+# -------------------------------
+# SCHEMA VALIDATION
+# -------------------------------
+# Schemas in config/schemas.py describe each field by example:
+#   "string"             any non-empty string
+#   "Low | Medium | High" one of the listed values
+#   ["string"]           non-empty list of strings
+#   "YYYY-MM-DD"         date
+#   "HH:MM"              24h time
+
+_FORMATS = {
+    "YYYY-MM-DD": "%Y-%m-%d",
+    "HH:MM": "%H:%M",
+}
+
+
+def validate_field(spec, value):
+    """
+    Normalized value, or None when it does not match the spec.
+    """
+    if isinstance(spec, list):
+        if not isinstance(value, list):
+            return None
+        items = [str(v).strip() for v in value if str(v).strip()]
+        return items or None
+
+    if value is None or not str(value).strip():
+        return None
+
+    value = str(value).strip()
+
+    if spec in _FORMATS:
+        try:
+            return datetime.strptime(value, _FORMATS[spec]).strftime(_FORMATS[spec])
+        except ValueError:
+            return None
+
+    if "|" in spec:
+        options = [o.strip() for o in spec.split("|")]
+        for option in options:
+            if option.lower() == value.lower():
+                return option
+        return None
+
+    return value
+
+
+class ActionSpec:
+    """
+    One action the engine can fill: its schema, which fields must be
+    present, defaults for the rest, and phrases that select it.
+    """
+
+    def __init__(self, schema: dict, required: list, defaults: dict = None, triggers: str = None):
+        self.name = schema["action"]
+        self.schema = schema
+        self.fields = [f for f in schema if f != "action"]
+        self.required = required
+        self.defaults = defaults or {}
+        self.triggers = re.compile(triggers, re.IGNORECASE) if triggers else None
+
+    def validate(self, payload: dict):
+        """
+        (clean fields, missing required field names). Defaults fill
+        optional fields; invalid values count as missing.
+        """
+        clean, missing = {}, []
+
+        for field in self.fields:
+            value = validate_field(self.schema[field], payload.get(field))
+
+            if value is None:
+                value = self.defaults.get(field)
+
+            if value is None:
+                if field in self.required:
+                    missing.append(field)
+                continue
+
+            clean[field] = value
+
+        return clean, missing
+
+    def matches(self, query: str) -> bool:
+        return bool(self.triggers and self.triggers.search(query))
+
+
+ACTION_REGISTRY = {}
+
+
+def register_action(spec: ActionSpec):
+    ACTION_REGISTRY[spec.name] = spec
+    return spec
+
+
+def get_action(name: str) -> ActionSpec:
+    return ACTION_REGISTRY.get(name)
+
+
+# Checked in registration order; the last one is the default
+register_action(ActionSpec(
+    SCHEDULE_MEETING_SCHEMA,
+    required=["participants", "date", "time"],
+    triggers=r"\b(schedule|book|set up|arrange|organi[sz]e)\b.*\b(meeting|call|sync|catch[- ]up|session)\b"
+             r"|\b(meeting|call|sync)\b.*\b(with)\b",
+))
+
+register_action(ActionSpec(
+    CREATE_TICKET_SCHEMA,
+    required=["department", "description"],
+    defaults={"priority": "Medium"},
+))
+
+DEFAULT_ACTION = CREATE_TICKET_SCHEMA["action"]
+
+
+def select_action(query: str) -> ActionSpec:
+    for spec in ACTION_REGISTRY.values():
+        if spec.matches(query):
+            return spec
+    return ACTION_REGISTRY[DEFAULT_ACTION]
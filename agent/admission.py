@@ -0,0 +1,268 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from agent.deadline import DeadlineExceeded
+from utils.metrics import counter, gauge, histogram
+
+# -------------------------------
+# ADMISSION CONTROL
+# -------------------------------
+# A fixed number of slots per stage ("cpu": embedding, retrieval,
+# rerank; "llm": generation calls; "ingest": PDF uploads, kept apart
+# so long ingestions cannot take the slots chats need). A request that finds
+# every slot taken waits in a bounded FIFO queue; when the queue is
+# full, or its wait times out, it is rejected with Overloaded (503 +
+# Retry-After) instead of piling more work onto a saturated CPU or
+# a rate-limited upstream. A request whose own deadline runs out
+# first gets DeadlineExceeded instead: retrying it would not help.
+# A freed slot is handed straight to the oldest waiter, thread or
+# coroutine.
+
+# 0 disables a limit
+CPU_CONCURRENCY = int(os.getenv("ADMISSION_CPU_CONCURRENCY", os.cpu_count() or 2))
+LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", "16"))
+
+# Waiting requests per stage before new ones are turned away
+QUEUE_DEPTH = int(os.getenv("ADMISSION_QUEUE_DEPTH", "32"))
+
+# Longest a request waits for a slot (less if its deadline is closer)
+QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "10"))
+
+# Uploads: held for a whole ingestion, so few of them and short queues
+INGEST_CONCURRENCY = int(os.getenv("ADMISSION_INGEST_CONCURRENCY", "1"))
+INGEST_QUEUE_DEPTH = int(os.getenv("ADMISSION_INGEST_QUEUE_DEPTH", "4"))
+INGEST_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_INGEST_QUEUE_TIMEOUT_S", "5"))
+
+WAIT_SECONDS = histogram("admission_wait_seconds", "Time spent waiting for an admission slot.", ("stage",))
+
+REJECTED = counter("admission_rejected_total", "Requests turned away by admission control.", ("stage", "reason"))
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot get a slot; maps to 503."""
+
+    def __init__(self, stage: str, reason: str, retry_after: int):
+        super().__init__(f"Overloaded: no {stage} slot ({reason})")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+        REJECTED.inc(stage=stage, reason=reason)
+
+
+class _Waiter:
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+class AdmissionLimit:
+    """
+    At most `limit` holders, at most `max_queue` waiters, each waiting
+    up to `timeout_s`.
+    """
+
+    def __init__(self, stage: str, limit: int, max_queue: int = None, timeout_s: float = None):
+        self.stage = stage
+        self.limit = limit
+        self.max_queue = QUEUE_DEPTH if max_queue is None else max_queue
+        self.timeout_s = QUEUE_TIMEOUT_S if timeout_s is None else timeout_s
+
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waiters = deque()
+
+        # Running estimate of how long a slot is held, for Retry-After
+        self._hold_s = None
+
+    # ---------- bookkeeping (under self._lock) ----------
+
+    def _try_take(self) -> bool:
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            return True
+        return False
+
+    def _enqueue(self, wake) -> _Waiter:
+        if len(self._waiters) >= self.max_queue:
+            raise self._overloaded("queue_full")
+
+        waiter = _Waiter(wake)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _give_up(self, waiter: _Waiter) -> bool:
+        """
+        True when the slot arrived after all; otherwise leave the queue.
+        """
+        if waiter.granted:
+            return True
+
+        self._waiters.remove(waiter)
+        return False
+
+    def _overloaded(self, reason: str) -> Overloaded:
+        hold = self._hold_s or 1.0
+        retry_after = math.ceil(hold * (len(self._waiters) + 1) / max(self.limit, 1))
+        return Overloaded(self.stage, reason, max(retry_after, 1))
+
+    def _timeout(self, timeout, deadline):
+        if deadline is not None:
+            timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+
+        return self.timeout_s if timeout is None else min(timeout, self.timeout_s)
+
+    def _check_deadline(self, deadline):
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"{self.stage}_admission", deadline)
+
+    # ---------- public API ----------
+
+    def release(self, held_s: float = None):
+        with self._lock:
+
+            if held_s is not None:
+                self._hold_s = held_s if self._hold_s is None else 0.8 * self._hold_s + 0.2 * held_s
+
+            if self._waiters:
+                # Hand the slot over; _in_use stays the same
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self._in_use -= 1
+
+    def acquire(self, timeout: float = None, deadline=None):
+        """
+        Take a slot, waiting at most `timeout` seconds and never past
+        `deadline` (a Deadline).
+        """
+        if self.limit <= 0:
+            return
+
+        self._check_deadline(deadline)
+
+        start = time.perf_counter()
+
+        with self._lock:
+            if self._try_take():
+                WAIT_SECONDS.observe(0.0, stage=self.stage)
+                return
+
+            event = threading.Event()
+            waiter = self._enqueue(event.set)
+
+        event.wait(self._timeout(timeout, deadline))
+
+        with self._lock:
+            if not self._give_up(waiter):
+                self._check_deadline(deadline)
+                raise self._overloaded("timeout")
+
+        WAIT_SECONDS.observe(time.perf_counter() - start, stage=self.stage)
+
+    async def aacquire(self, timeout: float = None, deadline=None):
+        """
+        acquire() for the event loop: waits without holding a thread.
+        """
+        if self.limit <= 0:
+            return
+
+        self._check_deadline(deadline)
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if self._try_take():
+                WAIT_SECONDS.observe(0.0, stage=self.stage)
+                return
+
+            granted = loop.create_future()
+            waiter = self._enqueue(
+                lambda: loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+            )
+
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), self._timeout(timeout, deadline))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away: give back a slot that already arrived
+            with self._lock:
+                got_slot = self._give_up(waiter)
+            if got_slot:
+                self.release()
+            raise
+
+        with self._lock:
+            if not self._give_up(waiter):
+                self._check_deadline(deadline)
+                raise self._overloaded("timeout")
+
+        WAIT_SECONDS.observe(time.perf_counter() - start, stage=self.stage)
+
+    @contextmanager
+    def slot(self, timeout: float = None, deadline=None):
+        self.acquire(timeout, deadline)
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            if self.limit > 0:
+                self.release(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def aslot(self, timeout: float = None, deadline=None):
+        await self.aacquire(timeout, deadline)
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            if self.limit > 0:
+                self.release(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_use": self._in_use,
+                "queued": len(self._waiters),
+                "max_queue": self.max_queue,
+            }
+
+
+CPU_LIMIT = AdmissionLimit("cpu", CPU_CONCURRENCY)
+
+LLM_LIMIT = AdmissionLimit("llm", LLM_CONCURRENCY)
+
+INGEST_LIMIT = AdmissionLimit("ingest", INGEST_CONCURRENCY, INGEST_QUEUE_DEPTH, INGEST_QUEUE_TIMEOUT_S)
+
+_limits = (CPU_LIMIT, LLM_LIMIT, INGEST_LIMIT)
+
+
+def admission_snapshots() -> dict:
+    return {limit.stage: limit.snapshot() for limit in _limits}
+
+
+gauge(
+    "admission_in_flight",
+    "Requests holding an admission slot.",
+    ("stage",),
+    function=lambda: {limit.stage: limit.snapshot()["in_use"] for limit in _limits},
+)
+
+gauge(
+    "admission_queued",
+    "Requests waiting for an admission slot.",
+    ("stage",),
+    function=lambda: {limit.stage: limit.snapshot()["queued"] for limit in _limits},
+)
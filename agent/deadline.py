@@ -0,0 +1,88 @@
+import os
+import time
+from contextlib import contextmanager
+
+from utils.logger import current_trace
+from utils.metrics import counter, histogram
+
+DEFAULT_DEADLINE_MS = int(os.getenv("CHAT_DEADLINE_MS", "60000"))
+
+MIN_DEADLINE_MS = 1000
+
+MAX_DEADLINE_MS = int(os.getenv("CHAT_DEADLINE_MAX_MS", "120000"))
+
+STAGE_SECONDS = histogram("chat_stage_seconds", "Time spent in each chat pipeline stage.", ("stage",))
+
+DEADLINE_EXCEEDED = counter("chat_deadline_exceeded_total", "Chat requests that ran out of time, by stage.", ("stage",))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget."""
+
+    def __init__(self, stage: str, deadline):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+        self.budget_ms = deadline.budget_ms
+        self.timings_ms = dict(deadline.timings_ms)
+
+        # Counted here so every raise site is covered
+        DEADLINE_EXCEEDED.inc(stage=stage)
+
+
+class Deadline:
+    """
+    Time budget for one chat request, carried through every stage.
+    Also records how long each stage took.
+    """
+
+    def __init__(self, budget_ms: int = None):
+        self.budget_ms = budget_ms or DEFAULT_DEADLINE_MS
+        self.expires_at = time.monotonic() + self.budget_ms / 1000
+        self.timings_ms = {}
+
+    @classmethod
+    def from_request(cls, requested_ms=None):
+        """
+        Default budget, or the client's override clamped to sane bounds.
+        """
+        try:
+            requested_ms = int(requested_ms) if requested_ms is not None else None
+        except (TypeError, ValueError):
+            requested_ms = None
+
+        if requested_ms is None:
+            return cls()
+
+        return cls(min(max(requested_ms, MIN_DEADLINE_MS), MAX_DEADLINE_MS))
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        if self.expired():
+            raise DeadlineExceeded(stage, self)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a stage (also into chat_stage_seconds and the request
+        trace), then fail if the budget ran out during it.
+        """
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.timings_ms[name] = round(seconds * 1000, 1)
+            STAGE_SECONDS.observe(seconds, stage=name)
+
+            trace = current_trace()
+            if trace is not None:
+                trace.add_span(name, start, seconds)
+
+        self.check(name)
@@ -1,4 +1,11 @@
+import json
+import os
+import threading
+
+import numpy as np
+
 from llm.response_generator import generate_text
+from retrieval.inference import run_inference
 
 INTENT_PROMPT = """
 You are an enterprise IT assistant.
@@ -13,10 +20,127 @@ User input:
 Return ONLY the category name.
 """
 
-def classify_intent(query: str) -> str:
+LABELS = ("ACTION", "INFORMATION")
+
+INTENT_EXAMPLES_PATH = os.getenv(
+    "INTENT_EXAMPLES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_examples.json")
+)
+
+# Below this confidence the LLM is asked (when INTENT_LLM_FALLBACK=1)
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+INTENT_LLM_FALLBACK = os.getenv("INTENT_LLM_FALLBACK", "0") == "1"
+
+# Softmax temperature over cosine similarities (bge scores are close together)
+SOFTMAX_TEMPERATURE = 0.02
+
+
+def classify_intent_llm(query: str) -> str:
+    """
+    Full LLM round trip. Only used as a fallback now.
+    """
     result = generate_text(INTENT_PROMPT.format(query=query), max_new_tokens=8).strip().upper()
 
-    if result not in ("ACTION", "INFORMATION"):
+    if result not in LABELS:
         return "INFORMATION"
 
     return result
+
+
+class EmbeddingIntentClassifier:
+    """
+    Nearest-prototype classifier over the query embedding the
+    retriever already computes. One prototype per label: the
+    normalized mean of its labelled examples.
+    """
+
+    def __init__(self, encoder=None, examples: dict = None):
+        self._encoder = encoder
+        self.examples = examples
+
+        self.labels = None
+        self.prototypes = None
+
+        self._lock = threading.Lock()
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            from retrieval.models import get_embedding_model
+            self._encoder = get_embedding_model()
+        return self._encoder
+
+    def fit(self):
+        """
+        Embed the labelled examples once (thread-safe, idempotent).
+        """
+        with self._lock:
+            if self.prototypes is not None:
+                return self
+
+            examples = self.examples
+
+            if examples is None:
+                with open(INTENT_EXAMPLES_PATH, "r", encoding="utf-8") as f:
+                    examples = json.load(f)
+
+            labels, prototypes = [], []
+
+            for label, texts in examples.items():
+                vectors = np.asarray(run_inference("intent", self.encoder.encode, texts, normalize_embeddings=True), dtype=np.float32)
+                centroid = vectors.mean(axis=0)
+
+                labels.append(label)
+                prototypes.append(centroid / (np.linalg.norm(centroid) or 1.0))
+
+            self.labels = labels
+            self.prototypes = np.stack(prototypes)
+
+        return self
+
+    def predict(self, query: str, query_vec=None):
+        """
+        (label, confidence) for one query. Pass query_vec to skip
+        encoding when the caller already has the embedding.
+        """
+        self.fit()
+
+        if query_vec is None:
+            query_vec = run_inference("embed", self.encoder.encode, [query], normalize_embeddings=True)
+
+        scores = self.prototypes @ np.asarray(query_vec, dtype=np.float32).reshape(-1)
+
+        weights = np.exp((scores - scores.max()) / SOFTMAX_TEMPERATURE)
+        probabilities = weights / weights.sum()
+
+        best = int(np.argmax(probabilities))
+
+        return self.labels[best], float(probabilities[best])
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> EmbeddingIntentClassifier:
+    global _classifier
+
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = EmbeddingIntentClassifier()
+        return _classifier
+
+
+def classify_intent(query: str, query_vec=None) -> str:
+    """
+    ACTION or INFORMATION. Local and ~1 ms when the query embedding
+    is passed in; the LLM is only consulted for low-confidence
+    queries, and only when INTENT_LLM_FALLBACK=1.
+    """
+    label, confidence = get_intent_classifier().predict(query, query_vec=query_vec)
+
+    if confidence < CONFIDENCE_THRESHOLD and INTENT_LLM_FALLBACK:
+        return classify_intent_llm(query)
+
+    return label
@@ -3,6 +3,20 @@
 # Optimized for small models like Llama-3.2-1B
 # ============================================================
 
+import os
+
+from utils.tokens import count_tokens
+
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+PROMPT_MAX_EVIDENCE = int(os.getenv("PROMPT_MAX_EVIDENCE", "2"))
+
+# Tables smaller than this after truncation are dropped instead
+MIN_TABLE_TOKENS = int(os.getenv("PROMPT_MIN_TABLE_TOKENS", "48"))
+
+TRUNCATION_MARKER = "[...truncated]"
+
 
 def build_prompt(question: str, section_text: str, tables: list, page: str):
 
@@ -116,3 +130,182 @@ Never answer from outside knowledge.
 
 
     return prompt.strip()
+
+
+
+# ============================================================
+# TOKEN BUDGETING
+# ============================================================
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Longest line-aligned prefix of text within max_tokens
+    (including the truncation marker). Empty string if nothing fits.
+    """
+
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+
+    if budget <= 0:
+        return ""
+
+    lines = text.splitlines()
+
+    # Binary search on the number of whole lines that fit
+    low, high = 0, len(lines)
+
+    while low < high:
+
+        mid = (low + high + 1) // 2
+
+        if count_tokens("\n".join(lines[:mid])) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+
+    if low > 0:
+        return "\n".join(lines[:low]) + "\n" + TRUNCATION_MARKER
+
+    # Not even one line fits: cut the first line by words
+    words = lines[0].split(" ")
+
+    low, high = 0, len(words)
+
+    while low < high:
+
+        mid = (low + high + 1) // 2
+
+        if count_tokens(" ".join(words[:mid])) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+
+    if low == 0:
+        return ""
+
+    return " ".join(words[:low]) + " " + TRUNCATION_MARKER
+
+
+# ============================================================
+# TOKEN-BUDGETED PROMPT ASSEMBLY
+# ============================================================
+
+def assemble_prompt(question: str, evidence: list, tables: list, budget: int = None):
+    """
+    Build the RAG prompt within a token budget.
+
+    evidence: list of {"text", "pages", "score"} (rerank score)
+    tables:   list of table texts, most relevant first
+
+    Evidence is added best-score first; the top item is truncated
+    rather than dropped. Tables fill what is left and are truncated
+    or dropped once the budget runs out.
+
+    Returns (prompt, report) where report carries token counts.
+    """
+
+    budget = budget or PROMPT_TOKEN_BUDGET
+
+    ranked = sorted(
+        evidence,
+        key=lambda e: e.get("score") if e.get("score") is not None else float("-inf"),
+        reverse=True,
+    )[:PROMPT_MAX_EVIDENCE]
+
+    remaining = budget - count_tokens(build_prompt(question, "", [], "Unknown"))
+
+    report = {
+        "budget": budget,
+        "evidence_used": 0,
+        "evidence_truncated": 0,
+        "evidence_dropped": max(len(evidence) - len(ranked), 0),
+        "tables_used": 0,
+        "tables_truncated": 0,
+        "tables_dropped": 0,
+    }
+
+    separator = "\n\n---\n\n"
+    separator_tokens = count_tokens(separator)
+
+    context_parts = []
+
+    for item in ranked:
+
+        pages = item.get("pages", [])
+
+        page_str = ", ".join(str(p) for p in pages) if pages else "Unknown"
+
+        text = (item.get("text") or "").strip()
+
+        if not text:
+            continue
+
+        block = f"[Source: Page {page_str}]\n{text}"
+
+        cost = count_tokens(block) + (separator_tokens if context_parts else 0)
+
+        if cost <= remaining:
+
+            context_parts.append(block)
+            remaining -= cost
+            report["evidence_used"] += 1
+
+        elif not context_parts:
+
+            # Never send a prompt without evidence: truncate the best chunk
+            block = truncate_to_tokens(block, remaining)
+
+            if block:
+                context_parts.append(block)
+                remaining -= count_tokens(block)
+                report["evidence_used"] += 1
+                report["evidence_truncated"] += 1
+
+        else:
+
+            report["evidence_dropped"] += 1
+
+    kept_tables = []
+
+    # Header added by build_prompt once any table is present
+    table_overhead = count_tokens("TABLE EVIDENCE:") if tables else 0
+    remaining -= table_overhead
+
+    for i, table in enumerate(tables, 1):
+
+        cost = count_tokens(f"Table {i}:\n{table}")
+
+        if cost <= remaining:
+
+            kept_tables.append(table)
+            remaining -= cost
+            report["tables_used"] += 1
+
+        elif remaining >= MIN_TABLE_TOKENS:
+
+            truncated = truncate_to_tokens(table, remaining - count_tokens(f"Table {i}:"))
+
+            if truncated and count_tokens(truncated) >= MIN_TABLE_TOKENS:
+                kept_tables.append(truncated)
+                remaining -= count_tokens(f"Table {i}:\n{truncated}")
+                report["tables_used"] += 1
+                report["tables_truncated"] += 1
+            else:
+                report["tables_dropped"] += 1
+
+        else:
+
+            report["tables_dropped"] += 1
+
+    prompt = build_prompt(
+        question=question,
+        section_text=separator.join(context_parts),
+        tables=kept_tables,
+        page="Unknown",
+    )
+
+    report["prompt_tokens"] = count_tokens(prompt)
+
+    return prompt, report
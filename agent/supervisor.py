@@ -1,24 +1,70 @@
-﻿import os
-
-from agent.prompt_builder import build_prompt
+﻿import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.admission import CPU_LIMIT, LLM_LIMIT
+from agent.deadline import Deadline, DeadlineExceeded
+from agent.intent_classifier import classify_intent as classify_intent_local, get_intent_classifier
+from actions.action_engine import ActionEngine
+from agent.prompt_builder import PROMPT_MAX_EVIDENCE, assemble_prompt
 from agent.refusal import refusal_response
 
-from llm.hf_inference_client import HFInferenceClient, HFGenerationError
+from llm.backends import LLMDeadlineError, LLMError, create_backend
 
 from retrieval.retriever import Retriever
 from retrieval.reranker import Reranker
 from retrieval.context_builder import build_context
+from retrieval.compressor import CONTEXT_COMPRESSION, compress_context
+from retrieval.inference import run_inference
+from retrieval.models import get_embedding_model
+from retrieval.document_store import DocumentSnapshot, DocumentStore
+
+from ingestion.chunker import load_embedding_tokenizer
+
+from utils.logger import current_trace, get_logger
+from utils.tokens import load_generation_tokenizer
+from utils.metrics import counter, histogram
 
 
 # =====================================================
-# TEST COMPATIBILITY STUB
+# INTENT ROUTING
 # =====================================================
-# Required because pytest expects this symbol.
-# We force INFORMATION always (pure RAG mode).
+# pytest expects this symbol. Pure RAG mode (the default)
+# forces INFORMATION; INTENT_ROUTING=1 classifies locally
+# from the query embedding (no LLM round trip).
 # =====================================================
 
-def classify_intent(_query: str) -> str:
-    return "INFORMATION"
+logger = get_logger(__name__)
+
+INTENT_ROUTING = os.getenv("INTENT_ROUTING", "0") == "1"
+
+
+def classify_intent(query: str, query_vec=None) -> str:
+
+    if not INTENT_ROUTING:
+        return "INFORMATION"
+
+    return classify_intent_local(query, query_vec=query_vec)
+
+
+# Bounded pool for the CPU stages of ahandle(); threads start lazily
+CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CPU_EXECUTOR_WORKERS", os.cpu_count() or 2)),
+    thread_name_prefix="cpu-stage",
+)
+
+# Share of the remaining budget the reranker may use; the rest is
+# kept for generation
+RERANK_BUDGET_FRACTION = float(os.getenv("RERANK_BUDGET_FRACTION", "0.3"))
+
+
+# Per-stage timings come from Deadline.stage (chat_stage_seconds)
+REQUEST_SECONDS = histogram("chat_request_seconds", "End-to-end time of AgentSupervisor.handle/ahandle.")
+
+REFUSALS = counter("chat_refusals_total", "Chats answered with the refusal message, by reason.", ("reason",))
 
 
 
@@ -26,64 +72,218 @@ class AgentSupervisor:
 
     def __init__(self):
 
-        print("🤖 Initializing Agent Supervisor...")
+        logger.info("Initializing agent supervisor")
+
+        # Active DocumentSnapshot (None before the first upload).
+        # Replaced, never modified: readers take no lock.
+        self.document = None
+
+        # Multi-worker mode: the active document lives on disk so
+        # every worker serves the latest upload, not just its own
+        store_dir = os.getenv("DOCUMENT_STORE_DIR")
 
-        self.retriever = None
-        self.tables_raw = []
-        self.doc_loaded = False
+        self.document_store = DocumentStore(store_dir) if store_dir else None
+
+        # Serializes writers (uploads, store syncs), not readers
+        self._sync_lock = threading.Lock()
 
         self.reranker = Reranker()
 
-        self.hf_client = HFInferenceClient(
+        self.action_engine = ActionEngine()
+
+        # LLM_BACKEND: HF router (one or more models, hedged and
+        # failed over in order of health) or a local Ollama server
+        self.hf_client = create_backend(
             api_token=os.getenv("HF_TOKEN", ""),
-            generation_model=os.getenv(
-                "HF_GENERATION_MODEL",
-                "meta-llama/Llama-3.2-1B-Instruct:novita"
-            ),
             timeout=120,
         )
 
 
+    def warm_up(self, run_models: bool = True):
+        """
+        Load (and run once) every model the upload/chat paths need,
+        so the first real request does not pay for it.
+        Returns seconds spent per step.
+        """
+
+        steps = [
+            # On the inference threads, so their torch settings apply
+            ("embedding_model", lambda: run_inference("embed", get_embedding_model().encode, ["warm-up"])),
+            ("reranker", lambda: run_inference("rerank", self.reranker.model.predict, [["warm-up", "warm-up"]])),
+            ("embedding_tokenizer", load_embedding_tokenizer),
+            ("generation_tokenizer", load_generation_tokenizer),
+            ("llm_backend", self._warm_up_llm),
+        ]
+
+        if INTENT_ROUTING and run_models:
+            steps.append(("intent_classifier", get_intent_classifier().fit))
+
+        if not run_models:
+            # Pre-fork: load weights only. Running torch before fork can
+            # leave the children with a dead OpenMP thread pool.
+            steps[0] = ("embedding_model", get_embedding_model)
+            steps[1] = ("reranker", lambda: self.reranker.model)
+
+        timings = {}
+
+        for name, step in steps:
+
+            start = time.perf_counter()
+
+            step()
+
+            timings[name] = round(time.perf_counter() - start, 3)
+
+        return timings
+
+
+    def _warm_up_llm(self):
+
+        # A backend that is down at start must not keep the app unready
+        # for good: chats still go through the breaker and failover
+        try:
+            self.hf_client.warm_up()
+        except LLMError as e:
+            logger.warning("LLM warm-up failed, serving without it", extra={"error": str(e)})
+
+
     def set_active_document(self, index, metadata, tables_raw):
 
-        self.retriever = Retriever(
+        snapshot = self._snapshot(index, metadata, tables_raw)
+
+        with self._sync_lock:
+
+            if self.document_store is not None:
+                snapshot.version = self.document_store.publish(index, metadata, tables_raw)
+
+            # One reference assignment: requests see the old document
+            # or the new one, never a mix
+            self.document = snapshot
+
+
+    def _snapshot(self, index, metadata, tables_raw, version=None):
+
+        retriever = Retriever(
             index_object=index,
             metadata_object=metadata,
             initial_top_k=25
         )
 
-        self.tables_raw = tables_raw or []
+        return DocumentSnapshot(retriever, tables_raw, version)
+
+
+    def _sync_document(self):
+        """
+        Pick up a document another worker published. One small file
+        read per request; the index is only reloaded when it changed.
+        """
+
+        if self.document_store is None:
+            return
 
-        self.doc_loaded = True
+        version = self.document_store.active_version()
+
+        if version is None or version == self.document_version:
+            return
+
+        with self._sync_lock:
+
+            # Re-read: an upload in this worker may have published a
+            # newer version while we waited for the lock
+            version = self.document_store.active_version()
+
+            if version == self.document_version:
+                return
+
+            index, metadata, tables_raw = self.document_store.load(version)
+
+            self.document = self._snapshot(index, metadata, tables_raw, version)
+
+
+    def current_document(self):
+        """
+        The DocumentSnapshot a request should use from start to
+        finish, or None before the first upload.
+        """
+
+        self._sync_document()
+
+        return self.document
+
+
+    # Read-only views of the current snapshot
+
+    @property
+    def retriever(self):
+        document = self.document
+        return document.retriever if document is not None else None
+
+    @property
+    def tables_raw(self):
+        document = self.document
+        return document.tables_raw if document is not None else []
+
+    @property
+    def doc_loaded(self):
+        return self.document is not None
+
+    @property
+    def document_version(self):
+        document = self.document
+        return document.version if document is not None else None
+
+
+    def _encode_query(self, query):
+
+        retriever = self.retriever
+
+        if retriever is not None:
+            return retriever.encode_query(query)
+
+        return run_inference("embed", get_embedding_model().encode, [query], normalize_embeddings=True)
 
 
     def has_active_document(self):
 
-        return self.doc_loaded and self.retriever is not None
+        return self.current_document() is not None
 
 
-    def _load_tables(self, table_ids):
+    def _load_tables(self, table_ids, document=None):
+        """
+        Table texts for the given ids. When table_ids is a list the
+        result follows its order (most relevant first).
+        """
 
-        if not table_ids:
+        document = document or self.document
+
+        if not table_ids or document is None:
             return []
 
+        if isinstance(table_ids, list):
+            tables = [document.tables_by_id.get(table_id) for table_id in table_ids]
+        else:
+            tables = [table for table in document.tables_raw if table.get("id") in table_ids]
+
         loaded_tables = []
 
-        for table in self.tables_raw:
+        for table in tables:
 
-            if table.get("id") not in table_ids:
+            if table is None:
                 continue
 
-            if table.get("table_type") == "structured":
+            # Compact rendering precomputed at ingestion
+            if table.get("table_prompt"):
+
+                loaded_tables.append(table["table_prompt"])
 
-                html = table.get("table_html")
+            elif table.get("table_type") == "structured":
 
-                if html:
-                    loaded_tables.append(html)
+                if table.get("table_html"):
+                    loaded_tables.append(table["table_html"])
 
             elif table.get("raw_text"):
 
-                loaded_tables.append(table.get("raw_text"))
+                loaded_tables.append(table["raw_text"])
 
         return loaded_tables
 
@@ -91,59 +291,146 @@ class AgentSupervisor:
     # =====================================================
     # PURE RAG HANDLER
     # =====================================================
+    # handle() and ahandle() run the same three stages:
+    #   _prepare -> CPU-bound (intent, retrieval, rerank, prompt)
+    #   LLM call -> blocking (handle) or awaited (ahandle)
+    #   _finish  -> answer post-processing
+    #
+    # Every stage runs against one Deadline. Running out of
+    # time raises DeadlineExceeded with the per-stage timings.
+    #
+    # The CPU stages and the LLM call each need an admission
+    # slot (agent/admission.py); a request that cannot get one
+    # in time raises Overloaded, or DeadlineExceeded when its
+    # own budget ran out first.
+    # =====================================================
 
-    def handle(self, query: str):
+    @REQUEST_SECONDS.timed()
+    def handle(self, query: str, deadline: Deadline = None):
 
-        # =====================================================
-        # INTENT CHECK (for pytest compatibility)
-        # =====================================================
+        deadline = deadline or Deadline()
 
-        intent = classify_intent(query)
+        with CPU_LIMIT.slot(deadline=deadline):
 
+            plan = self._prepare(query, deadline)
 
-        # =====================================================
-        # ACTION FLOW (used only if explicitly requested)
-        # =====================================================
+        if "response" in plan:
+            return plan["response"]
 
-        if intent == "ACTION":
+        try:
 
-            try:
+            with LLM_LIMIT.slot(deadline=deadline), deadline.stage("generation"):
 
-                raw_output = self.hf_client.generate(query)
+                answer = self.hf_client.generate(
+                    plan["prompt"],
+                    deadline=deadline.expires_at
+                )
 
-            except HFGenerationError:
+        except LLMDeadlineError:
 
-                return {
-                    "type": "action",
-                    "answer": "Model temporarily unavailable."
-                }
+            raise DeadlineExceeded("generation", deadline)
 
-            import json
+        except LLMError:
 
-            try:
+            return self._unavailable(plan)
 
-                extracted = json.loads(raw_output)
+        return self._finish(plan, answer)
 
-            except Exception:
 
-                extracted = {
-                    "department": "IT",
-                    "issue_summary": query,
-                    "priority": "Medium"
-                }
+    @REQUEST_SECONDS.timed()
+    async def ahandle(self, query: str, deadline: Deadline = None):
+        """
+        Non-blocking variant of handle(): CPU stages run on a bounded
+        executor and the LLM call is awaited, so one event loop can
+        hold many pending generations.
+        """
 
-            return {
+        deadline = deadline or Deadline()
 
-                "type": "action",
+        loop = asyncio.get_running_loop()
+
+        # Executor threads do not inherit the request id / trace
+        context = contextvars.copy_context()
+
+        # Waiting for a slot happens on the loop, not in an executor thread
+        async with CPU_LIMIT.aslot(deadline=deadline):
+
+            plan = await loop.run_in_executor(CPU_EXECUTOR, context.run, self._prepare, query, deadline)
+
+        if "response" in plan:
+            return plan["response"]
+
+        try:
 
-                "action": "create_ticket",
+            async with LLM_LIMIT.aslot(deadline=deadline):
 
-                "department": extracted.get("department", "IT"),
+                with deadline.stage("generation"):
 
-                "description": extracted.get("issue_summary", query),
+                    answer = await self.hf_client.agenerate(
+                        plan["prompt"],
+                        deadline=deadline.expires_at
+                    )
 
-                "priority": extracted.get("priority", "Medium")
+        except LLMDeadlineError:
 
+            raise DeadlineExceeded("generation", deadline)
+
+        except LLMError:
+
+            return self._unavailable(plan)
+
+        return self._finish(plan, answer)
+
+
+    def _prepare(self, query: str, deadline: Deadline):
+        """
+        Everything before the LLM call. Returns either
+        {"response": ...} (answered without the LLM) or a plan
+        with the prompt to generate from.
+        """
+
+        started = time.perf_counter()
+
+        # =====================================================
+        # INTENT CHECK (for pytest compatibility)
+        # =====================================================
+
+        # Routing reuses the retrieval embedding of the query
+        query_vec = None
+
+        if INTENT_ROUTING:
+
+            with deadline.stage("embed_query"):
+
+                query_vec = self._encode_query(query)
+
+
+        with deadline.stage("intent"):
+
+            intent = classify_intent(query, query_vec=query_vec)
+
+
+        # =====================================================
+        # ACTION FLOW (used only if explicitly requested)
+        # =====================================================
+
+        if intent == "ACTION":
+
+            # Rules fill most requests without the LLM
+            with deadline.stage("action_rules"):
+
+                pending = self.action_engine.prepare(query)
+
+            if "response" in pending:
+                return {"response": pending["response"]}
+
+            return {
+                "type": "action",
+                "query": query,
+                "prompt": pending["prompt"],
+                "action": pending,
+                "deadline": deadline,
+                "started": started,
             }
 
 
@@ -151,130 +438,190 @@ class AgentSupervisor:
         # INFORMATION FLOW (PURE RAG)
         # =====================================================
 
-        if not self.has_active_document():
+        # Read once: an upload during this request does not change
+        # the document it answers from
+        document = self.current_document()
 
-            return {
+        if document is None:
+
+            return {"response": {
                 "type": "information",
                 "answer": "Please upload a PDF first."
-            }
+            }}
+
+
+        if query_vec is None:
+
+            with deadline.stage("embed_query"):
+
+                query_vec = document.retriever.encode_query(query)
 
 
-        candidates = self.retriever.retrieve(query)
+        with deadline.stage("retrieval"):
+
+            candidates = document.retriever.retrieve(
+                query,
+                query_vec=query_vec,
+                deadline=deadline
+            )
 
         if not candidates:
 
-            return {
-                "type": "information",
-                "answer": refusal_response()
-            }
+            return {"response": self._refusal("no_candidates")}
 
 
-        ranked_results = self.reranker.rerank(
-            query,
-            candidates,
-            top_k=7
-        )
+        # Fewer candidates when time is short
+        with deadline.stage("rerank"):
+
+            ranked_results = self.reranker.rerank(
+                query,
+                candidates,
+                top_k=7,
+                time_budget=deadline.remaining() * RERANK_BUDGET_FRACTION
+            )
 
 
         if not ranked_results:
 
-            return {
-                "type": "information",
-                "answer": refusal_response()
-            }
+            return {"response": self._refusal("no_ranked")}
+
 
+        with deadline.stage("context"):
 
-        context_payload = build_context(ranked_results)
+            context_payload = build_context(ranked_results)
 
         context_items = context_payload.get("context", [])
 
         if not context_items:
 
-            return {
-                "type": "information",
-                "answer": refusal_response()
-            }
+            return {"response": self._refusal("empty_context")}
+
 
+        top_matches = context_items[:PROMPT_MAX_EVIDENCE]
 
-        top_matches = context_items[:2]
 
+        # Optional: keep only the query-relevant sentences
+        compression_stats = None
 
-        context_parts = []
+        if CONTEXT_COMPRESSION:
+
+            with deadline.stage("compression"):
+
+                top_matches, compression_stats = compress_context(
+                    top_matches,
+                    query_vec,
+                    document.retriever.model,
+                )
+
+
+        # Tables of the best-ranked chunk come first so the
+        # token budget drops the least relevant ones
+        table_ids = []
 
         for chunk in top_matches:
 
-            pages = chunk.get("pages", [])
+            for table_id in chunk.get("tables", []):
 
-            page_str = ", ".join(str(p) for p in pages) if pages else "Unknown"
+                if table_id not in table_ids:
+                    table_ids.append(table_id)
 
-            text = chunk.get("text", "").strip()
 
-            if text:
+        with deadline.stage("prompt"):
 
-                context_parts.append(
-                    f"[Source: Page {page_str}]\n{text}"
-                )
+            raw_tables = self._load_tables(table_ids, document)
 
+            prompt, prompt_report = assemble_prompt(
 
-        merged_text = "\n\n---\n\n".join(context_parts)
+                question=query,
 
+                evidence=top_matches,
 
-        table_ids = set()
+                tables=raw_tables,
 
-        for chunk in top_matches:
+            )
 
-            table_ids.update(chunk.get("tables", []))
+        logger.debug("Prompt assembled", extra={
+            "prompt_tokens": prompt_report["prompt_tokens"],
+            "prompt_budget": prompt_report["budget"],
+        })
 
+        trace = current_trace()
 
-        raw_tables = self._load_tables(table_ids)
+        if trace is not None:
+            trace.add_event("prompt", {
+                "tokens": prompt_report["prompt_tokens"],
+                "budget": prompt_report["budget"],
+                "evidence": [chunk.get("chunk_id") for chunk in top_matches],
+                "tables": table_ids,
+            })
 
 
-        prompt = build_prompt(
+        return {
+            "type": "information",
+            "query": query,
+            "prompt": prompt,
+            "prompt_report": prompt_report,
+            "compression_stats": compression_stats,
+            "deadline": deadline,
+            "started": started,
+        }
 
-            question=query,
 
-            section_text=merged_text,
+    def _refusal(self, reason):
 
-            tables=raw_tables,
+        REFUSALS.inc(reason=reason)
 
-            page="Unknown",
+        logger.info("Refused", extra={"reason": reason})
 
-        )
+        return {
+            "type": "information",
+            "answer": refusal_response()
+        }
 
 
-        try:
+    def _unavailable(self, plan):
 
-            answer = self.hf_client.generate(prompt)
+        # Actions still go through with what the rules found
+        if plan["type"] == "action":
+            return self.action_engine.complete(plan["action"], "")
 
-        except HFGenerationError:
+        return {
+            "type": plan["type"],
+            "answer": "Model temporarily unavailable."
+        }
 
-            return {
-                "type": "information",
-                "answer": "Model temporarily unavailable."
-            }
+
+    def _finish(self, plan, answer):
+
+        if plan["type"] == "action":
+
+            return self.action_engine.complete(plan["action"], answer)
 
 
         if not answer:
 
-            return {
-                "type": "information",
-                "answer": refusal_response()
-            }
+            return self._refusal("empty_answer")
 
 
         if answer.strip() == "Information not found in the document.":
 
-            return {
-                "type": "information",
-                "answer": refusal_response()
-            }
+            return self._refusal("not_found")
+
 
+        prompt_report = plan["prompt_report"]
 
         return {
 
             "type": "information",
 
-            "answer": answer.strip()
+            "answer": answer.strip(),
 
-        }
+            "usage": {
+                "prompt_tokens": prompt_report["prompt_tokens"],
+                "prompt_budget": prompt_report["budget"],
+                "compression": plan["compression_stats"],
+                "latency_ms": round((time.perf_counter() - plan["started"]) * 1000, 1),
+                "timings_ms": plan["deadline"].timings_ms,
+            }
 
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from agent.admission import Overloaded
+from agent.deadline import Deadline, DeadlineExceeded
+from utils.logger import get_logger, request_context
+from utils.profiler import finish_profile
+from web_app import (
+    agent,
+    app as flask_app,
+    check_chat_request,
+    deadline_exceeded_body,
+    incoming_request_id,
+    invalid_body_response,
+    overloaded_response,
+    profile_request,
+)
+
+logger = get_logger(__name__)
+
+# =========================================================
+# ASGI ENTRYPOINT
+# =========================================================
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 7860
+#
+# Chat routes are served natively on the event loop through
+# AgentSupervisor.ahandle, so a pending LLM call holds no thread.
+# Every other route (upload, health, readiness) falls through to
+# the Flask app.
+# =========================================================
+
+CHAT_PATHS = ("/api/v1/chat", "/chat")
+
+MAX_CHAT_BODY = 1024 * 1024
+
+_flask = WsgiToAsgi(flask_app)
+
+
+async def _read_body(receive):
+
+    chunks = []
+    size = 0
+
+    while True:
+
+        message = await receive()
+
+        chunk = message.get("body", b"")
+        size += len(chunk)
+
+        if size > MAX_CHAT_BODY:
+            return None
+
+        chunks.append(chunk)
+
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_json(send, body, status, extra_headers=None):
+
+    payload = json.dumps(body).encode("utf-8")
+
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(payload)).encode("ascii")),
+    ]
+
+    for name, value in (extra_headers or {}).items():
+        headers.append((name.lower().encode("ascii"), str(value).encode("latin-1")))
+
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": headers,
+    })
+
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _chat(scope, receive, send):
+
+    started = time.perf_counter()
+
+    headers = dict(scope.get("headers") or [])
+
+    request_id = incoming_request_id(headers.get(b"x-request-id", b"").decode("latin-1"))
+
+    query_args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+
+    with request_context(request_id):
+
+        # Every thread is sampled: the work spans the loop and the CPU executor
+        profiler, response_headers, rejection = profile_request(
+            headers.get(b"x-profile") == b"1" or query_args.get("profile") == ["1"],
+            headers.get(b"x-admin-token", b"").decode("latin-1"),
+            f"{request_id}_chat",
+        )
+
+        response_headers["X-Request-ID"] = request_id
+
+        # Reported if _handle_chat raises before answering
+        status = 500
+
+        try:
+
+            if rejection:
+
+                body, status = rejection
+
+                await _send_json(send, body, status, response_headers)
+
+            else:
+
+                try:
+                    status = await _handle_chat(scope, receive, send, response_headers)
+                finally:
+                    if profiler is not None:
+                        await asyncio.to_thread(finish_profile, profiler)
+
+        finally:
+
+            logger.info("Request served", extra={
+                "method": "POST",
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+
+async def _handle_chat(scope, receive, send, response_headers):
+    """
+    Answer one chat request; returns the HTTP status sent.
+    """
+
+    async def respond(body, status, headers=None):
+        await _send_json(send, body, status, {**response_headers, **(headers or {})})
+        return status
+
+    raw = await _read_body(receive)
+
+    if raw is None:
+
+        return await respond({
+            "success": False,
+            "error": {
+                "code": "FILE_TOO_LARGE",
+                "message": "Request body too large."
+            }
+        }, 413)
+
+    try:
+        data = json.loads(raw or b"{}") or {}
+    except ValueError:
+        data = {}
+
+    if not isinstance(data, dict):
+
+        return await respond(*invalid_body_response())
+
+    deadline = Deadline.from_request(data.get("deadline_ms"))
+
+    # May load a newly published document from the store (FAISS read,
+    # metadata JSON): off the event loop
+    query, rejection = await asyncio.to_thread(
+        check_chat_request, data, scope["path"] == "/chat"
+    )
+
+    if rejection:
+        body, status = rejection
+        return await respond(body, status)
+
+    try:
+
+        # debug: true returns the trace (spans, scores, timings)
+        with request_context(debug=bool(data.get("debug"))) as trace:
+
+            response = await agent.ahandle(query, deadline=deadline)
+
+    except DeadlineExceeded as e:
+
+        return await respond(deadline_exceeded_body(e), 504)
+
+    except Overloaded as e:
+
+        body, headers = overloaded_response(e)
+
+        return await respond(body, 503, headers)
+
+    except Exception:
+
+        logger.exception("Unhandled error")
+
+        return await respond({
+            "success": False,
+            "error": {
+                "code": "INTERNAL_ERROR",
+                "message": "Internal server error"
+            }
+        }, 500)
+
+    if trace is not None:
+        response = {**response, "debug": trace.to_dict()}
+
+    return await respond({"success": True, "data": response}, 200)
+
+
+async def _lifespan(receive, send):
+
+    # Models warm in web_app's background thread; nothing to do here
+    while True:
+
+        message = await receive()
+
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+
+    if (
+        scope["type"] == "http"
+        and scope["path"] in CHAT_PATHS
+        and scope["method"] == "POST"
+    ):
+        return await _chat(scope, receive, send)
+
+    return await _flask(scope, receive, send)
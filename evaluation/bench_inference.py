@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from retrieval.inference import InferenceExecutor, parse_cpu_list
+
+# ---------------- CONFIG ----------------
+CORES = os.cpu_count() or 1
+
+# "inline" = every request thread runs torch itself (INFERENCE_THREADS=0);
+# "TxI" = T inference threads with I torch threads each
+DEFAULT_LAYOUTS = ",".join(dict.fromkeys(
+    ["inline", f"1x{CORES}", f"2x{max(CORES // 2, 1)}", f"{CORES}x1"]
+))
+
+# Concurrent request threads feeding the executor
+DEFAULT_CLIENTS = 16
+
+DEFAULT_DURATION_S = 10
+
+# Same shape as a chat: one query embedding, then 25 pairs reranked
+RERANK_PAIRS = 25
+
+QUERY = "What was the operating margin in the last quarter?"
+PASSAGE = "Operating margin improved to 21.3 percent on pricing and utilisation gains. " * 4
+# ----------------------------------------
+
+
+class SyntheticModel:
+    """
+    Offline stand-in with MiniLM-like compute: a 6-layer transformer
+    encoder (384 wide) over `seq_len` random token embeddings per text.
+    Exercises torch intra-op threading the way the real models do.
+    """
+
+    def __init__(self, seq_len: int = 64, width: int = 384, layers: int = 6):
+        import torch
+
+        layer = torch.nn.TransformerEncoderLayer(width, nhead=6, dim_feedforward=4 * width, batch_first=True)
+        self.model = torch.nn.TransformerEncoder(layer, num_layers=layers).eval()
+        self.seq_len = seq_len
+        self.width = width
+
+    def _run(self, batch: int):
+        import torch
+
+        with torch.inference_mode():
+            hidden = self.model(torch.randn(batch, self.seq_len, self.width))
+
+        return hidden.mean(dim=1).numpy()
+
+    def encode(self, texts, **_):
+        return self._run(len(texts))
+
+    def predict(self, pairs, **_):
+        return self._run(len(pairs))[:, 0]
+
+
+def load_models(synthetic: bool):
+    if synthetic:
+        return SyntheticModel(seq_len=32), SyntheticModel(seq_len=128)
+
+    from retrieval.models import get_cross_encoder, get_embedding_model
+
+    return get_embedding_model(), get_cross_encoder()
+
+
+def one_chat(run, encoder, cross_encoder):
+    """
+    The model work of one chat: embed the query, rerank candidates.
+    """
+    run("embed", encoder.encode, [QUERY], normalize_embeddings=True)
+    run("rerank", cross_encoder.predict, [[QUERY, PASSAGE]] * RERANK_PAIRS)
+
+
+def parse_layout(layout: str):
+    """
+    "inline" -> (0, None); "2x4" -> (2, 4)
+    """
+    if layout == "inline":
+        return 0, None
+
+    threads, intra = layout.lower().split("x")
+    return int(threads), int(intra)
+
+
+def bench_layout(layout: str, encoder, cross_encoder, clients: int, duration_s: float, affinity=None) -> dict:
+    import torch
+
+    threads, intra = parse_layout(layout)
+
+    if threads == 0:
+        # Default torch sizing, shared by every request thread
+        torch.set_num_threads(CORES)
+        executor = InferenceExecutor(threads=0)
+    else:
+        executor = InferenceExecutor(threads=threads, intra_op_threads=intra, affinity=affinity)
+
+    # Start the threads and apply the torch settings before timing
+    one_chat(executor.run, encoder, cross_encoder)
+
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration_s
+
+    def client():
+        mine = []
+
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            one_chat(executor.run, encoder, cross_encoder)
+            mine.append(time.perf_counter() - start)
+
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+
+    workers = [threading.Thread(target=client) for _ in range(clients)]
+
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    elapsed = time.perf_counter() - started
+
+    executor.shutdown()
+
+    ms = np.asarray(latencies) * 1000
+
+    return {
+        "layout": layout,
+        "inference_threads": threads,
+        "torch_threads": intra or CORES,
+        "chats": len(latencies),
+        "chats_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(ms), 1),
+        "p99_ms": round(float(np.percentile(ms, 99)), 1),
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Embedding + rerank throughput vs inference thread layout under concurrent requests")
+    parser.add_argument("--layouts", default=DEFAULT_LAYOUTS, help="comma-separated 'inline' or TxI (inference threads x torch threads)")
+    parser.add_argument("--clients", type=int, default=DEFAULT_CLIENTS, help="concurrent request threads")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_S, help="seconds per layout")
+    parser.add_argument("--affinity", default="", help="CPUs for the inference threads, e.g. 0-3")
+    parser.add_argument("--synthetic", action="store_true", help="random-weight transformer instead of the real models (offline)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    encoder, cross_encoder = load_models(args.synthetic)
+
+    rows = []
+
+    for layout in [l.strip() for l in args.layouts.split(",") if l.strip()]:
+
+        print(f"Benchmarking {layout}...", file=sys.stderr)
+
+        rows.append(bench_layout(layout, encoder, cross_encoder, args.clients, args.duration, parse_cpu_list(args.affinity)))
+
+    if args.json:
+        print(json.dumps({"cores": CORES, "clients": args.clients, "results": rows}, indent=2))
+        sys.exit(0)
+
+    print(f"\n{CORES} cores, {args.clients} concurrent clients\n")
+    print(f"{'layout':<8} {'inference':>9} {'torch':>6} {'chats':>7} {'chats/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+
+    for r in rows:
+        print(
+            f"{r['layout']:<8} {r['inference_threads']:>9} {r['torch_threads']:>6} {r['chats']:>7} "
+            f"{r['chats_per_s']:>8} {r['p50_ms']:>9} {r['p99_ms']:>9}"
+        )
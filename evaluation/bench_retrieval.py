@@ -0,0 +1,322 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import retrieval.retriever as retriever_module
+from agent.supervisor import AgentSupervisor
+from retrieval.context_builder import build_context
+from retrieval.document_store import DocumentSnapshot
+from retrieval.reranker import Reranker
+from retrieval.retriever import Retriever
+from utils.metrics import process_rss_bytes
+
+# ---------------- CONFIG ----------------
+DEFAULT_SIZES = "1000,10000,100000"
+
+# bge-base; 1M chunks at 768 dims is ~3 GB of vectors (use --dim 256)
+DEFAULT_DIM = 768
+
+DEFAULT_QUERIES = 200
+
+# Same shape as the chat path: 25 candidates -> 7 reranked
+INITIAL_TOP_K = 25
+RERANK_TOP_K = 7
+
+# One table per this many chunks, two tables per table-bearing chunk
+CHUNKS_PER_TABLE = 20
+
+# Fail --compare when a p50 grows by more than this fraction
+DEFAULT_TOLERANCE = 0.2
+# ----------------------------------------
+
+_WORDS = (
+    "revenue margin growth segment operating cash flow guidance dividend headcount attrition "
+    "client contract digital cloud engineering services software products platforms europe "
+    "americas quarter fiscal year board director risk compliance sustainability emissions"
+).split()
+
+
+class StubEncoder:
+    """
+    Offline stand-in for the SentenceTransformer: a deterministic
+    unit vector per text (seeded by its crc32).
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(self, texts, normalize_embeddings=True, **_):
+        vectors = np.stack([
+            np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(self.dim)
+            for text in texts
+        ]).astype(np.float32)
+
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class StubCrossEncoder:
+    """
+    Offline stand-in for the cross-encoder: word overlap between
+    query and passage, plus an optional fixed cost per pair.
+    """
+
+    def __init__(self, pair_cost_s: float = 0.0):
+        self.pair_cost_s = pair_cost_s
+
+    def predict(self, pairs, **_):
+        if self.pair_cost_s:
+            time.sleep(self.pair_cost_s * len(pairs))
+
+        scores = []
+
+        for query, passage in pairs:
+            words = set(query.lower().split())
+            scores.append(sum(1 for w in passage.lower().split() if w in words) / (len(words) or 1))
+
+        return np.asarray(scores, dtype=np.float32)
+
+
+def _text(rng, words: int) -> str:
+    return " ".join(rng.choice(_WORDS, size=words))
+
+
+def make_corpus(size: int, dim: int, seed: int = 0):
+    """
+    Flat IP index over random unit vectors, chunk metadata shaped
+    like ingestion output, and the tables those chunks reference.
+    """
+    import faiss
+
+    rng = np.random.default_rng(seed)
+
+    index = faiss.IndexFlatIP(dim)
+
+    # In blocks so 1M chunks never need two copies of the vectors
+    for start in range(0, size, 50_000):
+        block = rng.standard_normal((min(50_000, size - start), dim)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        index.add(block)
+
+    # A small pool of texts shared between chunks keeps 1M chunks cheap
+    sections = [f"Section {i}: {_text(rng, 4)}" for i in range(64)]
+    texts = [_text(rng, 150) for _ in range(256)]
+
+    tables_raw = []
+    metadata = []
+
+    for i in range(size):
+        table_ids = []
+
+        if i % CHUNKS_PER_TABLE == 0:
+            table_ids = [f"table_{len(tables_raw)}", f"table_{len(tables_raw) + 1}"]
+
+            for table_id in table_ids:
+                tables_raw.append({
+                    "id": table_id,
+                    "table_type": "structured",
+                    "table_prompt": "| metric | FY24 | FY25 |\n|---|---|---|\n" + "\n".join(
+                        f"| {w} | {rng.integers(100, 999)} | {rng.integers(100, 999)} |"
+                        for w in rng.choice(_WORDS, size=8)
+                    ),
+                })
+
+        section = sections[i % len(sections)]
+
+        metadata.append({
+            "chunk_id": f"chunk_{i:07d}",
+            "section": section,
+            "pages": [i // 4 + 1],
+            "token_count": 180,
+            "tables": table_ids,
+            "images": [],
+            "chunk_text": f"{section}\n{texts[i % len(texts)]}",
+        })
+
+    return index, metadata, tables_raw
+
+
+def _timed(fn, runs: list):
+    """
+    Call fn() for every prepared argument tuple; per-call ms.
+    """
+    latencies = []
+
+    for args in runs:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def summarize(latencies_ms: list) -> dict:
+    ordered = sorted(latencies_ms)
+
+    def pct(q):
+        return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+    total_s = sum(ordered) / 1000
+
+    return {
+        "calls": len(ordered),
+        "throughput_per_s": round(len(ordered) / total_s, 1) if total_s else None,
+        "p50_ms": round(statistics.median(ordered), 4),
+        "p99_ms": round(pct(99), 4),
+        "mean_ms": round(statistics.mean(ordered), 4),
+    }
+
+
+def bench_size(size: int, dim: int, queries: int, pair_cost_s: float, seed: int = 0) -> dict:
+
+    encoder = StubEncoder(dim)
+
+    # Retriever loads the process-wide embedding model; hand it the stub
+    retriever_module.get_embedding_model = lambda *_: encoder
+
+    rss_before = process_rss_bytes()
+    start = time.perf_counter()
+
+    index, metadata, tables_raw = make_corpus(size, dim, seed)
+
+    build_s = time.perf_counter() - start
+
+    retriever = Retriever(index_object=index, metadata_object=metadata, initial_top_k=INITIAL_TOP_K)
+
+    reranker = Reranker()
+    reranker._model = StubCrossEncoder(pair_cost_s)
+
+    # _load_tables only reads the active document
+    supervisor = AgentSupervisor.__new__(AgentSupervisor)
+    supervisor.document = DocumentSnapshot(retriever, tables_raw)
+
+    rng = np.random.default_rng(seed + 1)
+    query_texts = [_text(rng, 8) for _ in range(queries)]
+    query_vecs = [encoder.encode([q]) for q in query_texts]
+
+    # Warm-up (first faiss search allocates)
+    retriever.retrieve(query_texts[0], query_vec=query_vecs[0])
+
+    results = {}
+
+    results["retrieve"] = summarize(_timed(
+        lambda q, v: retriever.retrieve(q, query_vec=v),
+        list(zip(query_texts, query_vecs)),
+    ))
+
+    candidates = [retriever.retrieve(q, query_vec=v) for q, v in zip(query_texts, query_vecs)]
+
+    # rerank() annotates its input: give every call fresh dicts
+    rerank_runs = [(q, [dict(c) for c in cands]) for q, cands in zip(query_texts, candidates)]
+
+    results["rerank"] = summarize(_timed(
+        lambda q, cands: reranker.rerank(q, cands, top_k=RERANK_TOP_K),
+        rerank_runs,
+    ))
+
+    ranked = [reranker.rerank(q, [dict(c) for c in cands], top_k=RERANK_TOP_K) for q, cands in zip(query_texts, candidates)]
+
+    results["build_context"] = summarize(_timed(build_context, [(r,) for r in ranked]))
+
+    table_runs = []
+
+    for r in ranked:
+        table_ids = []
+        for chunk in r:
+            table_ids += [t for t in chunk["tables"] if t not in table_ids]
+        table_runs.append((table_ids or [tables_raw[0]["id"]],))
+
+    results["load_tables"] = summarize(_timed(supervisor._load_tables, table_runs))
+
+    rss_after = process_rss_bytes()
+
+    return {
+        "chunks": size,
+        "dim": dim,
+        "tables": len(tables_raw),
+        "build_s": round(build_s, 2),
+        "rss_delta_mb": round((rss_after - rss_before) / 2**20, 1) if rss_before and rss_after else None,
+        "ops": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    (size, op, baseline p50, current p50) for every p50 that grew
+    by more than `tolerance`.
+    """
+    regressions = []
+
+    for size, run in current["runs"].items():
+        base = baseline.get("runs", {}).get(size)
+
+        if not base:
+            continue
+
+        for op, stats in run["ops"].items():
+            before = base["ops"].get(op, {}).get("p50_ms")
+
+            if before and stats["p50_ms"] > before * (1 + tolerance):
+                regressions.append((size, op, before, stats["p50_ms"]))
+
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Retrieval-path micro-benchmarks on synthetic corpora (offline, stub models)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated chunk counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--rerank-pair-ms", type=float, default=0.0, help="simulated cross-encoder cost per pair")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run; exit 1 on p50 regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    report = {
+        "config": {
+            "dim": args.dim,
+            "queries": args.queries,
+            "initial_top_k": INITIAL_TOP_K,
+            "rerank_top_k": RERANK_TOP_K,
+            "rerank_pair_ms": args.rerank_pair_ms,
+        },
+        "runs": {},
+    }
+
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+
+        print(f"Benchmarking {size} chunks...", file=sys.stderr)
+
+        report["runs"][str(size)] = bench_size(size, args.dim, args.queries, args.rerank_pair_ms / 1000)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{'chunks':>8} {'op':<14} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+
+        for size, run in report["runs"].items():
+            for op, stats in run["ops"].items():
+                print(f"{size:>8} {op:<14} {stats['throughput_per_s']:>10} {stats['p50_ms']:>10} {stats['p99_ms']:>10}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+
+        for size, op, before, after in regressions:
+            print(f"REGRESSION {size} chunks / {op}: p50 {before} -> {after} ms", file=sys.stderr)
+
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.tokens import count_tokens
+from ingestion.table_renderer import compact_text, render_table
+
+# ---------------- CONFIG ----------------
+DEFAULT_FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests", "fixtures", "table_elements.json"
+)
+# ----------------------------------------
+
+
+def bench_table_rendering(table_elements_path: str, fmt: str):
+    """
+    Prompt tokens of raw table HTML vs the compact rendering
+    precomputed by process_tables, per table and in total.
+    """
+
+    with open(table_elements_path, "r", encoding="utf-8") as f:
+        tables = json.load(f)
+
+    rows = []
+
+    for table in tables:
+
+        if table.get("table_type") == "structured":
+            raw = table.get("table_html") or ""
+            start = time.perf_counter()
+            rendered = render_table(raw, fmt) or compact_text(table.get("raw_text", ""))
+        else:
+            raw = table.get("raw_text") or ""
+            start = time.perf_counter()
+            rendered = compact_text(raw)
+
+        render_ms = (time.perf_counter() - start) * 1000
+
+        raw_tokens = count_tokens(raw)
+        rendered_tokens = count_tokens(rendered)
+
+        rows.append({
+            "id": table.get("id"),
+            "table_type": table.get("table_type"),
+            "raw_tokens": raw_tokens,
+            "rendered_tokens": rendered_tokens,
+            "reduction_pct": round(100 * (1 - rendered_tokens / raw_tokens), 1) if raw_tokens else 0.0,
+            "render_ms": round(render_ms, 3),
+        })
+
+    raw_total = sum(r["raw_tokens"] for r in rows)
+    rendered_total = sum(r["rendered_tokens"] for r in rows)
+
+    return {
+        "fixture": table_elements_path,
+        "format": fmt,
+        "tables": rows,
+        "raw_tokens": raw_total,
+        "rendered_tokens": rendered_total,
+        "reduction_pct": round(100 * (1 - rendered_total / raw_total), 1) if raw_total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Token reduction of compact table rendering")
+    parser.add_argument("fixture", nargs="?", default=DEFAULT_FIXTURE, help="table_elements.json to benchmark")
+    parser.add_argument("--format", default="markdown", choices=["markdown", "tsv"])
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    result = bench_table_rendering(args.fixture, args.format)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+    print(f"\n{'table':<12} {'type':<13} {'html':>7} {args.format:>9} {'saved':>7} {'ms':>7}")
+
+    for r in result["tables"]:
+        print(
+            f"{r['id']:<12} {r['table_type']:<13} {r['raw_tokens']:>7} "
+            f"{r['rendered_tokens']:>9} {r['reduction_pct']:>6}% {r['render_ms']:>7}"
+        )
+
+    print(
+        f"\nTOTAL {result['raw_tokens']} -> {result['rendered_tokens']} tokens "
+        f"({result['reduction_pct']}% fewer)"
+    )
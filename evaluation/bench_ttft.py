@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation.fake_llm_server import start_fake_llm_server
+from llm.backends import LLMError, create_backend
+
+# ---------------- CONFIG ----------------
+DEFAULT_PROMPT = "In one sentence, what does a corporate annual report contain?"
+
+DEFAULT_RUNS = 5
+# ----------------------------------------
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def bench_backend(backend, prompt: str, runs: int):
+    """
+    Time-to-first-token and total time of stream(), per run.
+    """
+
+    ttft, total, chunks, errors = [], [], [], 0
+
+    for _ in range(runs):
+
+        start = time.perf_counter()
+        first = None
+        count = 0
+
+        try:
+            for _chunk in backend.stream(prompt, max_new_tokens=64):
+                if first is None:
+                    first = time.perf_counter() - start
+                count += 1
+        except LLMError as e:
+            print(f"  run failed: {e}")
+            errors += 1
+            continue
+
+        ttft.append((first if first is not None else time.perf_counter() - start) * 1000)
+        total.append((time.perf_counter() - start) * 1000)
+        chunks.append(count)
+
+    if not ttft:
+        return {"runs": runs, "errors": errors}
+
+    return {
+        "runs": runs,
+        "errors": errors,
+        "ttft_ms_p50": round(statistics.median(ttft), 1),
+        "ttft_ms_p95": round(percentile(ttft, 95), 1),
+        "total_ms_p50": round(statistics.median(total), 1),
+        "chunks_avg": round(statistics.mean(chunks), 1),
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Time-to-first-token per LLM backend")
+    parser.add_argument("--backends", default="hf,ollama", help="comma-separated LLM_BACKEND values")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--fake", action="store_true", help="point every backend at a local fake server")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake server: seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="fake server: seconds between tokens")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    if args.fake:
+        server, url = start_fake_llm_server(latency_s=args.latency, token_delay_s=args.token_delay)
+        os.environ["HF_INFERENCE_V1_URL"] = url
+        os.environ.setdefault("HF_TOKEN", "fake")
+        os.environ["OLLAMA_URL"] = url.replace("/v1/chat/completions", "/api/generate")
+
+        # Backends read their endpoints at import time
+        import llm.ollama_client
+        llm.ollama_client.OLLAMA_URL = os.environ["OLLAMA_URL"]
+
+    results = {}
+
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+
+        print(f"Benchmarking {name}...")
+
+        backend = create_backend(api_token=os.getenv("HF_TOKEN"), backend=name)
+
+        results[name] = bench_backend(backend, args.prompt, args.runs)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        sys.exit(0)
+
+    print(f"\n{'backend':<10} {'ttft p50':>9} {'ttft p95':>9} {'total p50':>10} {'chunks':>7} {'errors':>7}")
+
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r.get('ttft_ms_p50', '-'):>9} {r.get('ttft_ms_p95', '-'):>9} "
+            f"{r.get('total_ms_p50', '-'):>10} {r.get('chunks_avg', '-'):>7} {r['errors']:>7}"
+        )
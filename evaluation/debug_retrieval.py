@@ -15,20 +15,37 @@ TOP_K = 5
 # ------------------------------------------------------------------
 
 
+_resources = None
+
+
+def load_resources():
+    """
+    Index, metadata and embedding model, loaded once per process.
+    """
+    global _resources
+
+    if _resources is None:
+        # 1️⃣ Load FAISS index
+        index = faiss.read_index(FAISS_INDEX_PATH)
+
+        # 2️⃣ Load metadata
+        with open(METADATA_PATH, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        # 3️⃣ Load SAME embedding model used at ingestion
+        model = SentenceTransformer(MODEL_NAME)
+
+        _resources = (index, metadata, model)
+
+    return _resources
+
+
 def debug_retrieval(query: str):
     print("\n==============================")
     print(f"🔎 QUERY: {query}")
     print("==============================\n")
 
-    # 1️⃣ Load FAISS index
-    index = faiss.read_index(FAISS_INDEX_PATH)
-
-    # 2️⃣ Load metadata
-    with open(METADATA_PATH, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-
-    # 3️⃣ Load SAME embedding model used at ingestion
-    model = SentenceTransformer(MODEL_NAME)
+    index, metadata, model = load_resources()
 
     # 4️⃣ Embed query
     query_embedding = model.encode(
@@ -54,8 +71,9 @@ def debug_retrieval(query: str):
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python evaluation/debug_retrieval.py \"your question here\"")
+        print("Usage: python evaluation/debug_retrieval.py \"your question here\" [\"another question\" ...]")
         sys.exit(1)
 
-    debug_retrieval(sys.argv[1])
+    for query in sys.argv[1:]:
+        debug_retrieval(query)
     
\ No newline at end of file
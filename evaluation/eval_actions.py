@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.action_engine import ActionEngine
+
+# ---------------- CONFIG ----------------
+DEFAULT_REQUESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "action_requests.json")
+# ----------------------------------------
+
+
+def evaluate(rows, generate):
+    """
+    Field accuracy per request, plus the engine's per-path hit
+    rates and latencies.
+    """
+
+    engine = ActionEngine()
+    checked, correct, mistakes = 0, 0, []
+
+    for row in rows:
+
+        engine.today = lambda row=row: date.fromisoformat(row["today"])
+
+        result = engine.run(row["query"], generate)
+
+        for field, expected in row["expected"].items():
+            checked += 1
+            if result.get(field) == expected:
+                correct += 1
+            else:
+                mistakes.append({"query": row["query"], "field": field, "expected": expected, "got": result.get(field)})
+
+    return {
+        "field_accuracy": round(correct / checked, 3) if checked else 0.0,
+        "paths": engine.snapshot(),
+        "mistakes": mistakes,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Rule vs LLM extraction of action requests")
+    parser.add_argument("requests", nargs="?", default=DEFAULT_REQUESTS, help="JSON list of {query, today, expected}")
+    parser.add_argument("--llm", action="store_true", help="send the remainder to the configured LLM_BACKEND")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    with open(args.requests, "r", encoding="utf-8") as f:
+        rows = json.load(f)
+
+    if args.llm:
+        from llm.backends import create_backend
+        backend = create_backend(api_token=os.getenv("HF_TOKEN"))
+        generate = lambda prompt: backend.generate(prompt, max_new_tokens=128, temperature=0.0)
+    else:
+        # No LLM: the remainder lands on the fallback path
+        generate = lambda _prompt: ""
+
+    result = evaluate(rows, generate)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+    print(f"\n{'path':<10} {'count':>6} {'hit rate':>9} {'p50 ms':>9} {'p95 ms':>9}")
+
+    for path, r in result["paths"].items():
+        print(f"{path:<10} {r['count']:>6} {r['hit_rate']:>9} {str(r['p50_ms']):>9} {str(r['p95_ms']):>9}")
+
+    print(f"\nField accuracy: {result['field_accuracy']}")
+
+    for m in result["mistakes"]:
+        print(f"  {m['field']}: expected {m['expected']!r}, got {m['got']!r} ({m['query']})")
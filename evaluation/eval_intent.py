@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.intent_classifier import classify_intent_llm, get_intent_classifier
+
+# ---------------- CONFIG ----------------
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_labels.json")
+# ----------------------------------------
+
+
+def evaluate(classify, rows):
+    """
+    Accuracy and per-query latency of `classify(query) -> label`.
+    """
+
+    latencies, correct, mistakes = [], 0, []
+
+    for row in rows:
+
+        start = time.perf_counter()
+        label = classify(row["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if label == row["label"]:
+            correct += 1
+        else:
+            mistakes.append({"query": row["query"], "expected": row["label"], "got": label})
+
+    latencies.sort()
+
+    return {
+        "accuracy": round(correct / len(rows), 3),
+        "latency_ms_p50": round(statistics.median(latencies), 2),
+        "latency_ms_p95": round(latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)], 2),
+        "mistakes": mistakes,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Accuracy and latency of intent classification")
+    parser.add_argument("labels", nargs="?", default=DEFAULT_LABELS, help="JSON list of {query, label}")
+    parser.add_argument("--llm", action="store_true", help="also evaluate the LLM classifier (needs HF_TOKEN)")
+    args = parser.parse_args()
+
+    with open(args.labels, "r", encoding="utf-8") as f:
+        rows = json.load(f)
+
+    classifier = get_intent_classifier()
+
+    start = time.perf_counter()
+    classifier.fit()
+    print(f"Prototypes ready in {time.perf_counter() - start:.2f}s")
+
+    encoder = classifier.encoder
+
+    # The supervisor passes the retrieval embedding in, so the local
+    # classifier is timed both with and without encoding the query
+    vectors = {row["query"]: encoder.encode([row["query"]], normalize_embeddings=True) for row in rows}
+
+    results = {
+        "local (embedding reused)": evaluate(lambda q: classifier.predict(q, query_vec=vectors[q])[0], rows),
+        "local (encode query)": evaluate(lambda q: classifier.predict(q)[0], rows),
+    }
+
+    if args.llm:
+        results["llm"] = evaluate(classify_intent_llm, rows)
+
+    print(f"\n{'classifier':<26} {'accuracy':>9} {'p50 ms':>9} {'p95 ms':>9}")
+
+    for name, r in results.items():
+        print(f"{name:<26} {r['accuracy']:>9} {r['latency_ms_p50']:>9} {r['latency_ms_p95']:>9}")
+
+    for name, r in results.items():
+        for m in r["mistakes"]:
+            print(f"  [{name}] expected {m['expected']}, got {m['got']}: {m['query']}")
@@ -0,0 +1,240 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+from ingestion.chunker import DEFAULT_MAX_TOKENS, DEFAULT_OVERLAP_TOKENS
+from ingestion.runtime_ingestion import ingest_pdf_to_runtime
+from retrieval.models import RERANKER_MODEL_NAME, get_embedding_model
+from retrieval.reranker import Reranker
+from retrieval.retriever import Retriever
+
+# ---------------- CONFIG ----------------
+DEFAULT_LABELS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_labels.json")
+
+DEFAULT_K = "1,3,5"
+
+# Comma-separated lists; every combination becomes one row
+DEFAULT_INDEXES = "flat,hnsw,ivf"
+DEFAULT_QUANTIZATION = "none,fp16,sq8"
+DEFAULT_TOP_K = "10,25"
+DEFAULT_RERANKERS = f"off,{RERANKER_MODEL_NAME}"
+DEFAULT_CHUNKING = f"{DEFAULT_MAX_TOKENS}:{DEFAULT_OVERLAP_TOKENS}"
+
+HNSW_M = 32
+
+# IVF lists probed per search (of ~sqrt(chunks) lists)
+IVF_NPROBE = 4
+# ----------------------------------------
+
+# FAISS storage per quantization; pq keeps 4 bits per sub-vector of 8 dims
+STORAGE = {
+    "none": "Flat",
+    "fp16": "SQfp16",
+    "sq8": "SQ8",
+    "pq": "PQ{m}x4",
+}
+
+
+def factory_string(index_type: str, quantization: str, chunks: int, dim: int) -> str:
+    """
+    faiss.index_factory description of one index type + quantization.
+    """
+    storage = STORAGE[quantization].format(m=dim // 8)
+
+    if index_type == "flat":
+        return storage
+
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M}" if quantization == "none" else f"HNSW{HNSW_M}_{storage}"
+
+    if index_type == "ivf":
+        return f"IVF{max(1, int(math.sqrt(chunks)))},{storage}"
+
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def build_index(vectors, description: str):
+    import faiss
+
+    index = faiss.index_factory(vectors.shape[1], description, faiss.METRIC_INNER_PRODUCT)
+
+    if not index.is_trained:
+        index.train(vectors)
+
+    index.add(vectors)
+
+    if description.startswith("IVF"):
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+
+    return index, faiss.serialize_index(index).nbytes
+
+
+def _expected(row) -> set:
+    return {("page", p) for p in row.get("pages", [])} | {("chunk", c) for c in row.get("chunk_ids", [])}
+
+
+def _covers(chunk) -> set:
+    return {("page", p) for p in chunk.get("pages", [])} | {("chunk", chunk.get("chunk_id"))}
+
+
+def evaluate(rows, query_vecs, retriever, reranker, ks):
+    """
+    recall@k (share of a question's expected pages/chunks found in
+    the top k), MRR of the first relevant chunk, and per-query
+    retrieve + rerank latency.
+    """
+
+    depth = max(ks)
+    recalls = {k: [] for k in ks}
+    reciprocal_ranks, latencies = [], []
+
+    for row, query_vec in zip(rows, query_vecs):
+
+        start = time.perf_counter()
+
+        results = retriever.retrieve(row["query"], query_vec=query_vec)
+
+        if reranker is not None:
+            results = reranker.rerank(row["query"], results, top_k=depth)
+        else:
+            results = results[:depth]
+
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        expected = _expected(row)
+
+        for k in ks:
+            found = set().union(*(_covers(r) for r in results[:k])) if results else set()
+            recalls[k].append(len(expected & found) / len(expected))
+
+        rank = next((i for i, r in enumerate(results, start=1) if _covers(r) & expected), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    latencies.sort()
+
+    return {
+        **{f"recall@{k}": round(statistics.mean(recalls[k]), 3) for k in ks},
+        "mrr": round(statistics.mean(reciprocal_ranks), 3),
+        "latency_ms_p50": round(statistics.median(latencies), 2),
+        "latency_ms_p95": round(latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)], 2),
+    }
+
+
+def _split(value: str) -> list:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Recall@k, MRR and latency of retrieval configurations")
+    parser.add_argument("labels", nargs="?", default=DEFAULT_LABELS, help="JSON {pdf, questions: [{query, pages and/or chunk_ids}]}")
+    parser.add_argument("--k", default=DEFAULT_K)
+    parser.add_argument("--index", default=DEFAULT_INDEXES, help="flat, hnsw, ivf")
+    parser.add_argument("--quantization", default=DEFAULT_QUANTIZATION, help="none, fp16, sq8, pq")
+    parser.add_argument("--top-k", default=DEFAULT_TOP_K, help="Retriever initial_top_k values")
+    parser.add_argument("--reranker", default=DEFAULT_RERANKERS, help="'off' or cross-encoder model names")
+    parser.add_argument("--chunking", default=DEFAULT_CHUNKING, help="max_tokens:overlap_tokens pairs, e.g. 128:16,256:32")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    with open(args.labels, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+
+    rows = labels["questions"]
+    pdf_path = labels["pdf"] if os.path.isabs(labels["pdf"]) else os.path.join(ROOT, labels["pdf"])
+    ks = sorted(int(k) for k in _split(args.k))
+
+    encoder = get_embedding_model()
+
+    # Identical for every configuration: encoded once, timed once
+    encode_ms, query_vecs = [], []
+
+    for row in rows:
+        start = time.perf_counter()
+        query_vecs.append(encoder.encode([row["query"]], normalize_embeddings=True))
+        encode_ms.append((time.perf_counter() - start) * 1000)
+
+    rerankers = {}
+
+    for name in _split(args.reranker):
+        rerankers[name] = None if name == "off" else Reranker(model_name=name)
+
+        # Load the cross-encoder before anything is timed
+        if rerankers[name] is not None:
+            rerankers[name].rerank("warm up", [{"chunk_text": "warm up"}], top_k=1)
+
+    results = []
+
+    for chunking in _split(args.chunking):
+
+        max_tokens, overlap_tokens = (int(v) for v in chunking.split(":"))
+
+        payload = ingest_pdf_to_runtime(pdf_path, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+        metadata = payload["metadata"]
+        vectors = payload["index"].reconstruct_n(0, payload["index"].ntotal).astype(np.float32)
+
+        for index_type, quantization in itertools.product(_split(args.index), _split(args.quantization)):
+
+            description = factory_string(index_type, quantization, len(metadata), vectors.shape[1])
+
+            config = {"chunking": chunking, "chunks": len(metadata), "index": description, "quantization": quantization}
+
+            try:
+                index, index_bytes = build_index(vectors, description)
+            except RuntimeError as e:
+                # e.g. too few chunks to train the quantizer
+                results.append({**config, "skipped": str(e).strip().splitlines()[-1]})
+                continue
+
+            for top_k, (reranker_name, reranker) in itertools.product(_split(args.top_k), rerankers.items()):
+
+                retriever = Retriever(index_object=index, metadata_object=metadata, initial_top_k=int(top_k))
+
+                results.append({
+                    **config,
+                    "index_kb": round(index_bytes / 1024, 1),
+                    "initial_top_k": int(top_k),
+                    "reranker": reranker_name,
+                    **evaluate(rows, query_vecs, retriever, reranker, ks),
+                })
+
+    encode_ms.sort()
+
+    if args.json:
+        print(json.dumps({"questions": len(rows), "encode_ms_p50": round(statistics.median(encode_ms), 2), "results": results}, indent=2))
+        sys.exit(0)
+
+    print(f"{len(rows)} questions, query encoding p50 {statistics.median(encode_ms):.2f} ms (not included below)\n")
+
+    recall_columns = [f"recall@{k}" for k in ks]
+
+    print(
+        f"{'chunking':<9} {'chunks':>6} {'index':<16} {'KB':>8} {'top_k':>5} {'reranker':<24} "
+        + " ".join(f"{c:>9}" for c in recall_columns)
+        + f" {'MRR':>6} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+
+    for r in results:
+
+        if "skipped" in r:
+            print(f"{r['chunking']:<9} {r['chunks']:>6} {r['index']:<16} skipped: {r['skipped']}")
+            continue
+
+        print(
+            f"{r['chunking']:<9} {r['chunks']:>6} {r['index']:<16} {r['index_kb']:>8} {r['initial_top_k']:>5} "
+            f"{r['reranker'].split('/')[-1]:<24} "
+            + " ".join(f"{r[c]:>9}" for c in recall_columns)
+            + f" {r['mrr']:>6} {r['latency_ms_p50']:>8} {r['latency_ms_p95']:>8}"
+        )
@@ -0,0 +1,209 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- CONFIG ----------------
+DEFAULT_LATENCY_S = 0.5
+
+# Delay between generated tokens (streamed or not)
+DEFAULT_TOKEN_DELAY_S = 0.0
+
+CANNED_ANSWER = "The document states this explicitly. (Source: Page 1)"
+
+# Share of requests answered with 500 / 429 (before any latency)
+DEFAULT_ERROR_RATE = 0.0
+DEFAULT_RATE_LIMIT_RATE = 0.0
+
+# Retry-After sent with every 429
+DEFAULT_RETRY_AFTER_S = 1
+# ----------------------------------------
+
+
+def split_tokens(text: str) -> list:
+    """Word-sized chunks that join back into the original text."""
+    return re.findall(r"\S+\s*", text)
+
+
+def make_handler(
+    latency_s: float,
+    answer: str = CANNED_ANSWER,
+    token_delay_s: float = DEFAULT_TOKEN_DELAY_S,
+    error_rate: float = DEFAULT_ERROR_RATE,
+    rate_limit_rate: float = DEFAULT_RATE_LIMIT_RATE,
+    retry_after_s: float = DEFAULT_RETRY_AFTER_S,
+    seed: int = None,
+):
+
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        """
+        Minimal stand-in for the HF router /v1/chat/completions
+        (plain JSON or SSE stream) and Ollama /api/generate (NDJSON).
+        Injects 500s and 429s at the configured rates.
+        """
+
+        # Chunked transfer for streams, like the real servers
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            self.server.payloads.append(payload)
+
+            with rng_lock:
+                draw = rng.random()
+
+            if draw < rate_limit_rate:
+                self.server.injected["429"] += 1
+                return self._error(429, "Rate limit reached", {"Retry-After": f"{retry_after_s:g}"})
+
+            if draw < rate_limit_rate + error_rate:
+                self.server.injected["500"] += 1
+                return self._error(500, "Internal server error")
+
+            time.sleep(latency_s)
+
+            if self.path.startswith("/api/generate"):
+                return self._ollama(payload)
+
+            if payload.get("stream"):
+                return self._sse(payload)
+
+            # Not streamed: the whole answer is generated before replying
+            time.sleep(token_delay_s * max(len(split_tokens(answer)) - 1, 0))
+
+            body = json.dumps({
+                "model": payload.get("model"),
+                "choices": [{"message": {"role": "assistant", "content": answer}}],
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, message, headers=None):
+            body = json.dumps({"error": message}).encode("utf-8")
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, content_type, lines):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            for i, line in enumerate(lines):
+                if i and token_delay_s:
+                    time.sleep(token_delay_s)
+                data = line.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            self.wfile.write(b"0\r\n\r\n")
+            self.close_connection = True
+
+        def _sse(self, payload):
+            events = [
+                json.dumps({"choices": [{"delta": {"content": token}}]})
+                for token in split_tokens(answer)
+            ]
+            self._stream(
+                "text/event-stream",
+                [f"data: {event}\n\n" for event in events] + ["data: [DONE]\n\n"],
+            )
+
+        def _ollama(self, payload):
+            # No prompt: Ollama only loads the model
+            tokens = split_tokens(answer) if payload.get("prompt") else []
+
+            lines = [
+                json.dumps({"model": payload.get("model"), "response": token, "done": False})
+                for token in tokens
+            ]
+            lines.append(json.dumps({"model": payload.get("model"), "response": "", "done": True}))
+
+            self._stream("application/x-ndjson", [f"{line}\n" for line in lines])
+
+        def log_message(self, *_args):
+            pass
+
+    return FakeLLMHandler
+
+
+def start_fake_llm_server(
+    port: int = 0,
+    latency_s: float = DEFAULT_LATENCY_S,
+    answer: str = CANNED_ANSWER,
+    token_delay_s: float = DEFAULT_TOKEN_DELAY_S,
+    error_rate: float = DEFAULT_ERROR_RATE,
+    rate_limit_rate: float = DEFAULT_RATE_LIMIT_RATE,
+    retry_after_s: float = DEFAULT_RETRY_AFTER_S,
+    seed: int = None,
+):
+    """
+    Start the server in a daemon thread. Returns (server, url) where
+    url is the chat-completions endpoint; the Ollama endpoint is
+    /api/generate on the same port. Request payloads are recorded in
+    server.payloads, injected failures in server.injected.
+    """
+
+    handler = make_handler(latency_s, answer, token_delay_s, error_rate, rate_limit_rate, retry_after_s, seed)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.payloads = []
+    server.injected = {"429": 0, "500": 0}
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+    return server, url
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the HF chat-completions router and Ollama")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY_S)
+    parser.add_argument("--token-delay", type=float, default=DEFAULT_TOKEN_DELAY_S)
+    parser.add_argument("--token-rate", type=float, help="tokens per second (overrides --token-delay)")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_ERROR_RATE, help="share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=DEFAULT_RATE_LIMIT_RATE, help="share of requests rejected with 429")
+    parser.add_argument("--retry-after", type=float, default=DEFAULT_RETRY_AFTER_S)
+    args = parser.parse_args()
+
+    server, url = start_fake_llm_server(
+        args.port,
+        args.latency,
+        token_delay_s=1 / args.token_rate if args.token_rate else args.token_delay,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_s=args.retry_after,
+    )
+
+    print(f"Fake LLM listening on {url} (Ollama: /api/generate)")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
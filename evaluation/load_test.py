@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation.fake_llm_server import start_fake_llm_server
+
+# ---------------- CONFIG ----------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIXTURE_PDF = os.path.join(ROOT, "tests", "fixtures", "press.pdf")
+
+QUERIES = [
+    "Give a summary",
+    "What is the vision of 6G networks?",
+    "How is blockchain used?",
+    "What are the key challenges mentioned?",
+]
+
+# Open-loop mode: share of requests that are uploads
+DEFAULT_UPLOAD_RATIO = 0.05
+
+# Requests in flight at most; later ones wait (their wait counts as latency)
+DEFAULT_MAX_IN_FLIGHT = 64
+
+RSS_SAMPLE_INTERVAL_S = 0.5
+# ----------------------------------------
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, threads: int, llm_url: str, store_dir: str):
+    """
+    Launch the production gunicorn config with the given worker count.
+    """
+
+    port = _free_port()
+
+    env = {
+        **os.environ,
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(workers),
+        "GUNICORN_THREADS": str(threads),
+        "HF_TOKEN": os.getenv("HF_TOKEN", "load-test"),
+        "HF_INFERENCE_V1_URL": llm_url,
+        "DOCUMENT_STORE_DIR": store_dir,
+        # Per run, so every run starts cold
+        "INGESTION_CACHE_DIR": os.path.join(store_dir, "ingestion_cache"),
+    }
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "web_app:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 600
+
+    while time.time() < deadline:
+
+        try:
+            if requests.get(f"{base_url}/healthz/ready", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+
+        time.sleep(1)
+
+    proc.terminate()
+    raise RuntimeError("server did not become ready")
+
+
+def upload_fixture(base_url: str):
+
+    with open(FIXTURE_PDF, "rb") as f:
+        resp = requests.post(
+            f"{base_url}/api/v1/upload",
+            files={"file": ("press.pdf", f, "application/pdf")},
+            timeout=900,
+        )
+
+    resp.raise_for_status()
+
+
+def _post(session, base_url: str, kind: str, i: int):
+    """
+    One chat or upload. Returns the HTTP status, or the exception
+    name when there was no response.
+    """
+
+    try:
+        if kind == "upload":
+            with open(FIXTURE_PDF, "rb") as f:
+                resp = session.post(
+                    f"{base_url}/api/v1/upload",
+                    files={"file": ("press.pdf", f, "application/pdf")},
+                    timeout=900,
+                )
+        else:
+            resp = session.post(
+                f"{base_url}/api/v1/chat",
+                json={"query": QUERIES[i % len(QUERIES)]},
+                timeout=300,
+            )
+        return resp.status_code
+    except requests.RequestException as e:
+        return type(e).__name__
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """
+    samples: (latency seconds, status) per request.
+    """
+
+    latencies = np.asarray([latency for latency, _ in samples])
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+
+    def pct(q):
+        return round(float(np.percentile(latencies, q)) * 1000, 1) if latencies.size else None
+
+    return {
+        "requests": int(latencies.size),
+        "errors": errors,
+        "error_rate": round(errors / latencies.size, 4) if latencies.size else 0.0,
+        "statuses": dict(statuses),
+        "throughput_rps": round((latencies.size - errors) / elapsed, 2),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+def process_tree_rss(pid: int):
+    """
+    Resident memory of pid and all its descendants (gunicorn master
+    and workers), or None without /proc.
+    """
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total, pending = 0, [pid]
+
+    while pending:
+
+        current = pending.pop()
+
+        try:
+            with open(f"/proc/{current}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", "r") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError, IndexError):
+            if current == pid:
+                return None
+
+    return total
+
+
+class RssSampler:
+    """
+    Samples the server's RSS in the background; peak and last value.
+    """
+
+    def __init__(self, pid: int, interval_s: float = RSS_SAMPLE_INTERVAL_S):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.peak = None
+        self.last = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            rss = process_tree_rss(self.pid)
+
+            if rss is not None:
+                self.last = rss
+                self.peak = max(self.peak or 0, rss)
+
+            if self._stop.wait(self.interval_s):
+                return
+
+    def to_dict(self) -> dict:
+        mb = lambda value: round(value / 2**20, 1) if value else None
+        return {"rss_peak_mb": mb(self.peak), "rss_end_mb": mb(self.last)}
+
+
+def run_chat_load(base_url: str, concurrency: int, duration_s: float):
+    """
+    Closed-loop load: `concurrency` clients send chats back to back.
+    """
+
+    stop_at = time.time() + duration_s
+
+    def client(worker_id):
+
+        samples = []
+        i = worker_id
+
+        session = requests.Session()
+
+        while time.time() < stop_at:
+
+            start = time.perf_counter()
+            status = _post(session, base_url, "chat", i)
+            samples.append((time.perf_counter() - start, status))
+            i += 1
+
+        return samples
+
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client, range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+
+    return {"chat": summarize([s for samples in results for s in samples], elapsed)}
+
+
+def run_mixed_load(
+    base_url: str,
+    rps: float,
+    duration_s: float,
+    upload_ratio: float = DEFAULT_UPLOAD_RATIO,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    seed: int = 0,
+):
+    """
+    Open-loop load: requests start on a fixed schedule at `rps`
+    whatever the server's speed, a share `upload_ratio` of them
+    uploads. Latency counts from the scheduled start, so time spent
+    waiting for a free client is not hidden.
+    """
+
+    rng = random.Random(seed)
+    total = int(rps * duration_s)
+    kinds = ["upload" if rng.random() < upload_ratio else "chat" for _ in range(total)]
+
+    sessions = threading.local()
+    samples = {"chat": [], "upload": []}
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+
+    def fire(i, kind, scheduled):
+
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+
+        status = _post(sessions.session, base_url, kind, i)
+
+        with lock:
+            samples[kind].append((time.perf_counter() - scheduled, status))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+
+        for i, kind in enumerate(kinds):
+
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+
+            if delay > 0:
+                time.sleep(delay)
+
+            pool.submit(fire, i, kind, scheduled)
+
+    elapsed = time.perf_counter() - started
+
+    return {
+        "target_rps": rps,
+        **{kind: summarize(kind_samples, elapsed) for kind, kind_samples in samples.items() if kind_samples},
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Chat/upload throughput, latency and memory vs gunicorn worker count")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16, help="closed-loop chat clients (without --rps)")
+    parser.add_argument("--rps", type=float, help="open-loop mixed upload/chat traffic at this rate")
+    parser.add_argument("--upload-ratio", type=float, default=DEFAULT_UPLOAD_RATIO)
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM time to first token (s)")
+    parser.add_argument("--llm-token-rate", type=float, help="fake LLM tokens per second")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of LLM calls failing with 500")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="share of LLM calls rejected with 429")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    llm_server, llm_url = start_fake_llm_server(
+        latency_s=args.llm_latency,
+        token_delay_s=1 / args.llm_token_rate if args.llm_token_rate else 0.0,
+        error_rate=args.llm_error_rate,
+        rate_limit_rate=args.llm_429_rate,
+    )
+
+    rows = []
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+
+        llm_injected = dict(llm_server.injected)
+
+        with tempfile.TemporaryDirectory(prefix="load_test_store_") as store_dir:
+
+            proc, base_url = start_server(workers, args.threads, llm_url, store_dir)
+
+            try:
+                upload_fixture(base_url)
+
+                with RssSampler(proc.pid) as rss:
+                    if args.rps:
+                        result = run_mixed_load(base_url, args.rps, args.duration, args.upload_ratio, args.max_in_flight)
+                    else:
+                        result = run_chat_load(base_url, args.concurrency, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=60)
+
+        rows.append({
+            "workers": workers,
+            "threads": args.threads,
+            **result,
+            **rss.to_dict(),
+            "llm_injected": {k: v - llm_injected[k] for k, v in llm_server.injected.items()},
+        })
+
+    llm_server.shutdown()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        sys.exit(0)
+
+    print(
+        f"\n{'workers':>8} {'threads':>8} {'kind':>7} {'req':>6} {'err %':>6} {'rps':>8} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>8}"
+    )
+
+    for r in rows:
+        for kind in ("chat", "upload"):
+            if kind not in r:
+                continue
+
+            k = r[kind]
+
+            print(
+                f"{r['workers']:>8} {r['threads']:>8} {kind:>7} {k['requests']:>6} {k['error_rate'] * 100:>6.1f} "
+                f"{k['throughput_rps']:>8} {k['p50_ms']:>9} {k['p95_ms']:>9} {k['p99_ms']:>9} {r['rss_peak_mb']!s:>8}"
+            )
+
+        failing = {kind: r[kind]["statuses"] for kind in ("chat", "upload") if kind in r and r[kind]["errors"]}
+
+        if failing:
+            print(f"{'':>8} statuses: {failing}, fake LLM injected: {r['llm_injected']}")
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# ---------------- CONFIG ----------------
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGET_MODULE = "web_app"
+
+TOP_N = 20
+# ----------------------------------------
+
+
+def profile_imports(module: str):
+    """
+    Import `module` in a fresh interpreter under -X importtime
+    (warm-up disabled) and return per-module self/cumulative times.
+    """
+
+    env = {**os.environ, "WARMUP_ON_START": "0"}
+
+    start = time.perf_counter()
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    wall = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    modules = []
+
+    for line in proc.stderr.splitlines():
+
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+
+        modules.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    return modules, wall
+
+
+def summarize(modules):
+    """
+    Self time rolled up by top-level package (torch, faiss, ...).
+    """
+
+    by_package = defaultdict(float)
+
+    for m in modules:
+        by_package[m["module"].split(".")[0]] += m["self_ms"]
+
+    return sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def profile_warm_up():
+    """
+    Time the background warm-up steps in-process.
+    """
+
+    sys.path.insert(0, ROOT)
+    os.environ["WARMUP_ON_START"] = "0"
+
+    import web_app
+
+    return web_app.agent.warm_up()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Cold-start profile of the backend")
+    parser.add_argument("--module", default=TARGET_MODULE)
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--warm-up", action="store_true", help="also time model warm-up")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    modules, wall = profile_imports(args.module)
+    packages = summarize(modules)
+
+    report = {
+        "module": args.module,
+        "import_wall_s": round(wall, 3),
+        "packages_ms": [{"package": p, "self_ms": round(ms, 1)} for p, ms in packages[:args.top]],
+        "slowest_modules": sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:args.top],
+    }
+
+    if args.warm_up:
+        report["warmup_s"] = profile_warm_up()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+
+    print(f"\nimport {args.module}: {wall:.2f}s wall (fresh interpreter)\n")
+
+    print(f"{'package':<28} {'self ms':>10}")
+    for entry in report["packages_ms"]:
+        print(f"{entry['package']:<28} {entry['self_ms']:>10}")
+
+    print(f"\n{'module':<48} {'cumulative ms':>14}")
+    for m in report["slowest_modules"]:
+        print(f"{m['module']:<48} {m['cumulative_ms']:>14.1f}")
+
+    if args.warm_up:
+        print("\nwarm-up:")
+        for step, seconds in report["warmup_s"].items():
+            print(f"  {step:<24} {seconds:>8.2f}s")
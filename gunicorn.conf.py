@@ -0,0 +1,95 @@
+# =========================================================
+# PRODUCTION SERVING (pre-fork, CPU-only)
+# =========================================================
+#
+#   gunicorn -c gunicorn.conf.py web_app:app
+#
+# The master imports web_app and loads the embedding model and the
+# cross-encoder BEFORE forking, so every worker shares the weights
+# copy-on-write instead of holding its own copy. The active document
+# is published to DOCUMENT_STORE_DIR, which every worker reads.
+#
+# Sizing on CPU-only hosts (C = CPU cores):
+#
+#   WEB_CONCURRENCY   worker processes. Each one runs embedding and
+#                     reranking on its own inference threads, so keep
+#                     WEB_CONCURRENCY * INFERENCE_THREADS
+#                     * TORCH_NUM_THREADS <= C.
+#                     2 vCPU (HF Spaces free tier): 2 workers x 1 thread.
+#                     8 cores: 4 workers x 2 threads.
+#   GUNICORN_THREADS  request threads per worker. Most of a chat is
+#                     spent waiting on the LLM router, so 4-8 threads
+#                     keep workers busy without adding CPU contention;
+#                     they queue for the inference threads.
+#   INFERENCE_THREADS threads per worker that run the models (default 1).
+#   TORCH_NUM_THREADS intra-op threads per inference thread (default:
+#                     C // (WEB_CONCURRENCY * INFERENCE_THREADS), at
+#                     least 1).
+#   INFERENCE_CPU_AFFINITY  optional CPU list for the inference threads.
+#
+# Memory: weights are shared, but each worker holds its own copy of
+# the active FAISS index (~3 KB per chunk for bge-base).
+# =========================================================
+
+import gc
+import os
+
+os.environ.setdefault("DOCUMENT_STORE_DIR", "/tmp/corporate_bot_documents")
+
+# Warm-up happens in the master below, never in a thread before fork
+os.environ.setdefault("WARMUP_ON_START", "0")
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+worker_class = "gthread"
+
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+preload_app = True
+
+# A chat can wait on the LLM router for a long time
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+
+graceful_timeout = 30
+
+keepalive = 5
+
+accesslog = "-"
+
+
+def when_ready(server):
+
+    import web_app
+
+    try:
+        timings = web_app.agent.warm_up(run_models=False)
+        server.log.info(f"Models preloaded before fork: {timings}")
+    except Exception as e:
+        # Workers still load models lazily; they just will not share them
+        server.log.warning(f"Model preload failed, workers will load on demand: {e}")
+
+    # Keep the preloaded objects out of the collector so GC passes in
+    # workers do not touch (and copy) their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+
+    import torch
+
+    cores = os.cpu_count() or 1
+
+    torch.set_num_threads(
+        int(os.getenv("TORCH_NUM_THREADS", max(cores // workers, 1)))
+    )
+
+    import web_app
+
+    # First forward pass per worker, after fork
+    try:
+        web_app.agent.warm_up()
+    except Exception as e:
+        server.log.warning(f"Worker warm-up failed: {e}")
@@ -1,16 +1,183 @@
 import json
 import os
+import re
+
+import numpy as np
+
+from retrieval.models import EMBEDDING_MODEL_NAME as MODEL_NAME
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+DEFAULT_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+_tokenizer = None
+
 
 def load_json(path):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+
+# -------------------------------
+# TOKENIZATION
+# -------------------------------
+
+def load_embedding_tokenizer():
+    """
+    Tokenizer of the embedding model, loaded once.
+    Returns None when it cannot be loaded (e.g. offline),
+    in which case whitespace tokens are used as an approximation.
+    """
+    global _tokenizer
+
+    if _tokenizer is None:
+        try:
+            from transformers import AutoTokenizer
+            _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        except Exception as e:
+            logger.warning("Embedding tokenizer unavailable, using whitespace tokens", extra={"error": str(e)})
+            _tokenizer = False
+
+    return _tokenizer or None
+
+
+def token_spans(text, tokenizer=None):
+    """
+    Character (start, end) offsets of every token in text.
+    """
+    if tokenizer is None:
+        return [m.span() for m in re.finditer(r"\S+", text)]
+
+    encoded = tokenizer(
+        text,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+    )
+
+    return [tuple(span) for span in encoded["offset_mapping"]]
+
+
+def split_section(paragraphs, max_tokens, overlap_tokens, tokenizer=None):
+    """
+    Split one section into token-bounded windows with overlap.
+
+    paragraphs: list of (text, page)
+    Returns a list of (text, pages, token_count). Each window keeps
+    the pages of every paragraph it overlaps.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens.")
+
+    text = "\n".join(p_text for p_text, _ in paragraphs)
+
+    # Character range of each paragraph inside the joined text
+    ranges = []
+    cursor = 0
+    for p_text, p_page in paragraphs:
+        ranges.append((cursor, cursor + len(p_text), p_page))
+        cursor += len(p_text) + 1
+
+    spans = token_spans(text, tokenizer)
+
+    if not spans:
+        return []
+
+    windows = []
+    stride = max_tokens - overlap_tokens
+    start = 0
+
+    while True:
+        end = min(start + max_tokens, len(spans))
+
+        char_start = spans[start][0]
+        char_end = spans[end - 1][1]
+
+        pages = sorted({
+            p_page
+            for p_start, p_end, p_page in ranges
+            if p_page is not None and p_start < char_end and p_end > char_start
+        })
+
+        # A section that fits in one window keeps its original text verbatim
+        window_text = text if len(spans) <= max_tokens else text[char_start:char_end]
+
+        windows.append((window_text, pages, end - start))
+
+        if end == len(spans):
+            break
+
+        start += stride
+
+    return windows
+
+
+def chunk_size_stats(token_counts):
+    if not token_counts:
+        return {"chunks": 0}
+
+    counts = np.asarray(token_counts)
+
+    return {
+        "chunks": int(counts.size),
+        "tokens_min": int(counts.min()),
+        "tokens_max": int(counts.max()),
+        "tokens_mean": round(float(counts.mean()), 1),
+        "tokens_p50": int(np.percentile(counts, 50)),
+        "tokens_p95": int(np.percentile(counts, 95)),
+    }
+
+
+def _make_chunk(chunk_id, section, pages, text, token_count, tables_index, images):
+
+    attached_tables = [
+        t["id"]
+        for t in tables_index
+        if t["page"] in pages
+    ]
+
+    attached_images = [
+        {
+            "page": img["page"],
+            "caption": img["caption"]
+        }
+        for img in images
+        if img["page"] in pages
+    ]
+
+    return {
+        "chunk_id": f"chunk_{chunk_id:03d}",
+        "section": section,
+        "pages": pages,
+        "text": text,
+        "token_count": token_count,
+        "tables": attached_tables,
+        "images": attached_images
+    }
+
+
+# -------------------------------
+# CHUNK BUILDER
+# -------------------------------
+
 def build_chunks(
     text_path,
     tables_index_path,
     images_path,
-    output_path
+    output_path,
+    max_tokens=None,
+    overlap_tokens=None,
+    tokenizer=None
 ):
+    """
+    One or more chunks per Title section, each bounded to max_tokens
+    embedding-tokenizer tokens with overlap_tokens shared between
+    neighbouring windows. Returns chunk-size distribution stats.
+    """
+    max_tokens = max_tokens or DEFAULT_MAX_TOKENS
+    overlap_tokens = DEFAULT_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+
     text_elements = load_json(text_path)
     tables_index = load_json(tables_index_path)
     images = load_json(images_path) if os.path.exists(images_path) else []
@@ -19,43 +186,28 @@ def build_chunks(
 
     current_section = None
     current_text = []
-    current_pages = set()
 
     chunk_id = 0
 
     def flush_chunk():
-        nonlocal chunk_id, current_section, current_text, current_pages
+        nonlocal chunk_id
 
         if not current_section or not current_text:
             return
 
-        pages = sorted(list(current_pages))
-
-        attached_tables = [
-            t["id"]
-            for t in tables_index
-            if t["page"] in pages
-        ]
-
-        attached_images = [
-            {
-                "page": img["page"],
-                "caption": img["caption"]
-            }
-            for img in images
-            if img["page"] in pages
-        ]
-
-        chunk_id += 1
-
-        chunks.append({
-            "chunk_id": f"chunk_{chunk_id:03d}",
-            "section": current_section,
-            "pages": pages,
-            "text": "\n".join(current_text),
-            "tables": attached_tables,
-            "images": attached_images
-        })
+        windows = split_section(current_text, max_tokens, overlap_tokens, tokenizer)
+
+        for window_text, pages, token_count in windows:
+            chunk_id += 1
+            chunks.append(_make_chunk(
+                chunk_id,
+                current_section,
+                pages,
+                window_text,
+                token_count,
+                tables_index,
+                images
+            ))
 
     for el in text_elements:
 
@@ -69,23 +221,29 @@ def build_chunks(
 
             current_section = el_text.strip()
             current_text = []
-            current_pages = set()
 
         elif el_type == "NarrativeText":
 
             if not current_section:
                 continue
 
-            current_text.append(el_text)
-
-            if el_page is not None:
-                current_pages.add(el_page)
+            current_text.append((el_text, el_page))
 
     flush_chunk()
 
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(chunks, f, indent=2, ensure_ascii=False)
 
+    stats = {
+        **chunk_size_stats([c["token_count"] for c in chunks]),
+        "max_tokens": max_tokens,
+        "overlap_tokens": overlap_tokens,
+    }
+
+    logger.info("Chunked document", extra={"chunking": stats})
+
+    return stats
+
 
 if __name__ == "__main__":
 
@@ -93,5 +251,6 @@ if __name__ == "__main__":
         text_path="data/processed/text_elements.json",
         tables_index_path="data/processed/tables_index.json",
         images_path="data/processed/image_semantics.json",
-        output_path="data/processed/chunks.json"
+        output_path="data/processed/chunks.json",
+        tokenizer=load_embedding_tokenizer()
     )
@@ -1,23 +1,34 @@
 import json
 from PIL import Image
-from transformers import BlipProcessor, BlipForConditionalGeneration
+
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+
+_blip = None
 
 # -------------------------------
-# LOAD BLIP ONCE
+# LOAD BLIP ONCE (ON FIRST USE)
 # -------------------------------
 
-processor = BlipProcessor.from_pretrained(
-    "Salesforce/blip-image-captioning-base"
-)
-model = BlipForConditionalGeneration.from_pretrained(
-    "Salesforce/blip-image-captioning-base"
-)
+def load_blip():
+    global _blip
+
+    if _blip is None:
+        from transformers import BlipProcessor, BlipForConditionalGeneration
+
+        _blip = (
+            BlipProcessor.from_pretrained(BLIP_MODEL_NAME),
+            BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME),
+        )
+
+    return _blip
 
 # -------------------------------
 # CAPTION GENERATION
 # -------------------------------
 
 def generate_caption(image_path: str) -> str:
+    processor, model = load_blip()
+
     try:
         image = Image.open(image_path).convert("RGB")
         inputs = processor(image, return_tensors="pt")
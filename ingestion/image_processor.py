@@ -1,11 +1,20 @@
 import json
-from paddleocr import PaddleOCR
+
+_ocr_engine = None
 
 # -------------------------------
-# OCR ENGINE (LOAD ONCE)
+# OCR ENGINE (LOAD ONCE, ON FIRST USE)
 # -------------------------------
 
-ocr_engine = PaddleOCR(use_angle_cls=True, lang="en")
+def load_ocr_engine():
+    global _ocr_engine
+
+    if _ocr_engine is None:
+        from paddleocr import PaddleOCR
+
+        _ocr_engine = PaddleOCR(use_angle_cls=True, lang="en")
+
+    return _ocr_engine
 
 # -------------------------------
 # OCR (RAW SIGNAL ONLY)
@@ -13,7 +22,7 @@ ocr_engine = PaddleOCR(use_angle_cls=True, lang="en")
 
 def extract_ocr(image_path: str):
     try:
-        result = ocr_engine.ocr(image_path, cls=True)
+        result = load_ocr_engine().ocr(image_path, cls=True)
         texts = []
 
         for line in result:
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+from pypdf import PdfReader, PdfWriter
+
+# Bump when parse_pdf / chunking output changes shape so stale
+# cache entries are never mixed with fresh ones.
+CACHE_VERSION = "v2"
+
+DEFAULT_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(),
+    "corporate_bot_cache"
+)
+
+
+# -------------------------------
+# PAGE HASHING
+# -------------------------------
+
+def hash_pdf_pages(pdf_path: str) -> list:
+    """
+    Content hash for every page, in page order.
+    Each page is serialized on its own so an edit to one page
+    never changes the hash of another.
+    """
+    reader = PdfReader(pdf_path)
+
+    hashes = []
+
+    for page in reader.pages:
+        writer = PdfWriter()
+        writer.add_page(page)
+
+        buffer = io.BytesIO()
+        writer.write(buffer)
+
+        digest = hashlib.sha256(CACHE_VERSION.encode("utf-8"))
+        digest.update(buffer.getvalue())
+
+        hashes.append(digest.hexdigest())
+
+    return hashes
+
+
+def write_page_subset(pdf_path: str, page_numbers: list, output_path: str):
+    """
+    Write a PDF containing only the given 1-based pages, in order.
+    """
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+
+    for page_number in page_numbers:
+        writer.add_page(reader.pages[page_number - 1])
+
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+def text_hash(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(CACHE_VERSION.encode("utf-8"))
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# -------------------------------
+# DISK CACHE
+# -------------------------------
+
+class PageCache:
+    """
+    Disk-backed cache of parsed page elements (keyed by page hash)
+    and chunk embeddings (keyed by model + chunk text hash).
+    """
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = (
+            cache_dir
+            or os.getenv("INGESTION_CACHE_DIR")
+            or DEFAULT_CACHE_DIR
+        )
+
+        self.pages_dir = os.path.join(self.cache_dir, "pages")
+        self.embeddings_dir = os.path.join(self.cache_dir, "embeddings")
+
+        os.makedirs(self.pages_dir, exist_ok=True)
+        os.makedirs(self.embeddings_dir, exist_ok=True)
+
+    def get_elements(self, page_hash: str):
+        path = os.path.join(self.pages_dir, f"{page_hash}.json")
+
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_elements(self, page_hash: str, elements: list):
+        path = os.path.join(self.pages_dir, f"{page_hash}.json")
+        self._atomic_write(path, json.dumps(elements, ensure_ascii=False).encode("utf-8"))
+
+    def get_embedding(self, key: str):
+        path = os.path.join(self.embeddings_dir, f"{key}.npy")
+
+        if not os.path.exists(path):
+            return None
+
+        try:
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def put_embedding(self, key: str, vector):
+        path = os.path.join(self.embeddings_dir, f"{key}.npy")
+
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(vector, dtype=np.float32))
+
+        self._atomic_write(path, buffer.getvalue())
+
+    def _atomic_write(self, path: str, data: bytes):
+        # Write-then-rename so concurrent ingestions never read half a file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -1,8 +1,11 @@
-from unstructured.partition.pdf import partition_pdf
 import json
 
+from utils.logger import get_logger
 
-def parse_pdf(pdf_path: str, output_path: str):
+logger = get_logger(__name__)
+
+
+def parse_pdf(pdf_path: str, output_path: str, allow_empty: bool = False):
 
     # ==========================================
     # Production parser
@@ -10,6 +13,9 @@ def parse_pdf(pdf_path: str, output_path: str):
     # OCR engine available but images disabled
     # ==========================================
 
+    # Imported here: unstructured pulls in torch/detectron at import
+    from unstructured.partition.pdf import partition_pdf
+
     elements = partition_pdf(
 
         filename=pdf_path,
@@ -25,7 +31,7 @@ def parse_pdf(pdf_path: str, output_path: str):
     )
 
 
-    if not elements:
+    if not elements and not allow_empty:
 
         raise ValueError("Parser failed: No elements extracted.")
 
@@ -50,7 +56,7 @@ def parse_pdf(pdf_path: str, output_path: str):
             page = el.metadata.page_number
 
 
-        parsed_elements.append({
+        parsed = {
 
             "id": f"el_{order:06d}",
 
@@ -60,6 +66,8 @@ def parse_pdf(pdf_path: str, output_path: str):
 
             "page": page,
 
+            "order": order,
+
             "metadata": {
 
                 "source": "unstructured",
@@ -68,7 +76,23 @@ def parse_pdf(pdf_path: str, output_path: str):
 
             }
 
-        })
+        }
+
+
+        # Tables carry the fields process_tables expects
+
+        if parsed["type"] == "Table":
+
+            table_html = getattr(el.metadata, "text_as_html", None) if el.metadata else None
+
+            parsed["table_type"] = "structured" if table_html else "unstructured"
+
+            parsed["table_html"] = table_html
+
+            parsed["raw_text"] = parsed["text"] or ""
+
+
+        parsed_elements.append(parsed)
 
 
     with open(output_path, "w", encoding="utf-8") as f:
@@ -76,4 +100,4 @@ def parse_pdf(pdf_path: str, output_path: str):
         json.dump(parsed_elements, f, indent=2, ensure_ascii=False)
 
 
-    print(f"Parsed {len(parsed_elements)} elements successfully")
+    logger.info("Parsed PDF", extra={"elements": len(parsed_elements)})
@@ -1,20 +1,171 @@
 ﻿import json
 import os
 import tempfile
+import time
+from contextlib import contextmanager
 
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from pypdf.errors import PyPdfError
 
 from ingestion.pdf_parser import parse_pdf
+from ingestion.page_cache import PageCache, hash_pdf_pages, text_hash, write_page_subset
 from ingestion.router import route_elements
 from ingestion.table_processor import process_tables
-from ingestion.chunker import build_chunks
+from ingestion.chunker import build_chunks, load_embedding_tokenizer
+from retrieval.inference import encode_batched
+from retrieval.models import EMBEDDING_MODEL_NAME as MODEL_NAME, get_embedding_model
+from utils.metrics import counter, histogram
 
-MODEL_NAME = "BAAI/bge-base-en"
+STAGE_SECONDS = histogram("ingestion_stage_seconds", "Time spent in each PDF ingestion stage.", ("stage",))
 
+CACHE_LOOKUPS = counter("ingestion_cache_lookups_total", "Ingestion cache lookups.", ("cache", "result"))
 
-def ingest_pdf_to_runtime(pdf_path: str) -> dict:
+
+@contextmanager
+def _stage(name: str, stats: dict):
+    """
+    Time one ingestion stage into stats["timings_ms"] and the
+    ingestion_stage_seconds histogram.
+    """
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        stats.setdefault("timings_ms", {})[name] = round(seconds * 1000, 1)
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+
+def _parse_incremental(pdf_path: str, work_dir: str, output_path: str, cache: PageCache, stats: dict):
+    """
+    Parse only pages whose content hash is not cached yet and
+    reassemble the full element list in page order.
+    """
+
+    try:
+        page_hashes = hash_pdf_pages(pdf_path)
+    except PyPdfError:
+        # Unreadable by pypdf (e.g. encrypted): fall back to a full parse
+        parse_pdf(pdf_path=pdf_path, output_path=output_path)
+        stats["pages_recomputed"] = stats["pages_total"] = len({
+            el.get("page") for el in _load(output_path)
+        })
+        return
+
+    stats["pages_total"] = len(page_hashes)
+
+    elements_by_page = {}
+    changed_pages = []
+
+    for page_number, page_hash in enumerate(page_hashes, start=1):
+
+        cached = cache.get_elements(page_hash)
+
+        if cached is None:
+            changed_pages.append(page_number)
+        else:
+            elements_by_page[page_number] = cached
+
+    if changed_pages:
+
+        subset_path = os.path.join(work_dir, "changed_pages.pdf")
+        subset_parsed_path = os.path.join(work_dir, "changed_pages_parsed.json")
+
+        write_page_subset(pdf_path, changed_pages, subset_path)
+
+        parse_pdf(
+            pdf_path=subset_path,
+            output_path=subset_parsed_path,
+            allow_empty=True,
+        )
+
+        fresh_by_page = {page_number: [] for page_number in changed_pages}
+
+        for el in _load(subset_parsed_path):
+
+            if el.get("page") is None:
+                continue
+
+            # Subset page N is original page changed_pages[N - 1]
+            fresh_by_page[changed_pages[el["page"] - 1]].append(el)
+
+        for page_number, elements in fresh_by_page.items():
+            cache.put_elements(page_hashes[page_number - 1], elements)
+            elements_by_page[page_number] = elements
+
+    stats["pages_recomputed"] = len(changed_pages)
+    stats["pages_reused"] = len(page_hashes) - len(changed_pages)
+
+    parsed_elements = []
+
+    for page_number in sorted(elements_by_page):
+        for el in elements_by_page[page_number]:
+            order = len(parsed_elements) + 1
+
+            parsed_elements.append({
+                **el,
+                "id": f"el_{order:06d}",
+                "order": order,
+                "page": page_number,
+            })
+
+    if not parsed_elements:
+        raise ValueError("Parser failed: No elements extracted.")
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(parsed_elements, f, indent=2, ensure_ascii=False)
+
+
+def _embed_with_cache(texts: list, cache: PageCache, stats: dict):
+
+    keys = [text_hash(MODEL_NAME, text) for text in texts]
+
+    vectors = [cache.get_embedding(key) for key in keys]
+
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+
+        model = get_embedding_model(MODEL_NAME)
+
+        fresh = encode_batched(
+            "ingest",
+            model,
+            [texts[i] for i in missing],
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+
+        for i, vector in zip(missing, fresh):
+            vectors[i] = vector
+            cache.put_embedding(keys[i], vector)
+
+    stats["chunks_embedded"] = len(missing)
+    stats["chunks_reused"] = len(texts) - len(missing)
+
+    return np.vstack(vectors).astype(np.float32)
+
+
+def _load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ingest_pdf_to_runtime(pdf_path: str, cache: PageCache = None, max_tokens: int = None, overlap_tokens: int = None) -> dict:
+    """
+    Index, chunk metadata, tables and stats of one PDF. max_tokens and
+    overlap_tokens override the chunker defaults (CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP_TOKENS).
+    """
+
+    cache = cache or PageCache()
+
+    stats = {
+        "pages_total": 0,
+        "pages_reused": 0,
+        "pages_recomputed": 0,
+    }
 
     with tempfile.TemporaryDirectory(prefix="runtime_ingestion_") as work_dir:
 
@@ -26,22 +177,32 @@ def ingest_pdf_to_runtime(pdf_path: str) -> dict:
         chunks_path = os.path.join(work_dir, "chunks.json")
         missing_images_path = os.path.join(work_dir, "image_semantics.json")
 
-        parse_pdf(pdf_path=pdf_path, output_path=parsed_path)
+        with _stage("parse", stats):
+            _parse_incremental(pdf_path, work_dir, parsed_path, cache, stats)
 
-        route_elements(input_path=parsed_path, output_dir=work_dir)
+        CACHE_LOOKUPS.inc(stats["pages_reused"], cache="page", result="hit")
+        CACHE_LOOKUPS.inc(stats["pages_recomputed"], cache="page", result="miss")
 
-        process_tables(
-            input_path=table_elements_path,
-            raw_output_path=tables_raw_path,
-            index_output_path=tables_index_path,
-        )
+        with _stage("route", stats):
+            route_elements(input_path=parsed_path, output_dir=work_dir)
 
-        build_chunks(
-            text_path=text_elements_path,
-            tables_index_path=tables_index_path,
-            images_path=missing_images_path,
-            output_path=chunks_path,
-        )
+        with _stage("tables", stats):
+            process_tables(
+                input_path=table_elements_path,
+                raw_output_path=tables_raw_path,
+                index_output_path=tables_index_path,
+            )
+
+        with _stage("chunk", stats):
+            stats["chunking"] = build_chunks(
+                text_path=text_elements_path,
+                tables_index_path=tables_index_path,
+                images_path=missing_images_path,
+                output_path=chunks_path,
+                max_tokens=max_tokens,
+                overlap_tokens=overlap_tokens,
+                tokenizer=load_embedding_tokenizer(),
+            )
 
         with open(chunks_path, "r", encoding="utf-8") as f:
             chunks = json.load(f)
@@ -63,6 +224,7 @@ def ingest_pdf_to_runtime(pdf_path: str) -> dict:
                     "chunk_id": chunk["chunk_id"],
                     "section": chunk["section"],
                     "pages": chunk["pages"],
+                    "token_count": chunk["token_count"],
                     "tables": chunk["tables"],
                     "images": chunk["images"],
                     "chunk_text": chunk_text,
@@ -72,22 +234,24 @@ def ingest_pdf_to_runtime(pdf_path: str) -> dict:
         if not texts:
             raise ValueError("No text chunks extracted from uploaded PDF.")
 
-        model = SentenceTransformer(MODEL_NAME)
+        with _stage("embed", stats):
+            embeddings = _embed_with_cache(texts, cache, stats)
 
-        embeddings = model.encode(
-            texts,
-            normalize_embeddings=True,
-            show_progress_bar=False,
-        )
+        CACHE_LOOKUPS.inc(stats["chunks_reused"], cache="embedding", result="hit")
+        CACHE_LOOKUPS.inc(stats["chunks_embedded"], cache="embedding", result="miss")
+
+        import faiss
 
-        dim = embeddings.shape[1]
+        with _stage("index", stats):
+            dim = embeddings.shape[1]
 
-        index = faiss.IndexFlatIP(dim)
+            index = faiss.IndexFlatIP(dim)
 
-        index.add(np.asarray(embeddings, dtype=np.float32))
+            index.add(embeddings)
 
         return {
             "index": index,
             "metadata": metadata,
             "tables": tables_raw,
+            "stats": stats,
         }
@@ -1,5 +1,7 @@
 import json
 
+from ingestion.table_renderer import compact_text, render_table
+
 
 def generate_table_summary(table):
     """
@@ -42,19 +44,28 @@ def process_tables(input_path, raw_output_path, index_output_path):
         # STRUCTURED TABLE (HTML)
         # -------------------------------
         if table["table_type"] == "structured":
-            tables_raw.append({
+            entry = {
                 **base,
                 "table_html": table["table_html"]
-            })
+            }
+            table_prompt = render_table(table["table_html"]) or compact_text(table.get("raw_text", ""))
 
         # -------------------------------
         # UNSTRUCTURED TABLE (FALLBACK)
         # -------------------------------
         else:
-            tables_raw.append({
+            entry = {
                 **base,
                 "raw_text": table.get("raw_text", "")
-            })
+            }
+            table_prompt = compact_text(table.get("raw_text", ""))
+
+        # -------------------------------
+        # PROMPT RENDERING (QUERY-TIME READY)
+        # -------------------------------
+        entry["table_prompt"] = table_prompt
+
+        tables_raw.append(entry)
 
         # -------------------------------
         # INDEX ENTRY (RETRIEVAL ONLY)
@@ -0,0 +1,214 @@
+import os
+import re
+from html.parser import HTMLParser
+
+TABLE_PROMPT_FORMAT = os.getenv("TABLE_PROMPT_FORMAT", "markdown")
+
+
+# -------------------------------
+# HTML TABLE PARSING
+# -------------------------------
+
+class _TableParser(HTMLParser):
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.in_thead = False
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if tag == "thead":
+            self.in_thead = True
+
+        elif tag == "tr":
+            self._row = {"cells": [], "in_thead": self.in_thead}
+
+        elif tag in ("td", "th"):
+            if self._row is None:
+                self._row = {"cells": [], "in_thead": self.in_thead}
+
+            self._cell = {
+                "text": [],
+                "header": tag == "th",
+                "colspan": _span(attrs.get("colspan")),
+                "rowspan": _span(attrs.get("rowspan")),
+            }
+
+        elif tag == "br" and self._cell is not None:
+            self._cell["text"].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "thead":
+            self.in_thead = False
+
+        elif tag in ("td", "th") and self._cell is not None:
+            self._cell["text"] = " ".join("".join(self._cell["text"]).split())
+            self._row["cells"].append(self._cell)
+            self._cell = None
+
+        elif tag == "tr" and self._row is not None:
+            if self._row["cells"]:
+                self.rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell["text"].append(data)
+
+    def close(self):
+        super().close()
+        # Tolerate a missing closing </tr>
+        if self._row is not None and self._row["cells"]:
+            self.rows.append(self._row)
+            self._row = None
+
+
+def _span(value):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def parse_html_table(html: str):
+    """
+    Parse table HTML into (header_rows, body_rows) of equal width.
+
+    colspan/rowspan are expanded into a grid. Spanned header cells
+    repeat their text so every column carries its full header path.
+    """
+    parser = _TableParser()
+    parser.feed(html or "")
+    parser.close()
+
+    grid = []
+    header_flags = []
+    pending = {}  # column -> (text, remaining rows) from rowspan
+
+    for row in parser.rows:
+        is_header = row["in_thead"] or all(c["header"] for c in row["cells"])
+
+        out = []
+        col = 0
+
+        for cell in row["cells"]:
+            while col in pending:
+                out.append(_take_pending(pending, col))
+                col += 1
+
+            for offset in range(cell["colspan"]):
+                # Body colspans keep the value once; headers repeat it
+                text = cell["text"] if (offset == 0 or is_header) else ""
+                out.append(text)
+
+                if cell["rowspan"] > 1:
+                    pending[col] = (cell["text"], cell["rowspan"] - 1)
+
+                col += 1
+
+        while col in pending:
+            out.append(_take_pending(pending, col))
+            col += 1
+
+        grid.append(out)
+        header_flags.append(is_header)
+
+    if not grid:
+        return [], []
+
+    width = max(len(r) for r in grid)
+    grid = [r + [""] * (width - len(r)) for r in grid]
+
+    # Leading header rows; without any markup the first row is the header
+    header_count = 0
+    while header_count < len(grid) and header_flags[header_count]:
+        header_count += 1
+
+    if header_count == 0:
+        header_count = 1
+
+    return grid[:header_count], grid[header_count:]
+
+
+def _take_pending(pending, col):
+    text, remaining = pending[col]
+
+    if remaining <= 1:
+        del pending[col]
+    else:
+        pending[col] = (text, remaining - 1)
+
+    return text
+
+
+def merge_header_rows(header_rows):
+    """
+    Collapse stacked header rows into one, e.g. "FY25 / Revenue".
+    """
+    if not header_rows:
+        return []
+
+    merged = []
+
+    for column in zip(*header_rows):
+        parts = []
+        for part in column:
+            if part and part not in parts:
+                parts.append(part)
+        merged.append(" / ".join(parts))
+
+    return merged
+
+
+# -------------------------------
+# PROMPT RENDERING
+# -------------------------------
+
+def render_table(html: str, fmt: str = None) -> str:
+    """
+    Compact prompt rendering of an HTML table (Markdown or TSV).
+    Columns that are empty in every row are dropped.
+    """
+    fmt = fmt or TABLE_PROMPT_FORMAT
+
+    header_rows, body_rows = parse_html_table(html)
+
+    header = merge_header_rows(header_rows)
+
+    if not header:
+        return ""
+
+    keep = [
+        i for i in range(len(header))
+        if header[i] or any(row[i] for row in body_rows)
+    ]
+
+    header = [header[i] for i in keep]
+    body_rows = [[row[i] for i in keep] for row in body_rows]
+    body_rows = [row for row in body_rows if any(row)]
+
+    if fmt == "tsv":
+        return "\n".join(
+            "\t".join(cell.replace("\t", " ") for cell in row)
+            for row in [header] + body_rows
+        )
+
+    def md_row(cells):
+        return "| " + " | ".join(cell.replace("|", "\\|") for cell in cells) + " |"
+
+    lines = [md_row(header), "|" + "---|" * len(header)]
+    lines.extend(md_row(row) for row in body_rows)
+
+    return "\n".join(lines)
+
+
+def compact_text(raw_text: str) -> str:
+    """
+    Whitespace-normalized rendering for tables without structure.
+    """
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in (raw_text or "").splitlines()]
+    return "\n".join(line for line in lines if line)
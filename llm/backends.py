@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+from utils.metrics import counter
+
+# error: HTTP status, "network" (timeout / connection) or "circuit_open"
+UPSTREAM_ERRORS = counter("llm_upstream_errors_total", "Failed LLM upstream calls.", ("model", "error"))
+
+RETRIES = counter("llm_retries_total", "LLM upstream calls retried after a failure.", ("model",))
+
+
+class LLMError(Exception):
+    """Base error for every generation backend."""
+    pass
+
+
+class LLMDeadlineError(LLMError):
+    """Raised when the request deadline leaves no time to generate."""
+    pass
+
+
+class LLMBackend:
+    """
+    Common generation contract shared by the HF router and Ollama.
+
+    - generate()  -> full completion (blocking)
+    - agenerate() -> full completion (awaitable)
+    - stream()    -> completion chunks as they arrive
+
+    `deadline` is an absolute time.monotonic(). Failures raise
+    LLMError, or LLMDeadlineError when time ran out.
+    """
+
+    generation_model = None
+
+    def generate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ) -> str:
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, **params) -> str:
+        # Fallback for backends without a native async client
+        return await asyncio.to_thread(self.generate, prompt, **params)
+
+    def stream(self, prompt: str, **params):
+        # Fallback for backends that cannot stream: one chunk
+        yield self.generate(prompt, **params)
+
+    def warm_up(self):
+        """Load the model ahead of the first request, if the backend can."""
+        return None
+
+
+def create_backend(api_token: str = None, timeout: int = None, backend: str = None) -> LLMBackend:
+    """
+    Generation backend selected by LLM_BACKEND:
+    "hf" (HF router, default) or "ollama" (local server).
+    """
+
+    backend = (backend or os.getenv("LLM_BACKEND", "hf")).lower()
+
+    if backend == "ollama":
+        from llm.ollama_client import OllamaClient
+        return OllamaClient(timeout=timeout)
+
+    if backend == "hf":
+        from llm.generation_policy import GenerationPolicy
+        return GenerationPolicy.from_env(api_token=api_token, timeout=timeout)
+
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from utils.metrics import counter
+
+DEFAULT_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(),
+    "corporate_bot_completions"
+)
+
+COMPLETION_CACHE = os.getenv("COMPLETION_CACHE", "0") == "1"
+
+# Only near-deterministic generations are worth replaying
+MAX_CACHEABLE_TEMPERATURE = float(os.getenv("COMPLETION_CACHE_MAX_TEMPERATURE", "0.3"))
+
+# Size limits are enforced every EVICTION_INTERVAL writes
+EVICTION_INTERVAL = 50
+
+
+def completion_key(backend: str, payload: dict) -> str:
+    """
+    Hash of the full request payload: model, prompt and generation
+    params all change the key.
+    """
+    digest = hashlib.sha256(backend.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CompletionCache:
+    """
+    Disk-backed prompt -> completion cache with a TTL and a size cap.
+    One JSON file per entry, so every worker process shares it.
+    Least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, ttl_s: float = None):
+        self.cache_dir = (
+            cache_dir
+            or os.getenv("COMPLETION_CACHE_DIR")
+            or DEFAULT_CACHE_DIR
+        )
+
+        self.max_bytes = int(max_bytes or float(os.getenv("COMPLETION_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self.ttl_s = float(ttl_s or os.getenv("COMPLETION_CACHE_TTL_S", "86400"))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_s:
+            self._remove(path)
+            with self._lock:
+                self.expired += 1
+                self.misses += 1
+            return None
+
+        # mtime doubles as last-access time for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+
+        return entry.get("completion")
+
+    def put(self, key: str, completion: str, model: str = None):
+        if not completion:
+            return
+
+        entry = {
+            "model": model,
+            "created_at": time.time(),
+            "completion": completion,
+        }
+
+        self._atomic_write(self._path(key), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICTION_INTERVAL == 0
+
+        if due:
+            self.enforce_limits()
+
+    def enforce_limits(self):
+        """
+        Drop expired entries, then the least recently used ones until
+        the cache fits in max_bytes.
+        """
+        entries = []
+        now = time.time()
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+
+            path = os.path.join(self.cache_dir, name)
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for mtime, size, path in entries:
+            # Not touched for a whole TTL means created before it too
+            if total <= self.max_bytes and now - mtime <= self.ttl_s:
+                continue
+
+            self._remove(path)
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self.evictions += removed
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _atomic_write(self, path: str, data: bytes):
+        # Write-then-rename so concurrent workers never read half a file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache():
+    """
+    Process-wide cache, or None when COMPLETION_CACHE is off.
+    """
+    global _cache
+
+    if not COMPLETION_CACHE:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache()
+        return _cache
+
+
+def completion_cache_snapshot():
+    return _cache.snapshot() if _cache is not None else None
+
+
+def _lookups():
+    snapshot = completion_cache_snapshot()
+
+    if snapshot is None:
+        return {}
+
+    return {"hit": snapshot["hits"], "miss": snapshot["misses"]}
+
+
+counter("llm_completion_cache_lookups_total", "Completion cache lookups by result.", ("result",), function=_lookups)
@@ -0,0 +1,463 @@
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm.backends import LLMBackend, LLMDeadlineError, LLMError
+from llm.hf_inference_client import HFInferenceClient
+from llm.retry_policy import RetryPolicy
+from utils.metrics import counter
+
+# Hedge delay before a model has enough latency samples
+DEFAULT_HEDGE_DELAY_S = float(os.getenv("LLM_HEDGE_DELAY_S", "3"))
+
+# Bounds for the p95-based hedge delay
+MIN_HEDGE_DELAY_S = float(os.getenv("LLM_HEDGE_MIN_DELAY_S", "0.5"))
+MAX_HEDGE_DELAY_S = float(os.getenv("LLM_HEDGE_MAX_DELAY_S", "15"))
+
+# Samples needed before a model's own latencies are trusted
+MIN_SAMPLES = 5
+
+STATS_WINDOW = 100
+
+# Threads for the blocking path; the loser of a hedge keeps its thread
+# until the upstream answers
+HEDGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "32")),
+    thread_name_prefix="llm-hedge",
+)
+
+
+# -------------------------------
+# PER-MODEL STATS
+# -------------------------------
+
+class ModelStats:
+    """
+    Sliding window of latencies and outcomes for one model/endpoint.
+    """
+
+    def __init__(self, name: str, window: int = STATS_WINDOW):
+        self.name = name
+
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+        self.requests_total = 0
+        self.errors_total = 0
+        self.hedges_total = 0
+        self.wins_total = 0
+
+    def record_success(self, latency_s: float):
+        with self._lock:
+            self.requests_total += 1
+            self.latencies.append(latency_s)
+            self.outcomes.append(True)
+
+    def record_error(self):
+        with self._lock:
+            self.requests_total += 1
+            self.errors_total += 1
+            self.outcomes.append(False)
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedges_total += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins_total += 1
+
+    def percentile(self, q: float):
+        """Latency percentile in seconds, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self.latencies)
+
+        if len(samples) < MIN_SAMPLES:
+            return None
+
+        return samples[min(int(math.ceil(q / 100 * len(samples))) - 1, len(samples) - 1)]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+
+        with self._lock:
+            counts = {
+                "requests_total": self.requests_total,
+                "errors_total": self.errors_total,
+                "hedges_total": self.hedges_total,
+                "wins_total": self.wins_total,
+            }
+
+        return {
+            "name": self.name,
+            **counts,
+            "error_rate": round(self.error_rate(), 3),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_model_stats(name: str) -> ModelStats:
+    """
+    Process-wide stats per upstream, shared by every policy instance.
+    """
+    with _stats_lock:
+        if name not in _stats:
+            _stats[name] = ModelStats(name)
+        return _stats[name]
+
+
+def model_stats_snapshots() -> list:
+    with _stats_lock:
+        stats = list(_stats.values())
+    return [s.snapshot() for s in stats]
+
+
+def parse_model_list(value: str, default_url: str = None):
+    """
+    "model-a,model-b@https://host/v1/chat/completions" ->
+    [("model-a", default_url), ("model-b", "https://host/...")]
+    """
+    entries = []
+
+    for item in (value or "").split(","):
+        item = item.strip()
+
+        if not item:
+            continue
+
+        model, _, url = item.partition("@")
+        entries.append((model.strip(), url.strip() or default_url))
+
+    return entries
+
+
+# -------------------------------
+# GENERATION POLICY
+# -------------------------------
+
+class GenerationPolicy(LLMBackend):
+    """
+    Generation over an ordered list of models/endpoints.
+
+    - The healthiest model (breaker closed, low error rate, low p50)
+      is tried first.
+    - If it has not answered after its p95 latency, a hedge request
+      goes to the next model; the first answer wins and the other
+      request is cancelled.
+    - A model that fails hands over to the next one right away.
+
+    Works over any LLMBackend clients, and is one itself.
+    """
+
+    def __init__(self, clients: list, hedge_delay: float = None):
+        if not clients:
+            raise ValueError("At least one generation client is required.")
+
+        self.clients = clients
+        self.hedge_delay = hedge_delay
+        self.deadline_s = RetryPolicy().deadline_s
+
+    @classmethod
+    def from_env(cls, api_token: str = None, timeout: int = None):
+        """
+        HF_GENERATION_MODELS (comma-separated, optional "@url" per
+        entry) or, when unset, the single HF_GENERATION_MODEL.
+        """
+        default_model = os.getenv("HF_GENERATION_MODEL", "meta-llama/Llama-3.2-1B-Instruct:novita")
+
+        entries = parse_model_list(os.getenv("HF_GENERATION_MODELS")) or [(default_model, None)]
+
+        return cls([
+            HFInferenceClient(
+                api_token=api_token,
+                generation_model=model,
+                timeout=timeout,
+                url=url,
+            )
+            for model, url in entries
+        ])
+
+    @property
+    def generation_model(self) -> str:
+        return self.clients[0].generation_model
+
+    def stats(self, client) -> ModelStats:
+        return get_model_stats(client.name)
+
+    def ordered(self) -> list:
+        """
+        Clients best-first. Configured order breaks ties, so models
+        without enough samples keep their place.
+        """
+
+        def key(item):
+            position, client = item
+            stats = self.stats(client)
+            p50 = stats.percentile(50)
+            breaker = getattr(client, "breaker", None)
+
+            return (
+                breaker is not None and breaker.is_open,
+                stats.error_rate() >= 0.5,
+                p50 if p50 is not None else math.inf,
+                position,
+            )
+
+        return [client for _, client in sorted(enumerate(self.clients), key=key)]
+
+    def hedge_delay_for(self, client) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+
+        p95 = self.stats(client).percentile(95)
+
+        if p95 is None:
+            return DEFAULT_HEDGE_DELAY_S
+
+        return min(max(p95, MIN_HEDGE_DELAY_S), MAX_HEDGE_DELAY_S)
+
+    def _call(self, client, prompt, deadline, params):
+
+        start = time.monotonic()
+
+        try:
+            answer = client.generate(prompt, deadline=deadline, **params)
+        except LLMError:
+            self.stats(client).record_error()
+            raise
+
+        self.stats(client).record_success(time.monotonic() - start)
+
+        return answer
+
+    async def _acall(self, client, prompt, deadline, params):
+
+        start = time.monotonic()
+
+        try:
+            answer = await client.agenerate(prompt, deadline=deadline, **params)
+        except LLMError:
+            self.stats(client).record_error()
+            raise
+
+        self.stats(client).record_success(time.monotonic() - start)
+
+        return answer
+
+    def _wait_timeout(self, pending, remaining_clients, hedge_at, deadline):
+        """
+        Seconds to wait for an answer before hedging (or giving up).
+        """
+        now = time.monotonic()
+
+        if len(pending) == 1 and remaining_clients:
+            return max(min(hedge_at, deadline) - now, 0)
+
+        return max(deadline - now, 0)
+
+    def _failure(self, errors, deadline):
+
+        if time.monotonic() >= deadline or (
+            errors and all(isinstance(e, LLMDeadlineError) for e in errors)
+        ):
+            return LLMDeadlineError("Generation deadline exceeded on every model")
+
+        return LLMError(f"All generation models failed: {errors}")
+
+    def generate(self, prompt: str, deadline: float = None, **params) -> str:
+
+        order = self.ordered()
+
+        if len(order) == 1:
+            return self._call(order[0], prompt, deadline, params)
+
+        deadline = deadline or time.monotonic() + self.deadline_s
+
+        pending = {}
+        errors = []
+        hedge_at = None
+
+        def launch(hedge=False):
+            nonlocal hedge_at
+            client = order.pop(0)
+            if hedge:
+                self.stats(client).record_hedge()
+            # Copy the context so the call keeps the request id and trace
+            context = contextvars.copy_context()
+            pending[HEDGE_EXECUTOR.submit(context.run, self._call, client, prompt, deadline, params)] = client
+            hedge_at = time.monotonic() + self.hedge_delay_for(client)
+
+        launch()
+
+        while pending:
+
+            done, _ = wait(
+                pending,
+                timeout=self._wait_timeout(pending, order, hedge_at, deadline),
+                return_when=FIRST_COMPLETED,
+            )
+
+            if not done:
+
+                if time.monotonic() >= deadline:
+                    break
+
+                # Slow, not failed: race a second model against it
+                if len(pending) == 1 and order:
+                    launch(hedge=True)
+
+                continue
+
+            for future in done:
+
+                client = pending.pop(future)
+
+                try:
+                    answer = future.result()
+                except LLMError as e:
+                    errors.append(e)
+                    continue
+
+                # A running blocking call cannot be interrupted; it
+                # finishes in the background and only updates stats
+                for other in pending:
+                    other.cancel()
+
+                self.stats(client).record_win()
+
+                return answer
+
+            # Failed with nothing else in flight: next model
+            if not pending and order:
+                launch()
+
+        raise self._failure(errors, deadline)
+
+    def stream(self, prompt: str, deadline: float = None, **params):
+        """
+        Streams from the best model. Falls over to the next one only
+        before the first chunk; a stream is never hedged.
+        """
+
+        errors = []
+
+        for client in self.ordered():
+
+            started = False
+
+            try:
+
+                for chunk in client.stream(prompt, deadline=deadline, **params):
+                    started = True
+                    yield chunk
+
+                return
+
+            except LLMError as e:
+
+                self.stats(client).record_error()
+
+                if started:
+                    raise
+
+                errors.append(e)
+
+        raise self._failure(errors, deadline or math.inf)
+
+    async def agenerate(self, prompt: str, deadline: float = None, **params) -> str:
+
+        order = self.ordered()
+
+        if len(order) == 1:
+            return await self._acall(order[0], prompt, deadline, params)
+
+        deadline = deadline or time.monotonic() + self.deadline_s
+
+        pending = {}
+        errors = []
+        hedge_at = None
+
+        def launch(hedge=False):
+            nonlocal hedge_at
+            client = order.pop(0)
+            if hedge:
+                self.stats(client).record_hedge()
+            pending[asyncio.ensure_future(self._acall(client, prompt, deadline, params))] = client
+            hedge_at = time.monotonic() + self.hedge_delay_for(client)
+
+        launch()
+
+        try:
+
+            while pending:
+
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._wait_timeout(pending, order, hedge_at, deadline),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+
+                    if time.monotonic() >= deadline:
+                        break
+
+                    if len(pending) == 1 and order:
+                        launch(hedge=True)
+
+                    continue
+
+                for task in done:
+
+                    client = pending.pop(task)
+
+                    try:
+                        answer = task.result()
+                    except LLMError as e:
+                        errors.append(e)
+                        continue
+
+                    self.stats(client).record_win()
+
+                    return answer
+
+                if not pending and order:
+                    launch()
+
+        finally:
+
+            # Losing (or abandoned) requests are cancelled for real here
+            for task in pending:
+                task.cancel()
+
+            # Let them unwind before returning: a cancelled client call
+            # releases its half-open breaker probe on the way out
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        raise self._failure(errors, deadline)
+
+
+counter(
+    "llm_hedges_total",
+    "Hedged (duplicate) requests sent to a backup model.",
+    ("model",),
+    function=lambda: {s["name"]: s["hedges_total"] for s in model_stats_snapshots()},
+)
@@ -1,9 +1,18 @@
-﻿import os
+﻿import asyncio
+import json
+import os
 import time
 from typing import Any
 
+import httpx
 import requests
 
+from llm.backends import RETRIES, UPSTREAM_ERRORS, LLMBackend, LLMDeadlineError, LLMError
+from llm.completion_cache import MAX_CACHEABLE_TEMPERATURE, completion_key, get_completion_cache
+from llm.rate_limiter import estimate_tokens, get_rate_limiter
+from llm.retry_policy import RETRYABLE_STATUS, RetryPolicy, get_circuit_breaker, parse_retry_after
+from utils.logger import current_trace, get_logger
+
 # Safe dotenv loading (won't crash in CI)
 try:
     from dotenv import load_dotenv
@@ -11,13 +20,25 @@ try:
 except Exception:
     pass
 
+logger = get_logger(__name__)
+
 
-class HFGenerationError(Exception):
+class HFGenerationError(LLMError):
     """Custom exception for HuggingFace generation errors."""
     pass
 
 
-class HFInferenceClient:
+class CircuitOpenError(HFGenerationError):
+    """Raised without calling the upstream while its circuit is open."""
+    pass
+
+
+class HFDeadlineError(HFGenerationError, LLMDeadlineError):
+    """Raised when the request deadline leaves no time for (another) attempt."""
+    pass
+
+
+class HFInferenceClient(LLMBackend):
 
     def __init__(
         self,
@@ -25,6 +46,7 @@ class HFInferenceClient:
         generation_model: str = None,
         timeout: int = None,
         max_retries: int = None,
+        url: str = None,
     ):
         """
         Initialize HF client safely.
@@ -51,12 +73,30 @@ class HFInferenceClient:
         )
 
         # HF router endpoint
-        self.url = os.getenv(
+        self.url = url or os.getenv(
             "HF_INFERENCE_V1_URL",
             "https://router.huggingface.co/v1/chat/completions"
         )
 
-        print("HF Model:", self.generation_model)
+        # Identifies this upstream in breaker and latency stats
+        self.name = f"{self.url}#{self.generation_model}"
+
+        self.retry_policy = RetryPolicy()
+
+        # Shared by every client that targets the same upstream model
+        self.breaker = get_circuit_breaker(self.name)
+
+        # Requests/tokens per minute budget, shared by every worker on the host
+        self.rate_limiter = get_rate_limiter(self.url)
+
+        # Disk-backed prompt -> completion cache (None when disabled)
+        self.cache = get_completion_cache()
+
+        # Created on first agenerate() call
+        self._async_client = None
+        self._async_loop = None
+
+        logger.info("HF client ready", extra={"model": self.generation_model, "url": self.url})
 
     # ------------------------------------------------
     # Extract response text safely
@@ -84,13 +124,13 @@ class HFInferenceClient:
     # Generate text
     # ------------------------------------------------
 
-    def generate(
+    def _build_request(
         self,
         prompt: str,
-        max_new_tokens: int = 256,
-        temperature: float = 0.1,
-        top_p: float = 0.9
-    ) -> str:
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float
+    ):
 
         # ✅ Validate token HERE (not in __init__)
         if not self.api_token:
@@ -117,49 +157,500 @@ class HFInferenceClient:
             "top_p": top_p,
         }
 
-        for attempt in range(self.max_retries):
+        return headers, payload
 
-            try:
+    def _cache_key(self, payload, temperature):
+
+        if self.cache is None or temperature > MAX_CACHEABLE_TEMPERATURE:
+            return None
+
+        return completion_key(self.url, payload)
+
+    def _start(self, deadline):
+        """
+        Fail fast while the upstream circuit is open; otherwise
+        return the absolute (monotonic) deadline for this request and
+        its breaker ticket (release it with breaker.release_probe()
+        on every way out).
+        """
+
+        probe = self.breaker.acquire()
+
+        if probe is None:
+
+            UPSTREAM_ERRORS.inc(model=self.generation_model, error="circuit_open")
+
+            raise CircuitOpenError(
+                "Model temporarily unavailable"
+            )
+
+        return deadline or time.monotonic() + self.retry_policy.deadline_s, probe
+
+    def _rate_limited(self, admitted):
+        """
+        Raise when the client-side rate limit would hold the request
+        past its deadline.
+        """
+
+        if not admitted:
+
+            UPSTREAM_ERRORS.inc(model=self.generation_model, error="rate_limited")
+
+            raise HFDeadlineError(
+                "Rate limit wait would pass the deadline"
+            )
+
+    def _attempt_timeout(self, deadline):
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            return None
+
+        return min(self.timeout, remaining)
+
+    def _record_attempt(self, attempt, started, status=None, error=None):
+        """
+        Log one upstream attempt and add it to the request trace.
+        """
+
+        seconds = time.perf_counter() - started
+
+        fields = {
+            "model": self.generation_model,
+            "attempt": attempt + 1,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 1),
+        }
+
+        if error:
+            fields["error"] = error
+
+        trace = current_trace()
+
+        if trace is not None:
+            trace.add_span("llm_attempt", started, seconds, **fields)
+
+        if error or status is None or status >= 400:
+            logger.warning("HF attempt failed", extra=fields)
+        else:
+            logger.debug("HF attempt succeeded", extra=fields)
+
+    def _retry_delay(self, attempt, status, retry_after, deadline):
+        """
+        Seconds to wait before the next attempt, or None to give up.
+        Non-retryable client errors raise immediately.
+        """
+
+        UPSTREAM_ERRORS.inc(
+            model=self.generation_model,
+            error=status if status is not None else "network"
+        )
+
+        if status is not None and status not in RETRYABLE_STATUS:
+
+            # The upstream answered; the request itself is bad
+            self.breaker.record_success()
+
+            raise HFGenerationError(
+                f"HF request rejected with status {status}"
+            )
+
+        self.breaker.record_failure()
+
+        if self.breaker.is_open or attempt + 1 >= self.max_retries:
+            return None
+
+        delay = self.retry_policy.backoff(attempt, parse_retry_after(retry_after))
+
+        if time.monotonic() + delay >= deadline:
+
+            raise HFDeadlineError(
+                f"Retry in {delay:.1f}s would pass the deadline"
+            )
+
+        RETRIES.inc(model=self.generation_model)
+
+        return delay
+
+    def generate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ) -> str:
+        """
+        deadline: absolute time.monotonic() by which the whole call,
+        retries included, must finish (default HF_REQUEST_DEADLINE).
+        """
+
+        headers, payload = self._build_request(
+            prompt, max_new_tokens, temperature, top_p
+        )
+
+        # Replayed even while the upstream circuit is open
+        cache_key = self._cache_key(payload, temperature)
+
+        if cache_key:
+
+            cached = self.cache.get(cache_key)
+
+            if cached is not None:
+                return cached
+
+        deadline, probe = self._start(deadline)
+
+        try:
+
+            cost = estimate_tokens(prompt, max_new_tokens)
+
+            for attempt in range(self.max_retries):
+
+                self._rate_limited(self.rate_limiter.acquire(cost, deadline))
+
+                timeout = self._attempt_timeout(deadline)
+
+                if timeout is None:
+
+                    raise HFDeadlineError(
+                        "HF request deadline exceeded"
+                    )
+
+                status, retry_after, error = None, None, None
+
+                started = time.perf_counter()
+
+                try:
+
+                    response = requests.post(
+                        self.url,
+                        headers=headers,
+                        json=payload,
+                        timeout=timeout,
+                    )
+
+                    status = response.status_code
+                    retry_after = response.headers.get("Retry-After")
+
+                    self.rate_limiter.observe(status, response.headers)
+
+                    if status < 400:
+
+                        answer = self._extract_text(
+                            response.json()
+                        )
+
+                        self._record_attempt(attempt, started, status)
+
+                        self.breaker.record_success()
+
+                        if cache_key:
+                            self.cache.put(cache_key, answer, model=self.generation_model)
+
+                        return answer
+
+                except requests.Timeout:
+
+                    error = "timeout"
+
+                except ValueError as e:
+
+                    # Unreadable body: an upstream fault, retried like one
+                    status, error = None, f"invalid JSON: {e}"
+
+                except requests.RequestException as e:
+
+                    error = str(e)
+
+                self._record_attempt(attempt, started, status, error)
+
+                delay = self._retry_delay(attempt, status, retry_after, deadline)
+
+                if delay is None:
+                    break
+
+                time.sleep(delay)
 
-                print(f"HF attempt {attempt+1}")
+            raise HFGenerationError(
+                "HF inference failed after retries"
+            )
+
+        finally:
+
+            self.breaker.release_probe(probe)
+
+    # ------------------------------------------------
+    # Generate text (non-blocking)
+    # ------------------------------------------------
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+
+        # One pooled client per event loop
+        loop = asyncio.get_running_loop()
+
+        if self._async_client is None or self._async_loop is not loop:
+
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("HF_MAX_CONNECTIONS", "512")),
+                    max_keepalive_connections=64,
+                ),
+            )
+
+            self._async_loop = loop
+
+        return self._async_client
+
+    async def agenerate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ) -> str:
+        """
+        Same contract as generate(), but waits on the event loop
+        instead of blocking a thread.
+        """
+
+        headers, payload = self._build_request(
+            prompt, max_new_tokens, temperature, top_p
+        )
+
+        # Replayed even while the upstream circuit is open
+        cache_key = self._cache_key(payload, temperature)
+
+        if cache_key:
+
+            cached = self.cache.get(cache_key)
+
+            if cached is not None:
+                return cached
+
+        deadline, probe = self._start(deadline)
+
+        try:
+
+            client = self._get_async_client()
+
+            cost = estimate_tokens(prompt, max_new_tokens)
+
+            for attempt in range(self.max_retries):
+
+                self._rate_limited(await self.rate_limiter.aacquire(cost, deadline))
+
+                timeout = self._attempt_timeout(deadline)
+
+                if timeout is None:
+
+                    raise HFDeadlineError(
+                        "HF request deadline exceeded"
+                    )
+
+                status, retry_after, error = None, None, None
+
+                started = time.perf_counter()
+
+                try:
+
+                    response = await client.post(
+                        self.url,
+                        headers=headers,
+                        json=payload,
+                        timeout=timeout,
+                    )
+
+                    status = response.status_code
+                    retry_after = response.headers.get("Retry-After")
+
+                    await self.rate_limiter.aobserve(status, response.headers)
+
+                    if status < 400:
+
+                        answer = self._extract_text(
+                            response.json()
+                        )
+
+                        self._record_attempt(attempt, started, status)
+
+                        self.breaker.record_success()
+
+                        if cache_key:
+                            self.cache.put(cache_key, answer, model=self.generation_model)
+
+                        return answer
+
+                except httpx.TimeoutException:
+
+                    error = "timeout"
+
+                except ValueError as e:
+
+                    # Unreadable body: an upstream fault, retried like one
+                    status, error = None, f"invalid JSON: {e}"
+
+                except httpx.HTTPError as e:
+
+                    error = str(e)
+
+                self._record_attempt(attempt, started, status, error)
+
+                delay = self._retry_delay(attempt, status, retry_after, deadline)
+
+                if delay is None:
+                    break
 
-                response = requests.post(
+                await asyncio.sleep(delay)
+
+            raise HFGenerationError(
+                "HF inference failed after retries"
+            )
+
+        finally:
+
+            self.breaker.release_probe(probe)
+
+    # ------------------------------------------------
+    # Stream text (server-sent events)
+    # ------------------------------------------------
+
+    def _parse_event(self, line: str):
+        """
+        Content delta of one SSE line; None for keep-alives and
+        metadata, False at the end of the stream.
+        """
+
+        if not line or not line.startswith("data:"):
+            return None
+
+        data = line[len("data:"):].strip()
+
+        if data == "[DONE]":
+            return False
+
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return None
+
+        if "error" in event:
+            raise HFGenerationError(event["error"])
+
+        choices = event.get("choices") or [{}]
+
+        return (choices[0].get("delta") or {}).get("content")
+
+    def stream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ):
+        """
+        Yield completion chunks as the router produces them. No
+        retries: a failed stream is reported, not replayed.
+        """
+
+        headers, payload = self._build_request(
+            prompt, max_new_tokens, temperature, top_p
+        )
+
+        cache_key = self._cache_key(payload, temperature)
+
+        if cache_key:
+
+            cached = self.cache.get(cache_key)
+
+            if cached is not None:
+                yield cached
+                return
+
+        deadline, probe = self._start(deadline)
+
+        try:
+
+            self._rate_limited(self.rate_limiter.acquire(estimate_tokens(prompt, max_new_tokens), deadline))
+
+            timeout = self._attempt_timeout(deadline)
+
+            if timeout is None:
+
+                raise HFDeadlineError(
+                    "HF request deadline exceeded"
+                )
+
+            parts = []
+
+            try:
+
+                with requests.post(
                     self.url,
                     headers=headers,
-                    json=payload,
-                    timeout=self.timeout,
-                )
+                    json=dict(payload, stream=True),
+                    timeout=timeout,
+                    stream=True,
+                ) as response:
 
-                # Rate limit handling
-                if response.status_code == 429:
+                    self.rate_limiter.observe(response.status_code, response.headers)
 
-                    wait = 10 * (attempt + 1)
+                    if response.status_code >= 400:
 
-                    print(f"Rate limit. Waiting {wait}s")
+                        logger.warning("HF stream rejected", extra={"model": self.generation_model, "status": response.status_code})
 
-                    time.sleep(wait)
+                        UPSTREAM_ERRORS.inc(model=self.generation_model, error=response.status_code)
 
-                    continue
+                        if response.status_code in RETRYABLE_STATUS:
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()
 
-                response.raise_for_status()
+                        raise HFGenerationError(
+                            f"HF stream rejected with status {response.status_code}"
+                        )
 
-                return self._extract_text(
-                    response.json()
-                )
+                    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+
+                        if time.monotonic() >= deadline:
 
-            except requests.Timeout:
+                            raise HFDeadlineError(
+                                "HF request deadline exceeded"
+                            )
 
-                print("Timeout retrying...")
+                        delta = self._parse_event(line)
+
+                        if delta is False:
+                            break
+
+                        if delta:
+                            parts.append(delta)
+                            yield delta
 
             except requests.RequestException as e:
 
-                print("Request failed:", e)
+                logger.warning("HF stream failed", extra={"model": self.generation_model, "error": str(e)})
 
-            time.sleep(3)
+                UPSTREAM_ERRORS.inc(model=self.generation_model, error="network")
 
-        raise HFGenerationError(
-            "HF inference failed after retries"
-        )
+                self.breaker.record_failure()
+
+                raise HFGenerationError(
+                    f"HF stream failed: {e}"
+                )
+
+            self.breaker.record_success()
+
+            if cache_key:
+                self.cache.put(cache_key, "".join(parts).strip(), model=self.generation_model)
+
+        finally:
+
+            self.breaker.release_probe(probe)
 
 
 # ------------------------------------------------
@@ -1,34 +1,258 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
 import requests
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-MODEL_NAME = "mistral"
+from llm.backends import UPSTREAM_ERRORS, LLMBackend, LLMDeadlineError, LLMError
+from llm.completion_cache import MAX_CACHEABLE_TEMPERATURE, completion_key, get_completion_cache
+from utils.logger import get_logger
 
+logger = get_logger(__name__)
 
-def call_ollama(prompt: str, timeout: int = 180) -> str:
-    payload = {
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "stream": False,
-        "options": {
-            "temperature": 0.1,
-            "top_p": 0.9
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+MODEL_NAME = os.getenv("OLLAMA_MODEL", "mistral")
+
+# How long Ollama keeps the model in memory after a request
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+
+class OllamaError(LLMError):
+    """Raised when the local Ollama server fails or is unreachable."""
+    pass
+
+
+class OllamaClient(LLMBackend):
+    """
+    Local generation through Ollama's /api/generate. Responses are
+    always streamed (NDJSON), and every request sends keep_alive so
+    the model stays resident between chats.
+    """
+
+    def __init__(self, model: str = None, url: str = None, timeout: int = None, keep_alive: str = None):
+        self.generation_model = model or MODEL_NAME
+        self.url = url or OLLAMA_URL
+        self.timeout = int(timeout or os.getenv("OLLAMA_TIMEOUT", "180"))
+        self.keep_alive = keep_alive or KEEP_ALIVE
+
+        self.name = f"{self.url}#{self.generation_model}"
+
+        self.cache = get_completion_cache()
+
+        # Created on first agenerate() call
+        self._async_client = None
+        self._async_loop = None
+
+        logger.info("Ollama client ready", extra={"model": self.generation_model, "url": self.url})
+
+    def _payload(self, prompt, max_new_tokens, temperature, top_p):
+        return {
+            "model": self.generation_model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "num_predict": max_new_tokens,
+                "temperature": temperature,
+                "top_p": top_p,
+            },
         }
-    }
 
-    try:
-        response = requests.post(
-            OLLAMA_URL,
-            json=payload,
-            timeout=timeout
-        )
-        response.raise_for_status()
+    def _timeout(self, deadline):
+        if deadline is None:
+            return self.timeout
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            raise LLMDeadlineError("Ollama request deadline exceeded")
+
+        return min(self.timeout, remaining)
+
+    def _rejected(self, status):
+        logger.warning("Ollama request rejected", extra={"model": self.generation_model, "status": status})
+        UPSTREAM_ERRORS.inc(model=self.generation_model, error=status)
+
+        return OllamaError(f"Ollama returned status {status}")
+
+    def _failure(self, error, deadline):
+        logger.warning("Ollama request failed", extra={"model": self.generation_model, "error": str(error)})
+        UPSTREAM_ERRORS.inc(model=self.generation_model, error="network")
+
+        if deadline is not None and time.monotonic() >= deadline:
+            return LLMDeadlineError(f"Ollama request deadline exceeded: {error}")
+
+        return OllamaError(f"Ollama call failed: {error}")
+
+    def _cache_key(self, payload, temperature):
+        if self.cache is None or temperature > MAX_CACHEABLE_TEMPERATURE:
+            return None
+
+        return completion_key(self.url, payload)
+
+    def _parse_line(self, line):
+        """
+        (text, done) for one NDJSON line of the stream.
+        """
+        if not line:
+            return "", False
+
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return "", False
+
+        if "error" in event:
+            raise OllamaError(event["error"])
+
+        return event.get("response", ""), bool(event.get("done"))
+
+    def stream(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ):
+        payload = self._payload(prompt, max_new_tokens, temperature, top_p)
+
+        cache_key = self._cache_key(payload, temperature)
+
+        if cache_key:
+            cached = self.cache.get(cache_key)
+
+            if cached is not None:
+                yield cached
+                return
 
-        # Return RAW model output only
-        return response.json().get("response", "").strip()
+        parts = []
+
+        try:
+            with requests.post(self.url, json=payload, timeout=self._timeout(deadline), stream=True) as response:
+                if response.status_code >= 400:
+                    raise self._rejected(response.status_code)
+
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise LLMDeadlineError("Ollama request deadline exceeded")
+
+                    text, done = self._parse_line(line)
+
+                    if text:
+                        parts.append(text)
+                        yield text
+
+                    if done:
+                        break
+
+        except requests.RequestException as e:
+            raise self._failure(e, deadline)
+
+        if cache_key:
+            self.cache.put(cache_key, "".join(parts).strip(), model=self.generation_model)
+
+    def generate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ) -> str:
+        return "".join(
+            self.stream(prompt, max_new_tokens, temperature, top_p, deadline)
+        ).strip()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # One pooled client per event loop
+        loop = asyncio.get_running_loop()
+
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout)
+            self._async_loop = loop
+
+        return self._async_client
+
+    async def agenerate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 256,
+        temperature: float = 0.1,
+        top_p: float = 0.9,
+        deadline: float = None
+    ) -> str:
+        payload = self._payload(prompt, max_new_tokens, temperature, top_p)
+
+        cache_key = self._cache_key(payload, temperature)
+
+        if cache_key:
+            cached = self.cache.get(cache_key)
+
+            if cached is not None:
+                return cached
+
+        parts = []
+
+        try:
+            client = self._get_async_client()
+
+            async with client.stream("POST", self.url, json=payload, timeout=self._timeout(deadline)) as response:
+                if response.status_code >= 400:
+                    raise self._rejected(response.status_code)
+
+                async for line in response.aiter_lines():
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise LLMDeadlineError("Ollama request deadline exceeded")
+
+                    text, done = self._parse_line(line)
+                    parts.append(text)
+
+                    if done:
+                        break
+
+        except httpx.HTTPError as e:
+            raise self._failure(e, deadline)
+
+        answer = "".join(parts).strip()
+
+        if cache_key:
+            self.cache.put(cache_key, answer, model=self.generation_model)
+
+        return answer
+
+    def warm_up(self):
+        """
+        A request without a prompt makes Ollama load the model and
+        keep it resident for keep_alive. Raises OllamaError when the
+        server is down.
+        """
+        try:
+            response = requests.post(
+                self.url,
+                json={"model": self.generation_model, "keep_alive": self.keep_alive},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise self._failure(e, None)
+
+        if response.status_code >= 400:
+            raise self._rejected(response.status_code)
+
+
+def call_ollama(prompt: str, timeout: int = 180) -> str:
+    """
+    Backward-compatible helper: raw completion, or "" on failure so
+    the caller decides how to refuse.
+    """
+    try:
+        return OllamaClient(timeout=timeout).generate(prompt)
 
-    except Exception as e:
+    except LLMError as e:
         # ❗ IMPORTANT:
         # Do NOT return semantic text here
         # Let supervisor decide refusal behavior
-        print(f"⚠️ Ollama call failed: {e}")
+        logger.warning("Ollama call failed", extra={"error": str(e)})
         return ""
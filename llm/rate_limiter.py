@@ -0,0 +1,390 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from llm.retry_policy import parse_retry_after
+from utils.metrics import gauge, histogram
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is shared by threads only
+    fcntl = None
+
+# -------------------------------
+# CLIENT-SIDE RATE LIMIT
+# -------------------------------
+# Token buckets for requests and tokens per minute, one per upstream,
+# kept in a small state file under HF_RATE_LIMIT_DIR and updated under
+# flock, so every thread and every worker process on the host draws
+# from the same budget. A 429 halves the budget and pauses everyone
+# until Retry-After; the budget then grows back a little each second.
+# x-ratelimit-* headers cap the buckets at what the upstream reports.
+
+# 0 disables a bucket; both 0 disables the limiter
+RATE_LIMIT_RPM = float(os.getenv("HF_RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_TPM = float(os.getenv("HF_RATE_LIMIT_TPM", "0"))
+
+DEFAULT_STATE_DIR = os.path.join(
+    tempfile.gettempdir(),
+    "corporate_bot_rate_limits"
+)
+
+# Budget share kept after a 429, and the floor it never drops below
+BACKOFF_FACTOR = 0.5
+MIN_SCALE = 0.1
+
+# Budget share regained per second without a 429 (full in ~1 minute)
+RECOVERY_PER_S = 1 / 60
+
+# Pause after a 429 that carries no Retry-After
+DEFAULT_PAUSE_S = 1.0
+
+# Longest pause any header can impose (the pause is shared host-wide
+# and outlives restarts, so a bogus header must not stop everyone)
+MAX_PAUSE_S = float(os.getenv("HF_RATE_LIMIT_MAX_PAUSE_S", "120"))
+
+# Bare numbers above this are epoch timestamps, not seconds
+EPOCH_THRESHOLD = 1e9
+
+# Longest single sleep while waiting, so new state is picked up
+MAX_POLL_S = 1.0
+
+WAIT_SECONDS = histogram("llm_rate_limit_wait_seconds", "Time spent waiting for the client-side rate limit.", ("upstream",))
+
+
+def estimate_tokens(prompt: str, max_new_tokens: int) -> int:
+    """
+    Tokens a request counts against the budget: prompt (~4 characters
+    per token) plus the completion it may generate.
+    """
+    return (len(prompt or "") + 3) // 4 + max_new_tokens
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_S = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset(value):
+    """
+    x-ratelimit-reset-* (or Retry-After) header as seconds: "12",
+    "1m30s", "250ms", an epoch timestamp or an HTTP-date. None when
+    absent or unreadable.
+    """
+    if not value:
+        return None
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        if seconds > EPOCH_THRESHOLD:
+            return max(seconds - time.time(), 0.0)
+        return max(seconds, 0.0)
+
+    parts = _DURATION.findall(value.strip())
+
+    if parts and "".join(n + u for n, u in parts) == value.strip():
+        return sum(float(n) * _UNIT_S[u] for n, u in parts)
+
+    return parse_retry_after(value)
+
+
+def _header(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class RateLimiter:
+    """
+    Requests/minute and tokens/minute budget for one upstream, shared
+    through `state_dir` by every process that uses the same name.
+    """
+
+    def __init__(self, name: str, rpm: float = None, tpm: float = None, state_dir: str = None, max_pause_s: float = None):
+        self.name = name
+        self.rpm = RATE_LIMIT_RPM if rpm is None else rpm
+        self.tpm = RATE_LIMIT_TPM if tpm is None else tpm
+        self.max_pause_s = MAX_PAUSE_S if max_pause_s is None else max_pause_s
+
+        self.state_dir = (
+            state_dir
+            or os.getenv("HF_RATE_LIMIT_DIR")
+            or DEFAULT_STATE_DIR
+        )
+
+        self.path = os.path.join(
+            self.state_dir,
+            hashlib.sha256(name.encode("utf-8")).hexdigest()[:16] + ".json"
+        )
+
+        # Serializes threads; flock serializes processes
+        self._lock = threading.Lock()
+
+        # State without fcntl (never persisted)
+        self._local = None
+
+        self.waits = 0
+        self.rate_limited = 0
+
+        if self.enabled:
+            os.makedirs(self.state_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    # ---------- shared state ----------
+
+    def _fresh(self, now) -> dict:
+        return {"requests": self.rpm, "tokens": self.tpm, "scale": 1.0, "paused_until": 0.0, "updated": now}
+
+    def _update(self, change):
+        """
+        Apply change(state, now) to the shared state under the lock and
+        return its result. Buckets are refilled first.
+        """
+        with self._lock:
+
+            if fcntl is None:
+                now = time.time()
+                state = self._local = self._refill(self._local or self._fresh(now), now)
+                return change(state, now)
+
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+
+                now = time.time()
+
+                try:
+                    state = json.loads(os.read(fd, 4096) or b"null") or self._fresh(now)
+                except ValueError:
+                    state = self._fresh(now)
+
+                state = self._refill(state, now)
+                result = change(state, now)
+
+                data = json.dumps(state).encode("utf-8")
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+
+                return result
+            finally:
+                os.close(fd)
+
+    def _refill(self, state, now) -> dict:
+        elapsed = max(now - state["updated"], 0.0)
+
+        state["scale"] = min(1.0, state["scale"] + elapsed * RECOVERY_PER_S)
+        state["requests"] = min(self.rpm * state["scale"], state["requests"] + elapsed * self.rpm / 60 * state["scale"])
+        state["tokens"] = min(self.tpm * state["scale"], state["tokens"] + elapsed * self.tpm / 60 * state["scale"])
+        state["updated"] = now
+
+        # Also caps a pause written before the limit was lowered
+        state["paused_until"] = min(state["paused_until"], now + self.max_pause_s)
+
+        return state
+
+    def _take(self, cost):
+        """
+        Seconds until `cost` tokens and one request are available;
+        0 when they were taken.
+        """
+
+        def take(state, now):
+
+            if now < state["paused_until"]:
+                return state["paused_until"] - now
+
+            # A request bigger than the whole budget waits for a full bucket
+            need = min(cost, self.tpm * state["scale"])
+
+            waits = []
+
+            if self.rpm > 0 and state["requests"] < 1:
+                waits.append((1 - state["requests"]) * 60 / (self.rpm * state["scale"]))
+
+            if self.tpm > 0 and state["tokens"] < need:
+                waits.append((need - state["tokens"]) * 60 / (self.tpm * state["scale"]))
+
+            if waits:
+                return max(waits)
+
+            if self.rpm > 0:
+                state["requests"] -= 1
+
+            if self.tpm > 0:
+                state["tokens"] -= need
+
+            return 0.0
+
+        return self._update(take)
+
+    # ---------- public API ----------
+
+    def acquire(self, cost: int = 0, deadline: float = None) -> bool:
+        """
+        Block until the request may go out. False, without taking
+        anything, when that would be after `deadline` (monotonic).
+        """
+        if not self.enabled:
+            return True
+
+        start = time.perf_counter()
+
+        while True:
+
+            wait = self._take(cost)
+
+            if wait <= 0:
+                break
+
+            if deadline is not None and time.monotonic() + wait >= deadline:
+                return False
+
+            self.waits += 1
+            time.sleep(min(wait, MAX_POLL_S))
+
+        WAIT_SECONDS.observe(time.perf_counter() - start, upstream=self.name)
+
+        return True
+
+    async def aacquire(self, cost: int = 0, deadline: float = None) -> bool:
+        """
+        acquire() for the event loop. The state file is updated on a
+        worker thread: flock may block while another process holds it.
+        """
+        if not self.enabled:
+            return True
+
+        start = time.perf_counter()
+
+        while True:
+
+            wait = await asyncio.to_thread(self._take, cost)
+
+            if wait <= 0:
+                break
+
+            if deadline is not None and time.monotonic() + wait >= deadline:
+                return False
+
+            self.waits += 1
+            await asyncio.sleep(min(wait, MAX_POLL_S))
+
+        WAIT_SECONDS.observe(time.perf_counter() - start, upstream=self.name)
+
+        return True
+
+    def observe(self, status: int, headers):
+        """
+        Adapt the shared budget to one upstream response.
+        """
+        if not self.enabled or status is None:
+            return
+
+        headers = headers or {}
+
+        remaining_requests = _header(headers, "x-ratelimit-remaining-requests", "x-ratelimit-remaining")
+        remaining_tokens = _header(headers, "x-ratelimit-remaining-tokens")
+        reset = parse_reset(_header(headers, "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens", "x-ratelimit-reset"))
+        retry_after = parse_reset(headers.get("Retry-After"))
+
+        if status != 429 and remaining_requests is None and remaining_tokens is None:
+            return
+
+        if status == 429:
+            self.rate_limited += 1
+
+        def adapt(state, now):
+
+            if status == 429:
+                state["scale"] = max(MIN_SCALE, state["scale"] * BACKOFF_FACTOR)
+                state["requests"] = min(state["requests"], 0.0)
+                state["tokens"] = min(state["tokens"], 0.0)
+
+                pause = retry_after if retry_after is not None else reset
+                pause = DEFAULT_PAUSE_S if pause is None else min(pause, self.max_pause_s)
+                state["paused_until"] = max(state["paused_until"], now + pause)
+
+            try:
+                if remaining_requests is not None:
+                    state["requests"] = min(state["requests"], float(remaining_requests))
+
+                if remaining_tokens is not None:
+                    state["tokens"] = min(state["tokens"], float(remaining_tokens))
+
+                exhausted = float(remaining_requests or 1) <= 0 or float(remaining_tokens or 1) <= 0
+            except ValueError:
+                exhausted = False
+
+            if exhausted and reset is not None:
+                state["paused_until"] = max(state["paused_until"], now + min(reset, self.max_pause_s))
+
+        self._update(adapt)
+
+    async def aobserve(self, status: int, headers):
+        """
+        observe() for the event loop (off the loop, like aacquire).
+        """
+        if self.enabled:
+            await asyncio.to_thread(self.observe, status, headers)
+
+    def snapshot(self) -> dict:
+        if not self.enabled:
+            return {"name": self.name, "enabled": False}
+
+        state = self._update(lambda state, now: dict(state, paused_s=max(state["paused_until"] - now, 0.0)))
+
+        return {
+            "name": self.name,
+            "enabled": True,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "scale": round(state["scale"], 3),
+            "requests_available": round(state["requests"], 2),
+            "tokens_available": round(state["tokens"], 1),
+            "paused_s": round(state["paused_s"], 2),
+            "waits": self.waits,
+            "rate_limited": self.rate_limited,
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str) -> RateLimiter:
+    """
+    Process-wide limiter per upstream; its state file makes it
+    host-wide.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name)
+        return _limiters[name]
+
+
+def rate_limiter_snapshots() -> list:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.snapshot() for limiter in limiters]
+
+
+gauge(
+    "llm_rate_limit_scale",
+    "Share of the configured rate limit currently allowed per LLM upstream.",
+    ("upstream",),
+    function=lambda: {s["name"]: s["scale"] for s in rate_limiter_snapshots() if s["enabled"]},
+)
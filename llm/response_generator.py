@@ -1,13 +1,26 @@
 ﻿import os
 
 from llm.hf_inference_client import HFGenerationError, HFInferenceClient
+from utils.logger import get_logger
 
+logger = get_logger(__name__)
 
-_intent_client = HFInferenceClient(
-    api_token=os.getenv("HF_TOKEN", ""),
-    generation_model=os.getenv("HF_INTENT_MODEL", os.getenv("HF_GENERATION_MODEL", "meta-llama/Llama-3.2-1B-Instruct:novita")),
-    timeout=int(os.getenv("HF_INTENT_TIMEOUT", "45")),
-)
+
+_intent_client = None
+
+
+def _get_intent_client() -> HFInferenceClient:
+    # Built on first use so importing this module stays side-effect free
+    global _intent_client
+
+    if _intent_client is None:
+        _intent_client = HFInferenceClient(
+            api_token=os.getenv("HF_TOKEN", ""),
+            generation_model=os.getenv("HF_INTENT_MODEL", os.getenv("HF_GENERATION_MODEL", "meta-llama/Llama-3.2-1B-Instruct:novita")),
+            timeout=int(os.getenv("HF_INTENT_TIMEOUT", "45")),
+        )
+
+    return _intent_client
 
 
 def generate_text(prompt: str, max_new_tokens: int = 32) -> str:
@@ -16,7 +29,7 @@ def generate_text(prompt: str, max_new_tokens: int = 32) -> str:
     Returns empty string on inference failure so callers can apply safe defaults.
     """
     try:
-        return _intent_client.generate(prompt, max_new_tokens=max_new_tokens)
+        return _get_intent_client().generate(prompt, max_new_tokens=max_new_tokens)
     except HFGenerationError as e:
-        print(f"HF intent generation failed: {e}")
+        logger.warning("HF intent generation failed", extra={"error": str(e)})
         return ""
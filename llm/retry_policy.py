@@ -0,0 +1,192 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from utils.metrics import gauge
+
+# Statuses worth retrying: rate limits and transient upstream errors
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """
+    Retry-After header as seconds (delta-seconds or HTTP-date), or None.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter; Retry-After wins
+    when the upstream sends one.
+    """
+
+    def __init__(self, base_delay: float = None, max_delay: float = None, deadline_s: float = None):
+        self.base_delay = float(base_delay or os.getenv("HF_BACKOFF_BASE", "0.5"))
+        self.max_delay = float(max_delay or os.getenv("HF_BACKOFF_MAX", "8"))
+        self.deadline_s = float(deadline_s or os.getenv("HF_REQUEST_DEADLINE", "60"))
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        if retry_after is not None:
+            return retry_after
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+# -------------------------------
+# CIRCUIT BREAKER
+# -------------------------------
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and
+    rejects calls for `reset_timeout` seconds; then lets a single probe
+    through (half-open) and closes again if it succeeds. A probe that
+    ends without a verdict is released; one outstanding for longer
+    than `probe_timeout` is given up on and a new probe may go out.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None, probe_timeout: float = None):
+        self.name = name
+        self.failure_threshold = int(failure_threshold or os.getenv("HF_BREAKER_THRESHOLD", "5"))
+        self.reset_timeout = float(reset_timeout or os.getenv("HF_BREAKER_RESET", "30"))
+        self.probe_timeout = float(probe_timeout or os.getenv("HF_BREAKER_PROBE_TIMEOUT", os.getenv("HF_REQUEST_DEADLINE", "60")))
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._probe_started = None
+
+        # Numbers the probes, so only the caller holding one releases it
+        self._probe_id = 0
+
+        self.opened_total = 0
+        self.rejected_total = 0
+        self.failures_total = 0
+        self.successes_total = 0
+
+    def acquire(self):
+        """
+        None when the call is rejected; otherwise a ticket for
+        release_probe(): 0 for an ordinary call, the probe number
+        for the half-open probe.
+        """
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == CLOSED:
+                return 0
+
+            if self.state == HALF_OPEN and (
+                not self._probe_in_flight or now - self._probe_started >= self.probe_timeout
+            ):
+                self._probe_in_flight = True
+                self._probe_started = now
+                self._probe_id += 1
+                return self._probe_id
+
+            self.rejected_total += 1
+            return None
+
+    def allow_request(self) -> bool:
+        return self.acquire() is not None
+
+    def release_probe(self, ticket):
+        """
+        End a call that recorded neither success nor failure (deadline,
+        cancellation, abandoned stream). Frees the half-open slot when
+        this call was the probe; a no-op otherwise.
+        """
+        if not ticket:
+            return
+
+        with self._lock:
+            if self.state == HALF_OPEN and self._probe_in_flight and self._probe_id == ticket:
+                self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.successes_total += 1
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures_total += 1
+            self.consecutive_failures += 1
+
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened_total += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "opened_total": self.opened_total,
+                "rejected_total": self.rejected_total,
+                "failures_total": self.failures_total,
+                "successes_total": self.successes_total,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Process-wide breaker per upstream, shared by every client instance.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def circuit_breaker_snapshots() -> list:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in breakers]
+
+
+gauge(
+    "llm_circuit_open",
+    "1 while the circuit breaker of an LLM upstream is open.",
+    ("upstream",),
+    function=lambda: {s["name"]: int(s["state"] == OPEN) for s in circuit_breaker_snapshots()},
+)
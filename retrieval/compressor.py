@@ -0,0 +1,112 @@
+import os
+import re
+import time
+
+import numpy as np
+
+from retrieval.inference import run_inference
+
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "0") == "1"
+
+KEEP_SENTENCES = int(os.getenv("CONTEXT_COMPRESSION_KEEP", "6"))
+
+NEIGHBOURS = int(os.getenv("CONTEXT_COMPRESSION_NEIGHBOURS", "1"))
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text: str):
+    return [s.strip() for s in _SENTENCE_BOUNDARY.split(text or "") if s and s.strip()]
+
+
+def compress_context(context_items, query_vec, encoder, keep_sentences=None, neighbours=None):
+    """
+    Keep only the sentences of the selected chunks that are closest
+    to the query, plus their neighbours, in original order.
+
+    query_vec: normalized query embedding already computed by the
+    Retriever, so only the sentences are encoded (in one batch).
+
+    Returns (compressed_items, stats). Items keep their pages and
+    tables, so page citations are unchanged.
+    """
+    keep_sentences = keep_sentences or KEEP_SENTENCES
+    neighbours = NEIGHBOURS if neighbours is None else neighbours
+
+    start = time.perf_counter()
+
+    per_item = [split_sentences(item.get("text", "")) for item in context_items]
+
+    flat = [
+        (item_idx, sent_idx, sentence)
+        for item_idx, sentences in enumerate(per_item)
+        for sent_idx, sentence in enumerate(sentences)
+    ]
+
+    chars_before = sum(len(item.get("text", "")) for item in context_items)
+
+    # Nothing to gain when everything would be kept anyway
+    if len(flat) <= keep_sentences:
+        return list(context_items), {
+            "chars_before": chars_before,
+            "chars_after": chars_before,
+            "ratio": 1.0,
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    sentence_vecs = run_inference(
+        "compress",
+        encoder.encode,
+        [sentence for _, _, sentence in flat],
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+
+    scores = np.asarray(sentence_vecs, dtype=np.float32) @ np.asarray(query_vec, dtype=np.float32).reshape(-1)
+
+    selected = [set() for _ in context_items]
+
+    for pos in np.argsort(-scores)[:keep_sentences]:
+        item_idx, sent_idx, _ = flat[pos]
+        selected[item_idx].add(sent_idx)
+
+    # Every chunk keeps at least its best sentence so its citation survives
+    best_per_item = {}
+    for pos, (item_idx, sent_idx, _) in enumerate(flat):
+        if item_idx not in best_per_item or scores[pos] > scores[best_per_item[item_idx][0]]:
+            best_per_item[item_idx] = (pos, sent_idx)
+
+    compressed = []
+
+    for item_idx, item in enumerate(context_items):
+
+        sentences = per_item[item_idx]
+
+        if not sentences:
+            compressed.append(dict(item))
+            continue
+
+        chosen = selected[item_idx] or {best_per_item[item_idx][1]}
+
+        keep = set()
+        for sent_idx in chosen:
+            keep.update(range(max(sent_idx - neighbours, 0), min(sent_idx + neighbours + 1, len(sentences))))
+
+        parts = []
+        previous = None
+        for sent_idx in sorted(keep):
+            if previous is not None and sent_idx != previous + 1:
+                parts.append("...")
+            parts.append(sentences[sent_idx])
+            previous = sent_idx
+
+        compressed.append({**item, "text": " ".join(parts)})
+
+    chars_after = sum(len(item["text"]) for item in compressed)
+
+    return compressed, {
+        "chars_before": chars_before,
+        "chars_after": chars_after,
+        "ratio": round(chars_after / chars_before, 3) if chars_before else 1.0,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
@@ -9,6 +9,7 @@ def build_context(filtered_chunks):
         context.append({
             "section": chunk.get("section", ""),
             "pages": chunk.get("pages", []),
+            "score": chunk.get("rerank_score", chunk.get("score")),
             # Defensive: never allow missing text
             "text": chunk.get("chunk_text", ""),
             "tables": chunk.get("tables", []),
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+ACTIVE_FILE = "ACTIVE"
+
+# Older versions are kept briefly so a worker that read ACTIVE just
+# before a new upload can still finish loading the previous one.
+KEEP_VERSIONS = 3
+
+
+class DocumentSnapshot:
+    """
+    Everything a chat reads about one document: retriever, tables
+    (with an id lookup) and the store version it came from.
+
+    Never modified after construction. A new upload builds a new
+    snapshot and swaps the reference, so a request that picked one
+    up keeps a consistent view without taking a lock.
+    """
+
+    def __init__(self, retriever, tables_raw, version: str = None):
+        self.retriever = retriever
+        self.tables_raw = tables_raw or []
+        self.tables_by_id = {table.get("id"): table for table in self.tables_raw}
+        self.version = version
+
+
+class DocumentStore:
+    """
+    Active document (FAISS index, chunk metadata, tables) on disk,
+    visible to every worker process on the host.
+
+    Each upload is written to its own version directory and published
+    by atomically replacing the ACTIVE pointer file.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def publish(self, index, metadata, tables_raw) -> str:
+
+        import faiss
+
+        version = f"{time.time_ns()}-{os.getpid()}"
+
+        tmp_dir = tempfile.mkdtemp(prefix=".publish-", dir=self.root)
+
+        faiss.write_index(index, os.path.join(tmp_dir, "index.faiss"))
+
+        with open(os.path.join(tmp_dir, "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False)
+
+        with open(os.path.join(tmp_dir, "tables.json"), "w", encoding="utf-8") as f:
+            json.dump(tables_raw or [], f, ensure_ascii=False)
+
+        os.replace(tmp_dir, os.path.join(self.root, version))
+
+        fd, tmp_pointer = tempfile.mkstemp(prefix=".active-", dir=self.root)
+
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version)
+
+        os.replace(tmp_pointer, os.path.join(self.root, ACTIVE_FILE))
+
+        self._prune(version)
+
+        return version
+
+    def active_version(self):
+
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, version: str):
+        """
+        Returns (index, metadata, tables_raw) for a published version.
+        """
+
+        import faiss
+
+        version_dir = os.path.join(self.root, version)
+
+        index = faiss.read_index(os.path.join(version_dir, "index.faiss"))
+
+        with open(os.path.join(version_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        with open(os.path.join(version_dir, "tables.json"), "r", encoding="utf-8") as f:
+            tables_raw = json.load(f)
+
+        return index, metadata, tables_raw
+
+    def _prune(self, current: str):
+
+        versions = sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and name != ACTIVE_FILE
+        )
+
+        for name in versions[:-KEEP_VERSIONS]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
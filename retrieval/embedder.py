@@ -23,6 +23,7 @@ def build_faiss_index(chunks_path, index_path, meta_path):
             "chunk_id": chunk["chunk_id"],
             "section": chunk["section"],
             "pages": chunk["pages"],
+            "token_count": chunk.get("token_count"),
             "tables": chunk["tables"],
             "images": chunk["images"],
             "chunk_text": chunk_text
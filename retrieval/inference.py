@@ -0,0 +1,291 @@
+import contextvars
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.logger import get_logger
+from utils.metrics import gauge, histogram
+
+logger = get_logger(__name__)
+
+# -------------------------------
+# INFERENCE EXECUTOR
+# -------------------------------
+# Every embedding and cross-encoder call in the process goes through
+# one FIFO queue served by INFERENCE_THREADS dedicated threads, each
+# running torch with TORCH_NUM_THREADS intra-op threads. Request
+# threads only wait for results, so the number of torch threads busy
+# at once stays fixed however many requests are in flight, instead
+# of every request thread spinning up its own full-size pool.
+
+# 0 runs models inline on the calling thread
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "1"))
+
+# e.g. "0-3" or "0,2,4"; empty leaves affinity alone
+INFERENCE_CPU_AFFINITY = os.getenv("INFERENCE_CPU_AFFINITY", "")
+
+# Texts per queued encode during ingestion, so chats interleave
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "64"))
+
+QUEUE_SECONDS = histogram("inference_queue_seconds", "Time an inference call waited for a free inference thread.", ("kind",))
+
+RUN_SECONDS = histogram("inference_run_seconds", "Time spent running an inference call.", ("kind",))
+
+
+def parse_cpu_list(value: str) -> set:
+    """
+    "0-3,6" -> {0, 1, 2, 3, 6}
+    """
+    cpus = set()
+
+    for part in (value or "").split(","):
+        part = part.strip()
+
+        if not part:
+            continue
+
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+
+    return cpus
+
+
+class InferenceExecutor:
+    """
+    Fixed pool of inference threads fed by one queue.
+
+    Torch settings are read when the threads start (lazily, after any
+    gunicorn fork) and applied once torch is loaded:
+    - intra_op_threads: TORCH_NUM_THREADS, else the current torch
+      setting split between the inference threads
+    - interop_threads: TORCH_INTEROP_THREADS (only takes effect
+      before torch has run anything)
+    - affinity: CPUs the inference threads (and the torch threads
+      they start) may run on
+    """
+
+    def __init__(self, threads: int = None, intra_op_threads: int = None, interop_threads: int = None, affinity=None):
+        self.threads = INFERENCE_THREADS if threads is None else threads
+        self.intra_op_threads = intra_op_threads
+        self.interop_threads = interop_threads
+        self.affinity = parse_cpu_list(INFERENCE_CPU_AFFINITY) if affinity is None else set(affinity)
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._workers = []
+        self._pid = None
+        self._torch_configured = False
+        self._local = threading.local()
+
+        self.completed = 0
+
+    # ---------- threads ----------
+
+    def _ensure_started(self):
+        # Threads do not survive fork: a forked worker starts its own
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+
+            if self._pid == os.getpid():
+                return
+
+            self._queue = queue.SimpleQueue()
+            self._torch_configured = False
+
+            self._workers = [
+                threading.Thread(target=self._work, args=(self._queue,), name=f"inference-{i}", daemon=True)
+                for i in range(self.threads)
+            ]
+
+            for worker in self._workers:
+                worker.start()
+
+            self._pid = os.getpid()
+
+    def _configure_torch(self):
+        """
+        Once per process, as soon as torch has been imported (by
+        loading a model).
+        """
+        torch = sys.modules.get("torch")
+
+        if self._torch_configured or torch is None:
+            return
+
+        with self._lock:
+
+            if self._torch_configured:
+                return
+
+            intra = self.intra_op_threads or int(os.getenv("TORCH_NUM_THREADS", "0"))
+            intra = intra or max(torch.get_num_threads() // max(self.threads, 1), 1)
+
+            torch.set_num_threads(intra)
+
+            interop = self.interop_threads or int(os.getenv("TORCH_INTEROP_THREADS", "0"))
+
+            if interop:
+                try:
+                    torch.set_num_interop_threads(interop)
+                except RuntimeError as e:
+                    # Already fixed once torch ran inter-op work
+                    logger.warning("TORCH_INTEROP_THREADS not applied", extra={"error": str(e)})
+
+            self._torch_configured = True
+
+            logger.info("Inference threads configured", extra={
+                "inference_threads": self.threads,
+                "torch_threads": intra,
+                "interop_threads": torch.get_num_interop_threads(),
+                "affinity": sorted(self.affinity) or None,
+            })
+
+    def _work(self, tasks):
+        self._local.inside = True
+
+        if self.affinity:
+            try:
+                # pid 0: this thread only; torch threads it starts inherit it
+                os.sched_setaffinity(0, self.affinity)
+            except (AttributeError, OSError, ValueError) as e:
+                logger.warning("INFERENCE_CPU_AFFINITY not applied", extra={"error": str(e)})
+
+        while True:
+
+            task = tasks.get()
+
+            if task is None:
+                return
+
+            future, kind, context, fn, args, kwargs, queued_at = task
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            QUEUE_SECONDS.observe(time.perf_counter() - queued_at, kind=kind)
+
+            self._configure_torch()
+
+            start = time.perf_counter()
+
+            try:
+                result = context.run(fn, *args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+            RUN_SECONDS.observe(time.perf_counter() - start, kind=kind)
+
+            with self._lock:
+                self.completed += 1
+
+    # ---------- public API ----------
+
+    def submit(self, kind: str, fn, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) for an inference thread. Runs in a
+        copy of the caller's context (request id, trace).
+        """
+        future = Future()
+
+        if self.threads <= 0 or getattr(self._local, "inside", False):
+            # Inline: disabled, or already on an inference thread
+            start = time.perf_counter()
+
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+            RUN_SECONDS.observe(time.perf_counter() - start, kind=kind)
+            return future
+
+        self._ensure_started()
+
+        self._queue.put((future, kind, contextvars.copy_context(), fn, args, kwargs, time.perf_counter()))
+
+        return future
+
+    def run(self, kind: str, fn, *args, **kwargs):
+        """
+        submit() and wait for the result (exceptions are re-raised).
+        """
+        return self.submit(kind, fn, *args, **kwargs).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+
+            for _ in self._workers:
+                self._queue.put(None)
+
+            workers, self._workers, self._pid = self._workers, [], None
+
+        for worker in workers:
+            worker.join()
+
+    def thread_ids(self) -> list:
+        """
+        Idents of the inference threads (started if need be), e.g. for
+        a profiler that should see model time, not Future.result().
+        """
+        if self.threads <= 0:
+            return []
+
+        self._ensure_started()
+
+        return [worker.ident for worker in self._workers]
+
+    def snapshot(self) -> dict:
+        started = self._pid == os.getpid()
+
+        return {
+            "threads": self.threads,
+            "started": started,
+            "queued": self._queue.qsize() if started else 0,
+            "completed": self.completed,
+            "affinity": sorted(self.affinity) or None,
+        }
+
+
+INFERENCE = InferenceExecutor()
+
+
+def run_inference(kind: str, fn, *args, **kwargs):
+    """
+    Run one model call on the shared inference threads.
+    """
+    return INFERENCE.run(kind, fn, *args, **kwargs)
+
+
+def encode_batched(kind: str, encoder, texts: list, **kwargs):
+    """
+    encoder.encode(texts) as INFERENCE_BATCH_SIZE-sized calls, queued
+    one after another, so chats that arrive during a large ingestion
+    wait for one batch rather than the whole document.
+    """
+    import numpy as np
+
+    batches = [
+        run_inference(kind, encoder.encode, texts[i:i + INFERENCE_BATCH_SIZE], **kwargs)
+        for i in range(0, len(texts), INFERENCE_BATCH_SIZE)
+    ]
+
+    return np.vstack([np.asarray(batch) for batch in batches])
+
+
+gauge(
+    "inference_queued",
+    "Model calls waiting for an inference thread.",
+    function=lambda: INFERENCE.snapshot()["queued"],
+)
@@ -0,0 +1,68 @@
+import os
+import threading
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Heavy libraries (torch, sentence-transformers) are imported on first
+# load, not at module import, so the web server can bind immediately.
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-en")
+
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+_models = {}
+_lock = threading.Lock()
+
+
+def _get_or_load(key, factory):
+
+    model = _models.get(key)
+
+    if model is None:
+
+        with _lock:
+
+            model = _models.get(key)
+
+            if model is None:
+                model = factory()
+                _models[key] = model
+
+    return model
+
+
+def get_embedding_model(model_name: str = None):
+    """
+    Process-wide SentenceTransformer, loaded once and shared by
+    ingestion, retrieval and context compression.
+    """
+
+    model_name = model_name or EMBEDDING_MODEL_NAME
+
+    def factory():
+        from sentence_transformers import SentenceTransformer
+        logger.info("Loading embedding model", extra={"model": model_name})
+        return SentenceTransformer(model_name)
+
+    return _get_or_load(("embedding", model_name), factory)
+
+
+def get_cross_encoder(model_name: str = None):
+
+    model_name = model_name or RERANKER_MODEL_NAME
+
+    def factory():
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info("Loading reranker", extra={"model": model_name, "device": device})
+        return CrossEncoder(model_name, device=device)
+
+    return _get_or_load(("cross_encoder", model_name), factory)
+
+
+def is_loaded(kind: str, model_name: str) -> bool:
+    return (kind, model_name) in _models
@@ -1,29 +1,79 @@
-import torch
-from sentence_transformers import CrossEncoder
+import time
+
+from retrieval.inference import run_inference
+from retrieval.models import RERANKER_MODEL_NAME, get_cross_encoder
+from utils.logger import current_trace, get_logger
+
+logger = get_logger(__name__)
+
+# Never rerank fewer candidates than this, however short the budget
+MIN_RERANK_CANDIDATES = 5
+
 
 class Reranker:
-    def __init__(self, model_name="cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self, model_name=RERANKER_MODEL_NAME):
         """
         Recommended defaults:
         - CPU friendly
         - Strong reranking performance
         - Fast enough for local demos
+
+        The cross-encoder is loaded on first use (or by warm-up),
+        not at construction.
+        """
+        self.model_name = model_name
+        self._model = None
+
+        # Running estimate of cross-encoder cost, used to fit the
+        # candidate set into a time budget
+        self.seconds_per_pair = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_cross_encoder(self.model_name)
+        return self._model
+
+    def affordable_candidates(self, time_budget: float) -> int:
         """
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading reranker: {model_name} on {device}")
-        self.model = CrossEncoder(model_name, device=device)
+        How many candidates fit in `time_budget` seconds.
+        """
+        if self.seconds_per_pair is None:
+            return None
+
+        return max(int(time_budget / self.seconds_per_pair), MIN_RERANK_CANDIDATES)
 
-    def rerank(self, query: str, results: list, top_k: int = 10):
+    def rerank(self, query: str, results: list, top_k: int = 10, time_budget: float = None):
         if not results:
             return []
 
+        # Short on time: keep only the best retrieval candidates
+        if time_budget is not None:
+            limit = self.affordable_candidates(time_budget)
+
+            if limit is not None and limit < len(results):
+                logger.info("Rerank trimmed to fit budget", extra={"candidates": len(results), "kept": limit})
+                results = sorted(results, key=lambda x: x.get("score", 0.0), reverse=True)[:limit]
+
         # Build (query, document) pairs
         pairs = []
         for r in results:
             context = f"{r.get('section', '')}: {r.get('chunk_text', '')}"
             pairs.append([query, context])
 
-        scores = self.model.predict(pairs)
+        def predict():
+            # Timed on the inference thread: queueing is not model cost
+            start = time.perf_counter()
+            return self.model.predict(pairs), time.perf_counter() - start
+
+        scores, seconds = run_inference("rerank", predict)
+
+        per_pair = seconds / len(pairs)
+
+        if self.seconds_per_pair is None:
+            self.seconds_per_pair = per_pair
+        else:
+            self.seconds_per_pair = 0.8 * self.seconds_per_pair + 0.2 * per_pair
 
         for r, s in zip(results, scores):
             r["rerank_score"] = float(s)
@@ -31,6 +81,18 @@ class Reranker:
         # Sort by cross-encoder score (descending)
         results.sort(key=lambda x: x["rerank_score"], reverse=True)
 
+        trace = current_trace()
+
+        if trace is not None:
+            trace.add_event("rerank", [
+                {
+                    "chunk_id": r.get("chunk_id"),
+                    "score": round(r.get("score", 0.0), 4),
+                    "rerank_score": round(r["rerank_score"], 4),
+                }
+                for r in results
+            ])
+
         return results[:top_k]
 
 
@@ -1,9 +1,9 @@
-﻿import faiss
-import json
+﻿import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-MODEL_NAME = "BAAI/bge-base-en"
+from retrieval.inference import run_inference
+from retrieval.models import get_embedding_model
+from utils.logger import current_trace
 
 
 class Retriever:
@@ -24,7 +24,8 @@ class Retriever:
         1) Disk mode: index_path + meta_path
         2) In-memory mode: index_object + metadata_object
         """
-        self.model = SentenceTransformer(MODEL_NAME)
+        # Shared across documents: a new upload never reloads the model
+        self.model = get_embedding_model()
 
         in_memory_mode = index_object is not None or metadata_object is not None
         disk_mode = index_path is not None or meta_path is not None
@@ -40,18 +41,33 @@ class Retriever:
         else:
             if index_path is None or meta_path is None:
                 raise ValueError("Both index_path and meta_path are required for disk mode.")
+            import faiss
             self.index = faiss.read_index(index_path)
             with open(meta_path, "r", encoding="utf-8") as f:
                 self.meta = json.load(f)
 
         self.initial_top_k = initial_top_k
 
-    def retrieve(self, query: str):
-        query_vec = self.model.encode(
+    def encode_query(self, query: str):
+        """
+        Normalized query embedding, shape (1, dim). Computed once per
+        request and shared with later stages (e.g. context compression).
+        """
+        return run_inference(
+            "embed",
+            self.model.encode,
             [query],
             normalize_embeddings=True
         )
 
+    def retrieve(self, query: str, query_vec=None, deadline=None):
+        if query_vec is None:
+            query_vec = self.encode_query(query)
+
+        # Do not start the search for a request that already timed out
+        if deadline is not None:
+            deadline.check("retrieval")
+
         scores, indices = self.index.search(
             query_vec.astype(np.float32),
             self.initial_top_k
@@ -76,4 +92,12 @@ class Retriever:
                 "chunk_text": meta.get("chunk_text", "")
             })
 
+        trace = current_trace()
+
+        if trace is not None:
+            trace.add_event("retrieval", [
+                {"chunk_id": r["chunk_id"], "score": round(r["score"], 4)}
+                for r in results
+            ])
+
         return results
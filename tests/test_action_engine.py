@@ -0,0 +1,94 @@
+import json
+from datetime import date
+
+import pytest
+
+from actions.action_engine import ActionEngine, extract_date, extract_participants, extract_time
+from actions.action_registry import get_action, validate_field
+
+TODAY = date(2025, 3, 12)  # a Wednesday
+
+
+@pytest.fixture
+def engine():
+    return ActionEngine(today=lambda: TODAY)
+
+
+def test_meeting_filled_by_rules(engine):
+    result = engine.prepare("Book a call with Priya and Ahmed on Friday at 3pm")["response"]
+
+    assert result == {
+        "type": "action",
+        "action": "schedule_meeting",
+        "participants": ["Priya", "Ahmed"],
+        "date": "2025-03-14",
+        "time": "15:00",
+    }
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("on 2025-04-01", "2025-04-01"),
+    ("tomorrow", "2025-03-13"),
+    ("next monday", "2025-03-17"),
+    ("on wednesday", "2025-03-19"),
+    ("14 March", "2025-03-14"),
+    ("January 5th", "2026-01-05"),
+])
+def test_dates(text, expected):
+    assert extract_date(f"Meet {text}", TODAY) == expected
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("at 10:30", "10:30"),
+    ("at 3pm", "15:00"),
+    ("12am", "00:00"),
+    ("at noon", "12:00"),
+    ("at 3", "15:00"),
+])
+def test_times(text, expected):
+    assert extract_time(f"Meet {text}") == expected
+
+
+def test_participants_stop_at_date_words():
+    assert extract_participants("Set up a sync with the audit team next Tuesday") == ["audit team"]
+
+
+def test_llm_fills_only_what_rules_missed(engine):
+    pending = engine.prepare("Set up a meeting with HR next Monday")
+
+    assert "response" not in pending
+    assert '"participants": ["HR"]' in pending["prompt"]
+
+    # The LLM disagrees on the date; the rules win for structured fields
+    answer = "Sure: " + json.dumps({"participants": None, "date": "2030-01-01", "time": "09:30"})
+    result = engine.complete(pending, answer)
+
+    assert result == {
+        "type": "action",
+        "action": "schedule_meeting",
+        "participants": ["HR"],
+        "date": "2025-03-17",
+        "time": "09:30",
+    }
+
+
+def test_invalid_llm_answer_falls_back(engine):
+    ticket = engine.complete(engine.prepare("Create ticket for the thing from before"), "not json")
+    meeting = engine.complete(engine.prepare("Set up a meeting with HR"), '{"time": "25:99"}')
+
+    assert ticket["department"] == "IT" and ticket["priority"] == "Medium"
+    assert meeting["missing"] == ["date", "time"]
+
+    stats = engine.snapshot()
+    assert stats["fallback"]["count"] == 2
+    assert stats["rules"]["count"] == 0
+
+
+def test_schema_validation():
+    spec = get_action("create_ticket")
+
+    assert validate_field("Low | Medium | High", "high") == "High"
+    assert validate_field("Low | Medium | High", "Urgent") is None
+    assert validate_field("YYYY-MM-DD", "2025-02-30") is None
+    assert validate_field(["string"], ["a", " "]) == ["a"]
+    assert spec.validate({"description": "x"}) == ({"description": "x", "priority": "Medium"}, ["department"])
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.admission import AdmissionLimit, Overloaded
+from agent.deadline import Deadline, DeadlineExceeded
+
+
+def test_full_queue_is_rejected_at_once():
+    limit = AdmissionLimit("test", 1, max_queue=1, timeout_s=5)
+    limit.acquire()
+
+    waiter = threading.Thread(target=limit.acquire)
+    waiter.start()
+
+    while limit.snapshot()["queued"] == 0:
+        time.sleep(0.001)
+
+    start = time.perf_counter()
+
+    with pytest.raises(Overloaded) as exc:
+        limit.acquire()
+
+    assert exc.value.reason == "queue_full"
+    assert exc.value.retry_after >= 1
+    assert time.perf_counter() - start < 0.5
+
+    # The freed slot goes to the queued request
+    limit.release()
+    waiter.join(timeout=1)
+
+    assert limit.snapshot() == {"limit": 1, "in_use": 1, "queued": 0, "max_queue": 1}
+
+
+def test_wait_times_out():
+    limit = AdmissionLimit("test", 1, max_queue=4, timeout_s=5)
+
+    with limit.slot():
+        with pytest.raises(Overloaded) as exc:
+            limit.acquire(timeout=0.05)
+
+    assert exc.value.reason == "timeout"
+    assert limit.snapshot()["in_use"] == 0 and limit.snapshot()["queued"] == 0
+
+
+def test_coroutine_gets_slot_released_by_a_thread():
+    limit = AdmissionLimit("test", 1, max_queue=4, timeout_s=5)
+    limit.acquire()
+
+    async def wait_for_slot():
+        threading.Timer(0.05, limit.release).start()
+
+        async with limit.aslot():
+            return limit.snapshot()["in_use"]
+
+    assert asyncio.run(wait_for_slot()) == 1
+    assert limit.snapshot()["in_use"] == 0
+
+
+def test_zero_limit_disables_admission():
+    limit = AdmissionLimit("test", 0, max_queue=0)
+
+    with limit.slot(), limit.slot():
+        pass
+
+
+def test_expired_deadline_is_reported_as_such_not_as_overload():
+    limit = AdmissionLimit("cpu", 1, max_queue=1)
+    expired = Deadline(1)
+    time.sleep(0.01)
+
+    # Even with a free slot: there is no time left to use it
+    with pytest.raises(DeadlineExceeded) as exc:
+        limit.acquire(deadline=expired)
+
+    assert exc.value.stage == "cpu_admission"
+    assert limit.snapshot()["in_use"] == 0
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(limit.aacquire(deadline=expired))
+
+
+def test_deadline_running_out_while_queued_is_not_an_overload():
+    limit = AdmissionLimit("llm", 1, max_queue=1, timeout_s=5)
+
+    with limit.slot():
+        with pytest.raises(DeadlineExceeded):
+            limit.acquire(deadline=Deadline(50))
+
+        async def wait():
+            async with limit.aslot(deadline=Deadline(50)):
+                pass
+
+        with pytest.raises(DeadlineExceeded):
+            asyncio.run(wait())
+
+    assert limit.snapshot() == {"limit": 1, "in_use": 0, "queued": 0, "max_queue": 1}
@@ -1,10 +1,16 @@
 ﻿import importlib
 import io
+import os
 import sys
 import types
 
 import pytest
 
+from agent import admission
+from agent.admission import AdmissionLimit
+from utils import profiler as profiler_module
+from utils.profiler import ProfileGate
+
 
 @pytest.fixture
 def app_module(monkeypatch):
@@ -20,7 +26,7 @@ def app_module(monkeypatch):
         def set_active_document(self, index, metadata, tables_raw):
             self.doc_loaded = True
 
-        def handle(self, query):
+        def handle(self, query, deadline=None):
             return {"type": "information", "answer": f"handled: {query}"}
 
     fake_supervisor_module.AgentSupervisor = FakeSupervisor
@@ -61,6 +67,14 @@ def test_empty_query(client):
     assert response.status_code == 400
 
 
+def test_non_object_body_is_rejected(client):
+    for body in (["query"], "What is revenue?", 42):
+        response = client.post("/api/v1/chat", json=body)
+
+        assert response.status_code == 400
+        assert response.get_json()["error"]["code"] == "INVALID_REQUEST"
+
+
 def test_invalid_upload_extension(client):
     data = {"file": (io.BytesIO(b"hello"), "note.txt")}
     response = client.post("/upload", data=data, content_type="multipart/form-data")
@@ -104,3 +118,133 @@ def test_successful_upload_and_chat(client):
 
     assert chat_payload["success"] is True
     assert chat_payload["data"]["answer"] == "handled: Hello"
+
+
+def test_readiness_flips_after_warm_up(client, app_module):
+    if app_module.warmup_thread is not None:
+        app_module.warmup_thread.join(timeout=5)
+
+    response = client.get("/healthz/ready")
+
+    assert response.status_code == 200
+    assert response.get_json()["data"]["ready"] is True
+
+
+def test_readiness_reports_failed_warm_up(client, app_module, monkeypatch):
+    def failing_warm_up():
+        raise RuntimeError("model download failed")
+
+    monkeypatch.setattr(app_module.agent, "warm_up", failing_warm_up, raising=False)
+    monkeypatch.setitem(app_module.readiness, "ready", False)
+
+    app_module._warm_up()
+
+    response = client.get("/healthz/ready")
+
+    assert response.status_code == 503
+    assert response.get_json()["data"]["error"] == "model download failed"
+
+
+def test_chat_deadline_exceeded_returns_timings(client, app_module, monkeypatch):
+    from agent.deadline import DeadlineExceeded
+
+    def slow_handle(query, deadline=None):
+        deadline.timings_ms["retrieval"] = 12.5
+        raise DeadlineExceeded("rerank", deadline)
+
+    app_module.agent.doc_loaded = True
+    monkeypatch.setattr(app_module.agent, "handle", slow_handle)
+
+    response = client.post("/api/v1/chat", json={"query": "Hi", "deadline_ms": 2000})
+
+    assert response.status_code == 504
+    error = response.get_json()["error"]
+    assert error["code"] == "DEADLINE_EXCEEDED"
+    assert error["stage"] == "rerank"
+    assert error["budget_ms"] == 2000
+    assert error["timings_ms"] == {"retrieval": 12.5}
+
+
+def test_upload_rejected_with_retry_after_when_saturated(client, app_module, monkeypatch):
+    full = AdmissionLimit("ingest", 1, max_queue=0)
+    full.acquire()
+    monkeypatch.setattr(app_module, "INGEST_LIMIT", full)
+
+    data = {"file": (io.BytesIO(b"%PDF- fake"), "doc.pdf")}
+    response = client.post("/api/v1/upload", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["error"]["code"] == "OVERLOADED"
+    assert app_module.agent.doc_loaded is False
+
+
+def test_uploads_do_not_take_chat_slots(client, app_module, monkeypatch):
+    chat_slots = AdmissionLimit("cpu", 1, max_queue=0)
+    chat_slots.acquire()
+    monkeypatch.setattr(admission, "CPU_LIMIT", chat_slots)
+    monkeypatch.setattr(app_module, "CPU_LIMIT", chat_slots, raising=False)
+
+    data = {"file": (io.BytesIO(b"%PDF- fake"), "doc.pdf")}
+    response = client.post("/api/v1/upload", data=data, content_type="multipart/form-data")
+
+    assert response.status_code == 200
+    assert chat_slots.snapshot()["in_use"] == 1
+
+
+def test_metrics_endpoint(client, app_module):
+    app_module.agent.doc_loaded = True
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+
+    text = response.get_data(as_text=True)
+
+    assert "documents_loaded 1" in text
+    assert "# TYPE chat_stage_seconds histogram" in text
+    assert "process_resident_memory_bytes" in text
+
+
+def test_chat_debug_returns_trace_and_request_id(client, app_module):
+    app_module.agent.doc_loaded = True
+
+    response = client.post(
+        "/api/v1/chat",
+        json={"query": "What is revenue?", "debug": True},
+        headers={"X-Request-ID": "client-42"},
+    )
+
+    payload = response.get_json()
+
+    assert response.headers["X-Request-ID"] == "client-42"
+    assert payload["data"]["debug"]["request_id"] == "client-42"
+    assert "spans" in payload["data"]["debug"]
+
+    plain = client.post("/api/v1/chat", json={"query": "What is revenue?"})
+
+    assert "debug" not in plain.get_json()["data"]
+    assert plain.headers["X-Request-ID"]
+
+
+def test_chat_profiling_requires_admin_and_writes_files(client, app_module, monkeypatch, tmp_path):
+    app_module.agent.doc_loaded = True
+
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiler_module, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiler_module, "PROFILE_GATE", ProfileGate(min_interval_s=0))
+
+    denied = client.post("/api/v1/chat?profile=1", json={"query": "What is revenue?"})
+    assert denied.status_code == 403
+
+    response = client.post(
+        "/api/v1/chat",
+        json={"query": "What is revenue?"},
+        headers={"X-Profile": "1", "X-Admin-Token": "secret"},
+    )
+
+    assert response.status_code == 200
+
+    profile_id = response.headers["X-Profile-Id"]
+
+    assert sorted(os.listdir(tmp_path)) == [f"{profile_id}.folded", f"{profile_id}.txt"]
@@ -0,0 +1,153 @@
+import asyncio
+import importlib
+import sys
+import threading
+import types
+
+import httpx
+import pytest
+
+from agent.supervisor import AgentSupervisor
+from evaluation.fake_llm_server import CANNED_ANSWER, start_fake_llm_server
+from llm.hf_inference_client import HFInferenceClient
+from retrieval.document_store import DocumentSnapshot
+
+
+class _DummyRetriever:
+    def encode_query(self, _query):
+        return [[1.0]]
+
+    def retrieve(self, _query, query_vec=None, deadline=None):
+        return [{"score": 0.9, "chunk_id": "c1", "section": "Overview", "pages": [2],
+                 "tables": [], "images": [], "chunk_text": "Revenue grew 10%."}]
+
+
+class _DummyReranker:
+    def rerank(self, _query, results, top_k=7, time_budget=None):
+        return results[:top_k]
+
+
+@pytest.fixture
+def asgi_module(monkeypatch):
+    fake_supervisor_module = types.ModuleType("agent.supervisor")
+
+    class FakeSupervisor:
+        def __init__(self):
+            self.doc_loaded = True
+
+        def has_active_document(self):
+            return self.doc_loaded
+
+        async def ahandle(self, query, deadline=None):
+            await asyncio.sleep(0.2)
+            return {"type": "information", "answer": f"async: {query}"}
+
+    fake_supervisor_module.AgentSupervisor = FakeSupervisor
+    monkeypatch.setitem(sys.modules, "agent.supervisor", fake_supervisor_module)
+
+    fake_ingestion_module = types.ModuleType("ingestion.runtime_ingestion")
+    fake_ingestion_module.ingest_pdf_to_runtime = lambda _path: {"index": object(), "metadata": [], "tables": []}
+    monkeypatch.setitem(sys.modules, "ingestion.runtime_ingestion", fake_ingestion_module)
+
+    for name in ("web_app", "asgi"):
+        sys.modules.pop(name, None)
+
+    yield importlib.import_module("asgi")
+
+    for name in ("web_app", "asgi"):
+        sys.modules.pop(name, None)
+
+
+def test_asgi_chat_requests_run_concurrently(asgi_module):
+    async def scenario():
+        transport = httpx.ASGITransport(app=asgi_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = asyncio.get_running_loop().time()
+            responses = await asyncio.gather(*[
+                client.post("/api/v1/chat", json={"query": f"q{i}"}) for i in range(50)
+            ])
+            elapsed = asyncio.get_running_loop().time() - started
+
+            empty = await client.post("/chat", json={"query": " "})
+            not_an_object = await client.post("/api/v1/chat", json=["query"])
+            health = await client.get("/")
+
+        return responses, elapsed, empty, not_an_object, health
+
+    responses, elapsed, empty, not_an_object, health = asyncio.run(scenario())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[7].json()["data"]["answer"] == "async: q7"
+    # 50 x 0.2s sleeps overlap on one event loop
+    assert elapsed < 2
+    assert empty.status_code == 400
+    assert not_an_object.status_code == 400
+    assert not_an_object.json()["error"]["code"] == "INVALID_REQUEST"
+    assert health.json()["success"] is True
+
+
+def test_document_check_runs_off_the_event_loop(asgi_module):
+    threads = []
+
+    def has_active_document():
+        threads.append(threading.get_ident())
+        return True
+
+    asgi_module.agent.has_active_document = has_active_document
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=asgi_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/v1/chat", json={"query": "q"}), threading.get_ident()
+
+    response, loop_thread = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert threads and loop_thread not in threads
+
+
+def test_unexpected_error_is_logged_with_a_status(asgi_module, monkeypatch):
+    async def broken(*_args):
+        raise RuntimeError("boom")
+
+    served = []
+    monkeypatch.setattr(asgi_module, "_handle_chat", broken)
+    monkeypatch.setattr(asgi_module.logger, "info", lambda msg, extra=None: served.append(extra))
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/chat", "headers": [], "query_string": b""}
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(asgi_module._chat(scope, None, None))
+
+    assert served[-1]["status"] == 500
+
+
+def test_ahandle_awaits_llm(monkeypatch):
+    monkeypatch.setattr("agent.supervisor.Reranker", lambda: _DummyReranker())
+    monkeypatch.setattr("utils.tokens._tokenizer", False)
+
+    sup = AgentSupervisor()
+    sup.document = DocumentSnapshot(_DummyRetriever(), [])
+
+    async def fake_agenerate(prompt, deadline=None):
+        assert "Revenue grew 10%." in prompt
+        return "Revenue grew 10%. (Source: Page 2)"
+
+    monkeypatch.setattr(sup.hf_client, "agenerate", fake_agenerate)
+
+    output = asyncio.run(sup.ahandle("How much did revenue grow?"))
+
+    assert output["type"] == "information"
+    assert output["answer"] == "Revenue grew 10%. (Source: Page 2)"
+
+
+def test_agenerate_against_local_server():
+    server, url = start_fake_llm_server(latency_s=0.05)
+
+    try:
+        client = HFInferenceClient(api_token="test", timeout=5)
+        client.url = url
+
+        assert asyncio.run(client.agenerate("hello")) == CANNED_ANSWER
+    finally:
+        server.shutdown()
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from ingestion.chunker import build_chunks, split_section
+
+
+def _write(path, payload):
+    path.write_text(json.dumps(payload), encoding="utf-8")
+    return str(path)
+
+
+def test_long_section_is_split_into_overlapping_windows():
+    paragraphs = [
+        (" ".join(f"a{i}" for i in range(10)), 1),
+        (" ".join(f"b{i}" for i in range(10)), 2),
+    ]
+
+    windows = split_section(paragraphs, max_tokens=8, overlap_tokens=2)
+
+    assert [count for _, _, count in windows] == [8, 8, 8]
+    assert windows[0][0].split()[-2:] == windows[1][0].split()[:2]
+    assert windows[0][1] == [1]
+    assert windows[1][1] == [1, 2]
+    assert windows[2][1] == [2]
+
+
+def test_short_section_keeps_original_text():
+    windows = split_section([("First line.", 4), ("Second line.", 5)], max_tokens=50, overlap_tokens=5)
+
+    assert windows == [("First line.\nSecond line.", [4, 5], 4)]
+
+
+def test_overlap_must_be_smaller_than_window():
+    with pytest.raises(ValueError):
+        split_section([("a b c", 1)], max_tokens=4, overlap_tokens=4)
+
+
+def test_build_chunks_reports_size_distribution(tmp_path):
+    text_elements = [
+        {"type": "Title", "text": "Leave Policy", "page": 1},
+        {"type": "NarrativeText", "text": " ".join(["word"] * 25), "page": 1},
+        {"type": "Title", "text": "Travel", "page": 2},
+        {"type": "NarrativeText", "text": "Short travel note.", "page": 2},
+    ]
+    tables_index = [{"id": "table_1", "page": 2, "summary": ""}]
+
+    output_path = tmp_path / "chunks.json"
+
+    stats = build_chunks(
+        text_path=_write(tmp_path / "text.json", text_elements),
+        tables_index_path=_write(tmp_path / "tables.json", tables_index),
+        images_path=str(tmp_path / "missing.json"),
+        output_path=str(output_path),
+        max_tokens=10,
+        overlap_tokens=2,
+    )
+
+    chunks = json.loads(output_path.read_text(encoding="utf-8"))
+
+    assert [c["section"] for c in chunks] == ["Leave Policy"] * 3 + ["Travel"]
+    assert [c["chunk_id"] for c in chunks] == ["chunk_001", "chunk_002", "chunk_003", "chunk_004"]
+    assert chunks[-1]["tables"] == ["table_1"]
+    assert stats["chunks"] == 4
+    assert stats["tokens_max"] == 10
+    assert stats["tokens_min"] == 3
@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+from llm import hf_inference_client
+from llm.completion_cache import CompletionCache
+from llm.hf_inference_client import HFInferenceClient
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"choices": [{"message": {"content": "cached answer"}}]}
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_post(*_args, **kwargs):
+        calls.append(kwargs["json"])
+        return _Response()
+
+    monkeypatch.setattr(hf_inference_client.requests, "post", fake_post)
+
+    c = HFInferenceClient(api_token="test", generation_model="cache-test-model")
+    c.cache = CompletionCache(str(tmp_path))
+    c.calls = calls
+    return c
+
+
+def test_repeated_prompt_skips_the_router(client):
+    assert client.generate("same prompt") == "cached answer"
+    assert client.generate("same prompt") == "cached answer"
+
+    assert len(client.calls) == 1
+    assert client.cache.snapshot()["hits"] == 1
+    assert client.cache.snapshot()["hit_rate"] == 0.5
+
+
+def test_params_and_temperature_change_the_key(client):
+    client.generate("same prompt")
+    client.generate("same prompt", max_new_tokens=64)
+    client.generate("same prompt", temperature=0.9)
+    client.generate("same prompt", temperature=0.9)
+
+    # Different params miss; high-temperature calls are never cached
+    assert len(client.calls) == 4
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = CompletionCache(str(tmp_path), ttl_s=0.05)
+    cache.put("k", "answer")
+
+    assert cache.get("k") == "answer"
+
+    time.sleep(0.1)
+
+    assert cache.get("k") is None
+    assert cache.snapshot()["expired"] == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), "k.json"))
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = CompletionCache(str(tmp_path))
+    now = time.time()
+
+    for i in range(4):
+        cache.put(f"k{i}", "x" * 50)
+        os.utime(os.path.join(str(tmp_path), f"k{i}.json"), (now - 10 + i, now - 10 + i))
+
+    # Touch the oldest entry so it is the most recently used
+    assert cache.get("k0") == "x" * 50
+
+    cache.max_bytes = sum(os.path.getsize(os.path.join(str(tmp_path), f"{k}.json")) for k in ("k0", "k3"))
+    cache.enforce_limits()
+
+    assert sorted(os.listdir(str(tmp_path))) == ["k0.json", "k3.json"]
+    assert cache.snapshot()["evictions"] == 2
@@ -0,0 +1,69 @@
+import numpy as np
+
+from retrieval.compressor import compress_context, split_sentences
+
+VOCAB = ["revenue", "growth", "office", "parking", "holiday", "canteen", "laptop", "badge"]
+
+
+class _BagOfWordsEncoder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **_kwargs):
+        self.calls += 1
+        vectors = np.zeros((len(texts), len(VOCAB)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for col, word in enumerate(VOCAB):
+                vectors[row, col] = text.lower().count(word)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+def _query(text):
+    return _BagOfWordsEncoder().encode([text])
+
+
+def test_keeps_relevant_sentences_with_neighbours():
+    items = [
+        {
+            "text": "Parking is free. The canteen opens at 9. Revenue growth was 12%. "
+                    "Holiday list is on the intranet. Laptop refresh is every 3 years.",
+            "pages": [4],
+            "tables": ["table_1"],
+        },
+        {
+            "text": "Badge access is required. Office hours are 9 to 5. Parking permits renew yearly.",
+            "pages": [9],
+            "tables": [],
+        },
+    ]
+    encoder = _BagOfWordsEncoder()
+
+    compressed, stats = compress_context(items, _query("revenue growth"), encoder, keep_sentences=1, neighbours=1)
+
+    assert encoder.calls == 1
+    assert compressed[0]["text"] == (
+        "The canteen opens at 9. Revenue growth was 12%. Holiday list is on the intranet."
+    )
+    assert compressed[0]["pages"] == [4]
+    assert compressed[0]["tables"] == ["table_1"]
+    # Second chunk still contributes its best sentence for the citation
+    assert compressed[1]["pages"] == [9]
+    assert compressed[1]["text"]
+    assert stats["ratio"] < 1.0
+    assert stats["chars_after"] < stats["chars_before"]
+
+
+def test_gaps_are_marked_and_short_context_is_untouched():
+    items = [{"text": "Revenue up. A. B. C. Growth down.", "pages": [1]}]
+
+    compressed, _ = compress_context(items, _query("revenue growth"), _BagOfWordsEncoder(), keep_sentences=2, neighbours=0)
+    assert compressed[0]["text"] == "Revenue up. ... Growth down."
+
+    untouched, stats = compress_context(items, _query("revenue"), _BagOfWordsEncoder(), keep_sentences=10)
+    assert untouched == items
+    assert stats["ratio"] == 1.0
+
+
+def test_split_sentences_handles_newlines():
+    assert split_sentences("One. Two!\nThree?  Four") == ["One.", "Two!", "Three?", "Four"]
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from agent.deadline import MAX_DEADLINE_MS, MIN_DEADLINE_MS, Deadline, DeadlineExceeded
+from agent.supervisor import AgentSupervisor
+from llm.hf_inference_client import HFDeadlineError, HFInferenceClient
+from retrieval.document_store import DocumentSnapshot
+from retrieval.reranker import MIN_RERANK_CANDIDATES, Reranker
+
+
+class _SlowRetriever:
+    def encode_query(self, _query):
+        return [[1.0]]
+
+    def retrieve(self, _query, query_vec=None, deadline=None):
+        time.sleep(0.08)
+        return [{"score": 0.9, "chunk_id": "c1", "chunk_text": "text"}]
+
+
+class _CountingModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, pairs):
+        self.batch_sizes.append(len(pairs))
+        return [0.0] * len(pairs)
+
+
+def test_client_override_is_clamped():
+    assert Deadline.from_request(None).budget_ms == Deadline().budget_ms
+    assert Deadline.from_request("oops").budget_ms == Deadline().budget_ms
+    assert Deadline.from_request(5).budget_ms == MIN_DEADLINE_MS
+    assert Deadline.from_request(10 ** 9).budget_ms == MAX_DEADLINE_MS
+    assert Deadline.from_request(5000).budget_ms == 5000
+
+
+def test_stage_past_deadline_reports_timings():
+    deadline = Deadline(budget_ms=20)
+
+    with deadline.stage("fast"):
+        pass
+
+    with pytest.raises(DeadlineExceeded) as exc:
+        with deadline.stage("slow"):
+            time.sleep(0.05)
+
+    assert exc.value.stage == "slow"
+    assert set(exc.value.timings_ms) == {"fast", "slow"}
+    assert exc.value.timings_ms["slow"] >= 50
+
+
+def test_reranker_shrinks_candidates_when_time_is_short():
+    reranker = Reranker()
+    reranker._model = _CountingModel()
+    results = [{"score": i / 100, "chunk_text": str(i)} for i in range(25)]
+
+    reranker.rerank("q", list(results), top_k=3)
+    reranker.seconds_per_pair = 0.01
+
+    ranked = reranker.rerank("q", list(results), top_k=3, time_budget=0.02)
+
+    assert reranker._model.batch_sizes == [25, MIN_RERANK_CANDIDATES]
+    # The best retrieval candidates are the ones kept
+    assert {r["chunk_text"] for r in ranked} <= {"24", "23", "22", "21", "20"}
+
+
+def test_supervisor_raises_with_stage_timings(monkeypatch):
+    monkeypatch.setattr("agent.supervisor.Reranker", lambda: object())
+    sup = AgentSupervisor()
+    sup.document = DocumentSnapshot(_SlowRetriever(), [])
+
+    with pytest.raises(DeadlineExceeded) as exc:
+        sup.handle("What is revenue?", deadline=Deadline(budget_ms=50))
+
+    assert exc.value.stage == "retrieval"
+    assert list(exc.value.timings_ms) == ["intent", "embed_query", "retrieval"]
+
+
+def test_llm_call_gets_only_the_remaining_time(monkeypatch):
+    client = HFInferenceClient(api_token="test")
+    timeouts = []
+
+    def fake_post(*_args, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        raise HFDeadlineError("stop")
+
+    monkeypatch.setattr("llm.hf_inference_client.requests.post", fake_post)
+
+    with pytest.raises(HFDeadlineError):
+        client.generate("hi", deadline=time.monotonic() + 2)
+
+    assert 0 < timeouts[0] <= 2
+
+    with pytest.raises(HFDeadlineError):
+        client.generate("hi", deadline=time.monotonic() - 1)
+
+    assert len(timeouts) == 1
@@ -0,0 +1,58 @@
+import faiss
+import numpy as np
+import pytest
+
+from agent.supervisor import AgentSupervisor
+from retrieval.document_store import KEEP_VERSIONS, DocumentStore
+
+
+class _FakeRetriever:
+    def __init__(self, index_object, metadata_object, initial_top_k):
+        self.index = index_object
+        self.meta = metadata_object
+
+
+def _index(rows):
+    index = faiss.IndexFlatIP(4)
+    index.add(np.eye(4, dtype=np.float32)[:rows])
+    return index
+
+
+@pytest.fixture
+def workers(monkeypatch, tmp_path):
+    monkeypatch.setenv("DOCUMENT_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr("agent.supervisor.Reranker", lambda: object())
+    monkeypatch.setattr("agent.supervisor.Retriever", _FakeRetriever)
+    return AgentSupervisor(), AgentSupervisor()
+
+
+def test_upload_in_one_worker_is_visible_in_another(workers):
+    uploader, other = workers
+
+    assert other.has_active_document() is False
+
+    uploader.set_active_document(_index(2), [{"chunk_id": "a"}, {"chunk_id": "b"}], [{"id": "t1"}])
+
+    assert other.has_active_document() is True
+    assert other.retriever.index.ntotal == 2
+    assert other.retriever.meta[1]["chunk_id"] == "b"
+    assert other.tables_raw == [{"id": "t1"}]
+
+    uploader.set_active_document(_index(3), [{"chunk_id": c} for c in "xyz"], [])
+
+    assert other.has_active_document() is True
+    assert other.retriever.index.ntotal == 3
+    assert other.document_version == uploader.document_version
+
+
+def test_old_versions_are_pruned(tmp_path):
+    store = DocumentStore(str(tmp_path))
+
+    for _ in range(KEEP_VERSIONS + 2):
+        version = store.publish(_index(1), [{"chunk_id": "a"}], [])
+
+    assert store.active_version() == version
+    assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == KEEP_VERSIONS
+
+    index, metadata, tables = store.load(version)
+    assert index.ntotal == 1 and metadata == [{"chunk_id": "a"}] and tables == []
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _model_cached(name):
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+
+    return isinstance(try_to_load_from_cache(name, "config.json"), str)
+
+
+def _run_json(script, *args, timeout=120):
+    # Logs go to stderr, so stdout must be the JSON report alone
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "evaluation", script), *args, "--json"],
+        capture_output=True, text=True, timeout=timeout, cwd=ROOT,
+        env=dict(os.environ, HF_HUB_OFFLINE="1"),
+    )
+
+    assert result.returncode == 0, result.stderr
+
+    return json.loads(result.stdout)
+
+
+def test_bench_retrieval_json_is_parseable():
+    report = _run_json("bench_retrieval.py", "--sizes", "200", "--dim", "32", "--queries", "5")
+
+    assert report["runs"]["200"]["chunks"] == 200
+    assert report["runs"]["200"]["ops"]["retrieve"]["calls"] == 5
+
+
+@pytest.mark.skipif(not _model_cached(os.getenv("EMBEDDING_MODEL", "BAAI/bge-base-en")), reason="needs the embedding model in the HF cache")
+def test_eval_retrieval_json_is_parseable():
+    report = _run_json(
+        "eval_retrieval.py", "--index", "flat", "--quantization", "none", "--top-k", "10", "--reranker", "off",
+        timeout=600,
+    )
+
+    assert report["questions"] > 0
+    assert report["results"]
+
+
+def test_bench_table_rendering_json_is_parseable():
+    report = _run_json("bench_table_rendering.py")
+
+    assert report["tables"]
+    assert report["rendered_tokens"] < report["raw_tokens"]
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import socket
+import time
+
+import pytest
+
+from evaluation.fake_llm_server import start_fake_llm_server
+from llm.generation_policy import GenerationPolicy, MIN_SAMPLES, parse_model_list
+from llm.hf_inference_client import HFInferenceClient
+
+_models = itertools.count()
+
+
+def _client(url, max_retries=1):
+    return HFInferenceClient(
+        api_token="test",
+        generation_model=f"model-{next(_models)}",
+        timeout=5,
+        max_retries=max_retries,
+        url=url,
+    )
+
+
+def _dead_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"http://127.0.0.1:{port}/v1/chat/completions"
+
+
+@pytest.fixture
+def slow_and_fast():
+    slow, slow_url = start_fake_llm_server(latency_s=1.5, answer="slow")
+    fast, fast_url = start_fake_llm_server(latency_s=0.05, answer="fast")
+
+    yield slow_url, fast_url
+
+    slow.shutdown()
+    fast.shutdown()
+
+
+def test_hedge_beats_slow_primary(slow_and_fast):
+    slow_url, fast_url = slow_and_fast
+    policy = GenerationPolicy([_client(slow_url), _client(fast_url)], hedge_delay=0.1)
+
+    start = time.monotonic()
+    answer = policy.generate("hi")
+
+    assert answer == "fast"
+    assert time.monotonic() - start < 1.0
+
+    fast_stats = policy.stats(policy.clients[1])
+    assert fast_stats.hedges_total == 1 and fast_stats.wins_total == 1
+
+
+def test_async_hedge_cancels_the_loser(slow_and_fast):
+    slow_url, fast_url = slow_and_fast
+    policy = GenerationPolicy([_client(slow_url), _client(fast_url)], hedge_delay=0.1)
+
+    async def scenario():
+        answer = await policy.agenerate("hi")
+        await asyncio.sleep(0.05)
+        others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return answer, [t for t in others if not t.cancelled()]
+
+    start = time.monotonic()
+    answer, leftover = asyncio.run(scenario())
+
+    assert answer == "fast"
+    assert time.monotonic() - start < 1.0
+    assert leftover == []
+    # The cancelled request is neither a success nor an error
+    assert policy.stats(policy.clients[0]).requests_total == 0
+
+
+def test_cancelled_hedge_loser_releases_its_probe(slow_and_fast):
+    slow_url, fast_url = slow_and_fast
+    policy = GenerationPolicy([_client(slow_url), _client(fast_url)], hedge_delay=0.1)
+
+    # The slow primary is recovering: its call is the half-open probe
+    breaker = policy.clients[0].breaker
+    breaker.state = "half_open"
+
+    assert asyncio.run(policy.agenerate("hi")) == "fast"
+
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+
+
+def test_failed_model_falls_back_without_waiting_for_hedge(slow_and_fast):
+    _, fast_url = slow_and_fast
+    policy = GenerationPolicy([_client(_dead_url()), _client(fast_url)], hedge_delay=10)
+
+    start = time.monotonic()
+
+    assert policy.generate("hi") == "fast"
+    assert time.monotonic() - start < 2
+    assert policy.stats(policy.clients[0]).errors_total == 1
+
+
+def test_stats_drive_ordering_and_hedge_delay():
+    first, second = _client("http://first"), _client("http://second")
+    policy = GenerationPolicy([first, second])
+
+    assert policy.ordered() == [first, second]
+
+    for _ in range(MIN_SAMPLES):
+        policy.stats(first).record_success(2.0)
+        policy.stats(second).record_success(0.8)
+
+    assert policy.ordered() == [second, first]
+    assert policy.hedge_delay_for(second) == pytest.approx(0.8)
+
+    for _ in range(MIN_SAMPLES * 2):
+        policy.stats(second).record_error()
+
+    assert policy.ordered() == [first, second]
+
+
+def test_parse_model_list():
+    assert parse_model_list("a, b@http://x/v1 ,", default_url="http://default") == [
+        ("a", "http://default"),
+        ("b", "http://x/v1"),
+    ]
@@ -0,0 +1,175 @@
+import itertools
+import time
+
+import pytest
+import requests
+
+from llm import hf_inference_client
+from llm.hf_inference_client import CircuitOpenError, HFDeadlineError, HFGenerationError, HFInferenceClient
+from llm.retry_policy import RetryPolicy, parse_retry_after
+
+_urls = itertools.count()
+
+
+class _Response:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def json(self):
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(hf_inference_client.time, "sleep", sleeps.append)
+    monkeypatch.setenv("HF_INFERENCE_V1_URL", f"http://upstream-{next(_urls)}/v1/chat/completions")
+
+    c = HFInferenceClient(api_token="test", max_retries=5)
+    c.sleeps = sleeps
+    return c
+
+
+def _script(monkeypatch, responses):
+    calls = []
+
+    def fake_post(*_args, **kwargs):
+        calls.append(kwargs["timeout"])
+        result = responses.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(hf_inference_client.requests, "post", fake_post)
+    return calls
+
+
+def test_retry_after_is_honoured(client, monkeypatch):
+    _script(monkeypatch, [_Response(429, {"Retry-After": "2"}), _Response(200)])
+
+    assert client.generate("hi") == "ok"
+    assert client.sleeps == [2.0]
+
+
+def test_retry_after_beyond_deadline_fails_fast(client, monkeypatch):
+    calls = _script(monkeypatch, [_Response(429, {"Retry-After": "120"})])
+
+    with pytest.raises(HFGenerationError):
+        client.generate("hi")
+
+    assert len(calls) == 1
+    assert client.sleeps == []
+
+
+def test_client_errors_are_not_retried(client, monkeypatch):
+    calls = _script(monkeypatch, [_Response(401)])
+
+    with pytest.raises(HFGenerationError, match="401"):
+        client.generate("hi")
+
+    assert len(calls) == 1
+    assert client.breaker.state == "closed"
+
+
+def test_backoff_is_capped_and_jittered():
+    policy = RetryPolicy(base_delay=1, max_delay=4, deadline_s=60)
+
+    delays = [policy.backoff(attempt) for attempt in range(10) for _ in range(20)]
+
+    assert all(0 <= d <= 4 for d in delays)
+    assert len(set(delays)) > 1
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+
+
+def test_breaker_opens_then_recovers(client, monkeypatch):
+    client.breaker.reset_timeout = 0.5
+    _script(monkeypatch, [requests.ConnectionError("down")] * 5)
+
+    with pytest.raises(HFGenerationError):
+        client.generate("hi")
+
+    assert client.breaker.state == "open"
+
+    calls = _script(monkeypatch, [_Response(200)])
+
+    with pytest.raises(CircuitOpenError):
+        client.generate("hi")
+
+    assert calls == []
+    assert client.breaker.snapshot()["rejected_total"] == 1
+
+    # Simulate the reset timeout elapsing
+    client.breaker.opened_at -= 1
+
+    assert client.generate("hi") == "ok"
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_is_shared_between_clients(client):
+    other = HFInferenceClient(api_token="test")
+
+    assert other.breaker is client.breaker
+
+
+def _half_open(breaker):
+    breaker.record_failure()
+    breaker.state, breaker.opened_at = "open", time.monotonic() - breaker.reset_timeout
+
+
+def test_probe_without_a_verdict_is_released(client, monkeypatch):
+    calls = _script(monkeypatch, [])
+    _half_open(client.breaker)
+
+    with pytest.raises(HFDeadlineError):
+        client.generate("hi", deadline=time.monotonic() - 1)
+
+    assert calls == []
+    assert client.breaker.state == "half_open"
+    assert client.breaker.allow_request()
+
+
+def test_abandoned_stream_releases_the_probe(client, monkeypatch):
+    class _Stream(_Response):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_exc):
+            pass
+
+        def iter_lines(self, **_kwargs):
+            yield 'data: {"choices": [{"delta": {"content": "partial"}}]}'
+            yield 'data: {"choices": [{"delta": {"content": " answer"}}]}'
+
+    _script(monkeypatch, [_Stream(200)])
+    _half_open(client.breaker)
+
+    chunks = client.stream("hi")
+    assert next(chunks) == "partial"
+    chunks.close()
+
+    assert client.breaker.allow_request()
+
+
+def test_stale_probe_times_out(client):
+    _half_open(client.breaker)
+    client.breaker.probe_timeout = 5
+
+    assert client.breaker.allow_request()
+    assert not client.breaker.allow_request()
+
+    client.breaker._probe_started -= 5
+
+    assert client.breaker.allow_request()
+
+
+def test_unreadable_body_is_retried(client, monkeypatch):
+    class _Garbled(_Response):
+        def json(self):
+            raise ValueError("Expecting value")
+
+    calls = _script(monkeypatch, [_Garbled(200), _Response(200)])
+
+    assert client.generate("hi") == "ok"
+    assert len(calls) == 2
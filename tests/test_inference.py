@@ -0,0 +1,88 @@
+import contextvars
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from retrieval import inference
+from retrieval.inference import InferenceExecutor, parse_cpu_list
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_calls_run_on_inference_threads_in_the_callers_context():
+    executor = InferenceExecutor(threads=1)
+    request_id.set("req-1")
+
+    try:
+        name, seen = executor.run("embed", lambda: (threading.current_thread().name, request_id.get()))
+
+        assert name == "inference-0"
+        assert seen == "req-1"
+
+        with pytest.raises(ValueError):
+            executor.run("embed", int, "not a number")
+    finally:
+        executor.shutdown()
+
+
+def test_zero_threads_runs_inline():
+    executor = InferenceExecutor(threads=0)
+
+    assert executor.run("embed", lambda: threading.current_thread()) is threading.current_thread()
+    assert not executor.snapshot()["started"]
+
+
+def test_nested_calls_do_not_deadlock():
+    executor = InferenceExecutor(threads=1)
+
+    try:
+        assert executor.run("embed", lambda: executor.run("rerank", lambda: 42)) == 42
+    finally:
+        executor.shutdown()
+
+
+def test_torch_threads_are_split_between_inference_threads(monkeypatch):
+    calls = {}
+
+    fake_torch = types.SimpleNamespace(
+        get_num_threads=lambda: 8,
+        set_num_threads=lambda n: calls.setdefault("intra", n),
+        set_num_interop_threads=lambda n: calls.setdefault("interop", n),
+        get_num_interop_threads=lambda: calls.get("interop", 1),
+    )
+    monkeypatch.setitem(sys.modules, "torch", fake_torch)
+    monkeypatch.delenv("TORCH_NUM_THREADS", raising=False)
+    monkeypatch.setenv("TORCH_INTEROP_THREADS", "2")
+
+    executor = InferenceExecutor(threads=2)
+
+    try:
+        executor.run("embed", lambda: None)
+    finally:
+        executor.shutdown()
+
+    assert calls == {"intra": 4, "interop": 2}
+
+
+def test_ingestion_is_encoded_in_queued_batches(monkeypatch):
+    batches = []
+
+    class FakeEncoder:
+        def encode(self, texts, **_kwargs):
+            batches.append(len(texts))
+            return np.asarray([[float(t)] for t in texts])
+
+    monkeypatch.setattr(inference, "INFERENCE_BATCH_SIZE", 4)
+
+    vectors = inference.encode_batched("ingest", FakeEncoder(), [str(i) for i in range(10)])
+
+    assert batches == [4, 4, 2]
+    assert vectors.ravel().tolist() == list(range(10))
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3, 6") == {0, 1, 2, 3, 6}
+    assert parse_cpu_list("") == set()
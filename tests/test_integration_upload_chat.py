@@ -21,7 +21,7 @@ def app_module(monkeypatch):
         def set_active_document(self, index, metadata, tables_raw):
             self.doc_loaded = True
 
-        def handle(self, query):
+        def handle(self, query, deadline=None):
             return {"type": "information", "answer": f"handled: {query}"}
 
     fake_supervisor_module.AgentSupervisor = FakeSupervisor
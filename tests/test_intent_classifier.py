@@ -0,0 +1,83 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from agent import intent_classifier
+from agent.intent_classifier import EmbeddingIntentClassifier
+
+_EXAMPLES = {
+    "ACTION": ["create a ticket for vpn", "reset my password", "schedule a meeting with hr"],
+    "INFORMATION": ["what was revenue growth", "what are the key risks", "summarize the report"],
+}
+
+
+class _BagOfWordsEncoder:
+    """Deterministic stand-in for bge: hashed word counts."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, normalize_embeddings=True):
+        self.calls += 1
+        vectors = np.zeros((len(texts), 1024), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % 1024] += 1
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    c = EmbeddingIntentClassifier(encoder=_BagOfWordsEncoder(), examples=_EXAMPLES)
+    monkeypatch.setattr(intent_classifier, "_classifier", c)
+    return c
+
+
+def test_predicts_from_prototypes(classifier):
+    assert classifier.predict("please create a ticket, vpn is down")[0] == "ACTION"
+    assert classifier.predict("what was the revenue in the report")[0] == "INFORMATION"
+
+
+def test_reuses_query_embedding(classifier):
+    classifier.fit()
+    vec = classifier.encoder.encode(["reset my password please"])
+    calls = classifier.encoder.calls
+
+    label, confidence = classifier.predict("ignored", query_vec=vec)
+
+    assert label == "ACTION" and 0.5 < confidence <= 1.0
+    assert classifier.encoder.calls == calls
+
+
+def test_llm_only_for_low_confidence(classifier, monkeypatch):
+    asked = []
+
+    def fake_generate_text(prompt, max_new_tokens=32):
+        asked.append(prompt)
+        return "ACTION"
+
+    monkeypatch.setattr(intent_classifier, "generate_text", fake_generate_text)
+    monkeypatch.setattr(intent_classifier, "INTENT_LLM_FALLBACK", True)
+    monkeypatch.setattr(intent_classifier, "CONFIDENCE_THRESHOLD", 0.99)
+
+    # Confident match: the LLM is never asked
+    assert intent_classifier.classify_intent("what was revenue growth") == "INFORMATION"
+    assert asked == []
+
+    # Unrelated words: low confidence, the LLM decides
+    assert intent_classifier.classify_intent("zebra quantum banana") == "ACTION"
+    assert len(asked) == 1
+
+
+def test_supervisor_routes_with_local_classifier(classifier, monkeypatch):
+    from agent import supervisor
+
+    monkeypatch.setattr(supervisor, "INTENT_ROUTING", True)
+
+    assert supervisor.classify_intent("create a ticket for my vpn") == "ACTION"
+
+    monkeypatch.setattr(supervisor, "INTENT_ROUTING", False)
+
+    assert supervisor.classify_intent("create a ticket for my vpn") == "INFORMATION"
@@ -0,0 +1,117 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from evaluation.fake_llm_server import CANNED_ANSWER, start_fake_llm_server
+from llm.backends import LLMDeadlineError, LLMError, create_backend
+from llm.generation_policy import GenerationPolicy
+from llm.hf_inference_client import HFInferenceClient
+from llm.ollama_client import OllamaClient, OllamaError, call_ollama
+
+
+@pytest.fixture
+def fake_server():
+    server, url = start_fake_llm_server(latency_s=0.01, token_delay_s=0.01)
+    server.ollama_url = url.replace("/v1/chat/completions", "/api/generate")
+    yield server, url
+    server.shutdown()
+
+
+def _dead_url():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"http://127.0.0.1:{port}/api/generate"
+
+
+def test_ollama_streams_with_keep_alive(fake_server):
+    server, _ = fake_server
+    client = OllamaClient(url=server.ollama_url, keep_alive="1h")
+
+    chunks = list(client.stream("hello"))
+
+    assert len(chunks) > 1
+    assert "".join(chunks).strip() == CANNED_ANSWER
+    assert server.payloads[-1]["stream"] is True
+    assert server.payloads[-1]["keep_alive"] == "1h"
+
+    assert client.generate("hello") == CANNED_ANSWER
+    assert asyncio.run(client.agenerate("hello")) == CANNED_ANSWER
+
+
+def test_ollama_async_stream_stops_at_the_deadline():
+    server, url = start_fake_llm_server(latency_s=0, token_delay_s=0.05)
+    client = OllamaClient(url=url.replace("/v1/chat/completions", "/api/generate"))
+
+    async def scenario():
+        # Tokens keep arriving well inside the read timeout
+        with pytest.raises(LLMDeadlineError):
+            await client.agenerate("hello", deadline=time.monotonic() + 0.15)
+
+        first = client._get_async_client()
+        assert await client.agenerate("hello") == CANNED_ANSWER
+        assert client._get_async_client() is first
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        server.shutdown()
+
+
+def test_ollama_warm_up_loads_model_without_prompt(fake_server):
+    server, _ = fake_server
+
+    OllamaClient(url=server.ollama_url).warm_up()
+
+    assert "prompt" not in server.payloads[-1]
+    assert server.payloads[-1]["keep_alive"]
+
+
+def test_ollama_errors_share_the_backend_contract(monkeypatch):
+    client = OllamaClient(url=_dead_url())
+
+    with pytest.raises(OllamaError) as exc:
+        client.generate("hello")
+
+    assert isinstance(exc.value, LLMError)
+
+    monkeypatch.setattr("llm.ollama_client.OLLAMA_URL", _dead_url())
+    assert call_ollama("hello") == ""
+
+
+def test_hf_router_streams_server_sent_events(fake_server):
+    _, url = fake_server
+    client = HFInferenceClient(api_token="test", generation_model="stream-test-model", url=url)
+
+    chunks = list(client.stream("hello"))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == CANNED_ANSWER
+
+
+def test_backend_selected_by_config(monkeypatch):
+    assert isinstance(create_backend(backend="ollama"), OllamaClient)
+    assert isinstance(create_backend(api_token="test", backend="hf"), GenerationPolicy)
+
+    monkeypatch.setenv("LLM_BACKEND", "ollama")
+    assert isinstance(create_backend(), OllamaClient)
+
+    with pytest.raises(ValueError):
+        create_backend(backend="nope")
+
+
+def test_fake_server_injects_rate_limits():
+    server, url = start_fake_llm_server(latency_s=0.0, rate_limit_rate=1.0, retry_after_s=0, seed=1)
+    client = HFInferenceClient(api_token="test", generation_model="rate-limited-test-model", url=url, max_retries=1)
+
+    try:
+        with pytest.raises(LLMError):
+            client.generate("hello")
+    finally:
+        server.shutdown()
+
+    assert server.injected["429"] >= 1
+    assert server.injected["500"] == 0
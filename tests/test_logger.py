@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import queue
+import sys
+
+import pytest
+
+from agent.deadline import Deadline
+from utils import logger as logger_module
+from utils.logger import JSONFormatter, _ConsoleHandler, _DroppingQueueHandler, _RequestIdFilter, current_request_id, current_trace, request_context
+
+
+def _record(msg, **extra):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    _RequestIdFilter().filter(record)
+    return record
+
+
+def test_json_lines_carry_request_id_and_extra_fields():
+    with request_context("req-1"):
+        line = JSONFormatter().format(_record("Refused", reason="not_found"))
+
+    entry = json.loads(line)
+
+    assert entry["msg"] == "Refused"
+    assert entry["request_id"] == "req-1"
+    assert entry["reason"] == "not_found"
+    assert "request_id" not in json.loads(JSONFormatter().format(_record("outside")))
+
+
+def test_request_context_nests_and_restores():
+    with request_context("outer"):
+        with request_context(debug=True) as trace:
+            assert current_request_id() == "outer"
+            assert trace.request_id == "outer"
+            assert current_trace() is trace
+
+        assert current_trace() is None
+
+    assert current_request_id() is None
+
+
+def test_deadline_stages_become_trace_spans():
+    with request_context("req-2", debug=True) as trace:
+        deadline = Deadline(5000)
+
+        with deadline.stage("retrieval"):
+            pass
+
+        trace.add_event("retrieval", [{"chunk_id": "c1", "score": 0.9}])
+
+    debug = trace.to_dict()
+
+    assert [s["name"] for s in debug["spans"]] == ["retrieval"]
+    assert debug["retrieval"][0]["chunk_id"] == "c1"
+
+
+def test_records_go_to_stderr_leaving_stdout_for_output(capsys):
+    _ConsoleHandler().handle(_record("to stderr"))
+
+    captured = capsys.readouterr()
+
+    assert "to stderr" in captured.err
+    assert captured.out == ""
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=1))
+    before = _DroppingQueueHandler.dropped
+
+    handler.handle(_record("first"))
+    handler.handle(_record("second"))
+
+    assert _DroppingQueueHandler.dropped == before + 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_logs_through_a_fresh_queue():
+    logger_module.configure_logging()
+    root = logging.getLogger()
+    parent_handler = next(h for h in root.handlers if isinstance(h, _DroppingQueueHandler))
+
+    read_fd, write_fd = os.pipe()
+
+    # Fork while another thread is mid-put on the parent's queue
+    with parent_handler.queue.mutex:
+        pid = os.fork()
+
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            sys.stderr = os.fdopen(write_fd, "w")
+
+            handlers = [h for h in root.handlers if isinstance(h, _DroppingQueueHandler)]
+            assert len(handlers) == 1 and handlers[0] is not parent_handler
+
+            logging.getLogger("forked").warning("from the child")
+            logger_module._stop_listener()
+            sys.stderr.flush()
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+
+    with os.fdopen(read_fd) as output:
+        lines = output.read().splitlines()
+
+    os.waitpid(pid, 0)
+
+    assert any("from the child" in line for line in lines)
@@ -0,0 +1,84 @@
+import asyncio
+
+from agent.deadline import Deadline
+from utils.metrics import Counter, Gauge, Histogram, counter, render
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("test_stage_seconds", "Stage time.", ("stage",), buckets=(0.1, 1.0))
+
+    hist.observe(0.05, stage="retrieval")
+    hist.observe(0.1, stage="retrieval")
+    hist.observe(5.0, stage="retrieval")
+
+    lines = hist.render()
+
+    assert 'test_stage_seconds_bucket{stage="retrieval",le="0.1"} 2' in lines
+    assert 'test_stage_seconds_bucket{stage="retrieval",le="1.0"} 2' in lines
+    assert 'test_stage_seconds_bucket{stage="retrieval",le="+Inf"} 3' in lines
+    assert 'test_stage_seconds_count{stage="retrieval"} 3' in lines
+    assert hist.count(stage="retrieval") == 3
+
+
+def test_timed_decorator_covers_sync_and_async():
+    hist = Histogram("test_call_seconds", "Call time.")
+
+    @hist.timed()
+    def work():
+        return 1
+
+    @hist.timed()
+    async def awork():
+        return 2
+
+    assert work() == 1
+    assert asyncio.run(awork()) == 2
+    assert hist.count() == 2
+
+
+def test_counter_labels_and_escaping():
+    refusals = Counter("test_refusals_total", "Refusals.", ("reason",))
+
+    refusals.inc(reason="not_found")
+    refusals.inc(2, reason='say "hi"')
+
+    lines = refusals.render()
+
+    assert "# TYPE test_refusals_total counter" in lines
+    assert 'test_refusals_total{reason="not_found"} 1' in lines
+    assert 'test_refusals_total{reason="say \\"hi\\""} 2' in lines
+
+
+def test_callback_gauge_is_read_at_scrape_time():
+    state = {"chunks": 3}
+    chunks = Gauge("test_chunks", "Chunks.", function=lambda: state["chunks"])
+
+    assert chunks.render()[-1] == "test_chunks 3"
+
+    state["chunks"] = 7
+
+    assert chunks.render()[-1] == "test_chunks 7"
+
+
+def test_registry_returns_existing_metric_and_survives_broken_callbacks():
+    first = counter("test_shared_total", "Shared.")
+    assert counter("test_shared_total", "Shared.") is first
+
+    counter("test_broken_total", "Broken.", function=lambda: 1 / 0)
+
+    text = render()
+
+    assert "# TYPE test_shared_total counter" in text
+    assert "process_resident_memory_bytes" in text
+    assert "test_broken_total" not in text
+
+
+def test_deadline_stages_feed_stage_histogram():
+    from agent.deadline import STAGE_SECONDS
+
+    before = STAGE_SECONDS.count(stage="test_stage")
+
+    with Deadline(5000).stage("test_stage"):
+        pass
+
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 1
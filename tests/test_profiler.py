@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+
+from retrieval.inference import InferenceExecutor
+from utils.profiler import ProfileGate, SamplingProfiler
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_attributes_time_to_the_busy_frame(tmp_path):
+    profiler = SamplingProfiler([threading.get_ident()], interval_s=0.002).start()
+    _busy_wait(0.15)
+    profiler.stop()
+
+    assert profiler.samples > 10
+
+    folded = profiler.folded()
+    assert "_busy_wait (tests/test_profiler.py" in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.strip().splitlines())
+
+    summary = profiler.top(5)
+    assert "_busy_wait" in summary.splitlines()[3]
+
+    paths = profiler.write(str(tmp_path), "p1")
+    assert os.path.exists(paths["folded"]) and os.path.exists(paths["summary"])
+
+
+def test_gate_allows_one_profile_per_interval():
+    gate = ProfileGate(min_interval_s=60)
+
+    assert gate.acquire()
+    assert not gate.acquire()
+
+    gate.release()
+
+    assert not gate.acquire()
+    assert gate.retry_after() > 0
+
+    assert ProfileGate(min_interval_s=0).acquire()
+
+
+
+def test_model_time_on_inference_threads_is_sampled():
+    executor = InferenceExecutor(threads=1)
+
+    try:
+        profiler = SamplingProfiler([threading.get_ident(), *executor.thread_ids()], interval_s=0.002).start()
+        executor.run("embed", _busy_wait, 0.15)
+        profiler.stop()
+    finally:
+        executor.shutdown()
+
+    folded = profiler.folded()
+    assert "thread inference-0;" in folded
+    assert "_busy_wait (tests/test_profiler.py" in folded
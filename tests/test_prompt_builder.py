@@ -0,0 +1,63 @@
+import pytest
+
+from agent import prompt_builder
+from utils import tokens
+from agent.prompt_builder import assemble_prompt, count_tokens, truncate_to_tokens
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Use the offline character estimate instead of downloading a tokenizer
+    monkeypatch.setattr(tokens, "_tokenizer", False)
+
+
+def _table(rows):
+    return "<table>\n" + "\n".join(
+        f"<tr><td>Item {i}</td><td>{i * 1000}</td></tr>" for i in range(rows)
+    ) + "\n</table>"
+
+
+def test_evidence_is_ordered_by_rerank_score():
+    evidence = [
+        {"text": "Low scoring chunk.", "pages": [3], "score": 0.1},
+        {"text": "High scoring chunk.", "pages": [7], "score": 0.9},
+    ]
+
+    prompt, report = assemble_prompt("Question?", evidence, [], budget=2000)
+
+    assert prompt.index("High scoring chunk.") < prompt.index("Low scoring chunk.")
+    assert "[Source: Page 7]" in prompt
+    assert report["evidence_used"] == 2
+
+
+def test_large_tables_are_truncated_then_dropped_within_budget():
+    evidence = [{"text": "Revenue grew 10%.", "pages": [1], "score": 1.0}]
+    tables = [_table(40), _table(400), _table(40)]
+
+    prompt, report = assemble_prompt("What was revenue?", evidence, tables, budget=1200)
+
+    assert report["prompt_tokens"] <= 1200
+    assert report["prompt_tokens"] == count_tokens(prompt)
+    assert report["tables_used"] == 2
+    assert report["tables_truncated"] == 1
+    assert report["tables_dropped"] == 1
+    assert "Item 39</td>" in prompt
+
+
+def test_top_evidence_is_truncated_rather_than_dropped():
+    evidence = [{"text": "\n".join(["long line of policy text"] * 500), "pages": [2], "score": 0.5}]
+
+    prompt, report = assemble_prompt("Question?", evidence, [], budget=600)
+
+    assert report["evidence_truncated"] == 1
+    assert report["prompt_tokens"] <= 600
+    assert prompt_builder.TRUNCATION_MARKER in prompt
+
+
+def test_truncate_keeps_whole_lines():
+    text = "\n".join(f"row {i}" for i in range(100))
+
+    truncated = truncate_to_tokens(text, 20)
+
+    assert count_tokens(truncated) <= 20
+    assert all(line.startswith("row") for line in truncated.splitlines()[:-1])
@@ -0,0 +1,191 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from llm import hf_inference_client, rate_limiter
+from llm.hf_inference_client import HFDeadlineError, HFInferenceClient
+from llm.rate_limiter import RateLimiter, estimate_tokens, parse_reset
+
+
+def _soon(seconds=0.2):
+    return time.monotonic() + seconds
+
+
+def test_budget_is_shared_through_the_state_file(tmp_path):
+    # Two instances stand in for two worker processes
+    a = RateLimiter("router", rpm=2, tpm=0, state_dir=str(tmp_path))
+    b = RateLimiter("router", rpm=2, tpm=0, state_dir=str(tmp_path))
+
+    assert a.acquire(deadline=_soon())
+    assert b.acquire(deadline=_soon())
+
+    # Next request in ~30 s: refused without taking anything
+    assert not a.acquire(deadline=_soon())
+    assert not b.acquire(deadline=_soon())
+
+
+def _take_one(state_dir, results):
+    results.put(RateLimiter("router", rpm=3, tpm=0, state_dir=state_dir).acquire(deadline=_soon(0.5)))
+
+
+@pytest.mark.skipif(rate_limiter.fcntl is None, reason="needs flock")
+def test_worker_processes_draw_from_one_bucket(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+
+    workers = [ctx.Process(target=_take_one, args=(str(tmp_path), results)) for _ in range(6)]
+
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(10)
+
+    admitted = [results.get(timeout=5) for _ in workers]
+
+    assert admitted.count(True) == 3
+
+
+def test_token_budget_counts_prompt_and_completion(tmp_path):
+    limiter = RateLimiter("router", rpm=0, tpm=600, state_dir=str(tmp_path))
+
+    assert estimate_tokens("x" * 400, 200) == 300
+
+    assert limiter.acquire(300, _soon())
+    assert limiter.acquire(300, _soon())
+    assert not limiter.acquire(300, _soon())
+
+
+def test_429_halves_the_budget_and_pauses_every_client(tmp_path):
+    a = RateLimiter("router", rpm=600, tpm=0, state_dir=str(tmp_path))
+    b = RateLimiter("router", rpm=600, tpm=0, state_dir=str(tmp_path))
+
+    a.observe(429, {"Retry-After": "5"})
+
+    snap = b.snapshot()
+
+    assert snap["scale"] == 0.5
+    assert 4 < snap["paused_s"] <= 5
+    assert not b.acquire(deadline=_soon(1))
+
+
+def test_rate_limit_headers_cap_the_bucket(tmp_path):
+    limiter = RateLimiter("router", rpm=600, tpm=0, state_dir=str(tmp_path))
+
+    limiter.observe(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m30s"})
+
+    snap = limiter.snapshot()
+
+    assert snap["scale"] == 1.0
+    assert snap["requests_available"] < 1
+    assert 89 < snap["paused_s"] <= 90
+
+    assert parse_reset("250ms") == 0.25
+    assert parse_reset("12") == 12.0
+    assert parse_reset("soon") is None
+
+
+def test_epoch_reset_headers_are_read_as_a_delta():
+    assert 29 < parse_reset(str(time.time() + 30)) <= 30
+
+    assert parse_reset(str(int(time.time()) - 5)) == 0.0
+
+
+def test_pause_is_capped_even_when_a_header_asks_for_years(tmp_path):
+    a = RateLimiter("router", rpm=600, tpm=0, state_dir=str(tmp_path), max_pause_s=60)
+
+    a.observe(429, {"Retry-After": str(10 * 365 * 86400)})
+    assert 59 < a.snapshot()["paused_s"] <= 60
+
+    a.observe(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": str(time.time() + 86400)})
+    assert a.snapshot()["paused_s"] <= 60
+
+    # A pause left in the shared file by an older process is capped on read
+    b = RateLimiter("router", rpm=600, tpm=0, state_dir=str(tmp_path), max_pause_s=5)
+    assert b.snapshot()["paused_s"] <= 5
+
+
+def test_disabled_limiter_writes_nothing(tmp_path):
+    limiter = RateLimiter("router", rpm=0, tpm=0, state_dir=str(tmp_path / "limits"))
+
+    limiter.observe(429, {"Retry-After": "30"})
+
+    assert limiter.acquire(10**6, _soon())
+    assert not (tmp_path / "limits").exists()
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+
+    def json(self):
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+
+def test_client_fails_fast_when_the_limit_outlasts_the_deadline(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(hf_inference_client.requests, "post", lambda *a, **kw: calls.append(kw) or _Response())
+
+    client = HFInferenceClient(api_token="test", url="http://limited/v1/chat/completions")
+    client.rate_limiter = RateLimiter(client.url, rpm=1, tpm=0, state_dir=str(tmp_path))
+
+    assert client.generate("hi") == "ok"
+
+    with pytest.raises(HFDeadlineError):
+        client.generate("hi", deadline=_soon(1))
+
+    assert len(calls) == 1
+
+
+@pytest.mark.skipif(rate_limiter.fcntl is None, reason="needs flock")
+def test_async_acquire_does_not_block_the_loop_on_the_file_lock(tmp_path):
+    limiter = RateLimiter("router", rpm=60, tpm=0, state_dir=str(tmp_path))
+    limiter.acquire()
+
+    async def scenario():
+        # Another process holds the state file lock for a while
+        fd = os.open(limiter.path, os.O_RDWR)
+        rate_limiter.fcntl.flock(fd, rate_limiter.fcntl.LOCK_EX)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.create_task(ticker())
+        acquire = asyncio.create_task(limiter.aacquire(deadline=_soon(5)))
+
+        await asyncio.sleep(0.2)
+        rate_limiter.fcntl.flock(fd, rate_limiter.fcntl.LOCK_UN)
+        os.close(fd)
+
+        admitted = await acquire
+        tick_task.cancel()
+        return admitted, ticks
+
+    admitted, ticks = asyncio.run(scenario())
+
+    assert admitted
+    assert ticks >= 10
+
+
+def test_rate_limit_refusal_releases_the_breaker_probe(tmp_path, monkeypatch):
+    monkeypatch.setattr(hf_inference_client.requests, "post", lambda *a, **kw: _Response())
+
+    client = HFInferenceClient(api_token="test", url="http://limited-probe/v1/chat/completions")
+    client.rate_limiter = RateLimiter(client.url, rpm=1, tpm=0, state_dir=str(tmp_path))
+    client.rate_limiter.acquire()
+
+    breaker = client.breaker
+    breaker.state = "half_open"
+
+    with pytest.raises(HFDeadlineError):
+        client.generate("hi", deadline=_soon(1))
+
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
@@ -0,0 +1,119 @@
+import hashlib
+import importlib
+import json
+import pathlib
+import sys
+import types
+
+import numpy as np
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+FIXTURE_PDF = pathlib.Path(__file__).parent / "fixtures" / "press.pdf"
+
+
+class _FakeEncoder:
+    encoded = []
+
+    def __init__(self, _model_name):
+        pass
+
+    def encode(self, texts, **_kwargs):
+        _FakeEncoder.encoded.extend(texts)
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+            vec = np.random.default_rng(seed).random(8).astype(np.float32)
+            vectors.append(vec / np.linalg.norm(vec))
+        return np.asarray(vectors)
+
+
+def _fake_parse_pdf(pdf_path, output_path, allow_empty=False):
+    _fake_parse_pdf.calls.append(len(PdfReader(pdf_path).pages))
+
+    elements = []
+    for page_number, page in enumerate(PdfReader(pdf_path).pages, start=1):
+        text = page.extract_text().strip()
+        if not text:
+            continue
+        elements.append({"id": "x", "type": "Title", "text": f"Page {text[:12]}", "page": page_number, "metadata": {}})
+        elements.append({"id": "y", "type": "NarrativeText", "text": text, "page": page_number, "metadata": {}})
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(elements, f)
+
+
+@pytest.fixture
+def ingestion(monkeypatch):
+    fake_parser_module = types.ModuleType("ingestion.pdf_parser")
+    fake_parser_module.parse_pdf = _fake_parse_pdf
+    monkeypatch.setitem(sys.modules, "ingestion.pdf_parser", fake_parser_module)
+
+    sys.modules.pop("ingestion.runtime_ingestion", None)
+    module = importlib.import_module("ingestion.runtime_ingestion")
+    monkeypatch.setattr(module, "get_embedding_model", lambda _name=None: _FakeEncoder(_name))
+    monkeypatch.setattr(module, "load_embedding_tokenizer", lambda: None)
+
+    _fake_parse_pdf.calls = []
+    _FakeEncoder.encoded = []
+    yield module
+    sys.modules.pop("ingestion.runtime_ingestion", None)
+
+
+def _revise(source, target, replaced_page):
+    writer = PdfWriter()
+    for i, page in enumerate(PdfReader(source).pages, start=1):
+        if i == replaced_page:
+            writer.add_blank_page(200, 200)
+        else:
+            writer.add_page(page)
+    writer.write(str(target))
+
+
+def test_revision_only_reparses_changed_pages(ingestion, tmp_path):
+    cache = ingestion.PageCache(str(tmp_path / "cache"))
+
+    first = ingestion.ingest_pdf_to_runtime(str(FIXTURE_PDF), cache=cache)
+
+    assert first["stats"]["pages_total"] == 18
+    assert first["stats"]["pages_reused"] == 0
+    assert first["stats"]["pages_recomputed"] == 18
+    assert first["index"].ntotal == len(first["metadata"])
+
+    revised_pdf = tmp_path / "revised.pdf"
+    _revise(FIXTURE_PDF, revised_pdf, replaced_page=3)
+
+    _fake_parse_pdf.calls = []
+    _FakeEncoder.encoded = []
+
+    second = ingestion.ingest_pdf_to_runtime(str(revised_pdf), cache=cache)
+
+    assert _fake_parse_pdf.calls == [1]
+    assert second["stats"]["pages_reused"] == 17
+    assert second["stats"]["pages_recomputed"] == 1
+    assert second["stats"]["chunks_reused"] == len(second["metadata"])
+    assert _FakeEncoder.encoded == []
+    assert all(3 not in chunk["pages"] for chunk in second["metadata"])
+
+
+def test_unchanged_upload_skips_parser(ingestion, tmp_path):
+    cache = ingestion.PageCache(str(tmp_path / "cache"))
+
+    first = ingestion.ingest_pdf_to_runtime(str(FIXTURE_PDF), cache=cache)
+    second = ingestion.ingest_pdf_to_runtime(str(FIXTURE_PDF), cache=cache)
+
+    assert _fake_parse_pdf.calls == [18]
+    assert second["stats"]["pages_reused"] == 18
+    assert second["metadata"] == first["metadata"]
+
+
+def test_chunking_overrides_reach_the_chunker(ingestion, tmp_path):
+    cache = ingestion.PageCache(str(tmp_path / "cache"))
+
+    default = ingestion.ingest_pdf_to_runtime(str(FIXTURE_PDF), cache=cache)
+    small = ingestion.ingest_pdf_to_runtime(str(FIXTURE_PDF), cache=cache, max_tokens=64, overlap_tokens=8)
+
+    assert small["stats"]["chunking"]["max_tokens"] == 64
+    assert small["stats"]["chunking"]["overlap_tokens"] == 8
+    assert len(small["metadata"]) > len(default["metadata"])
+    assert small["stats"]["pages_reused"] == 18
@@ -1,12 +1,19 @@
 ﻿import json
+import socket
+import types
 
 import pytest
 
 from agent.supervisor import AgentSupervisor
+from llm.ollama_client import OllamaClient
+from retrieval.document_store import DocumentSnapshot
 
 
 class _DummyRetriever:
-    def retrieve(self, _query):
+    def encode_query(self, _query):
+        return [[1.0]]
+
+    def retrieve(self, _query, query_vec=None, deadline=None):
         return [
             {
                 "score": 0.9,
@@ -21,26 +28,25 @@ class _DummyRetriever:
 
 
 class _DummyReranker:
-    def rerank(self, _query, results, top_k=7):
+    def rerank(self, _query, results, top_k=7, time_budget=None):
         return results[:top_k]
 
 
 @pytest.fixture
 def supervisor(monkeypatch):
     monkeypatch.setattr("agent.supervisor.Reranker", lambda: _DummyReranker())
+    monkeypatch.setattr("utils.tokens._tokenizer", False)
     sup = AgentSupervisor()
-    sup.retriever = _DummyRetriever()
-    sup.tables_raw = []
-    sup.doc_loaded = True
+    sup.document = DocumentSnapshot(_DummyRetriever(), [])
     return sup
 
 
 def test_information_output_contract(supervisor, monkeypatch):
-    monkeypatch.setattr("agent.supervisor.classify_intent", lambda _q: "INFORMATION")
+    monkeypatch.setattr("agent.supervisor.classify_intent", lambda _q, **_: "INFORMATION")
     monkeypatch.setattr(
         supervisor.hf_client,
         "generate",
-        lambda _prompt: "This is a grounded answer.",
+        lambda _prompt, **_: "This is a grounded answer.",
     )
 
     output = supervisor.handle("What is in the report?")
@@ -50,10 +56,11 @@ def test_information_output_contract(supervisor, monkeypatch):
     assert "answer" in output
     assert isinstance(output["answer"], str)
     assert output["answer"] == "This is a grounded answer."
+    assert output["usage"]["prompt_tokens"] <= output["usage"]["prompt_budget"]
 
 
 def test_action_output_contract(supervisor, monkeypatch):
-    monkeypatch.setattr("agent.supervisor.classify_intent", lambda _q: "ACTION")
+    monkeypatch.setattr("agent.supervisor.classify_intent", lambda _q, **_: "ACTION")
 
     llm_json = json.dumps(
         {
@@ -62,9 +69,10 @@ def test_action_output_contract(supervisor, monkeypatch):
             "priority": "High",
         }
     )
-    monkeypatch.setattr(supervisor.hf_client, "generate", lambda _prompt: llm_json)
+    monkeypatch.setattr(supervisor.hf_client, "generate", lambda _prompt, **_: llm_json)
 
-    output = supervisor.handle("Create ticket for VPN issue")
+    # No department keyword: the rules cannot fill it, so the LLM is asked
+    output = supervisor.handle("Create ticket for the problem I reported earlier")
 
     assert isinstance(output, dict)
     assert output.get("type") == "action"
@@ -76,3 +84,64 @@ def test_action_output_contract(supervisor, monkeypatch):
 
     assert "issue_summary" not in output
     assert output["description"] == "VPN not working"
+
+    assert output["department"] == "IT"
+    assert output["priority"] == "High"
+
+
+def test_action_fast_path_skips_llm(supervisor, monkeypatch):
+    monkeypatch.setattr("agent.supervisor.classify_intent", lambda _q, **_: "ACTION")
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(supervisor.hf_client, "generate", fail)
+
+    output = supervisor.handle("Create an urgent ticket: VPN is down")
+
+    assert output == {
+        "type": "action",
+        "action": "create_ticket",
+        "department": "IT",
+        "priority": "High",
+        "description": "VPN is down",
+    }
+
+
+def test_upload_during_a_chat_does_not_mix_documents(supervisor, monkeypatch):
+    monkeypatch.setattr("agent.supervisor.classify_intent", lambda _q, **_: "INFORMATION")
+
+    new_document = DocumentSnapshot(_DummyRetriever(), [{"id": "t1", "raw_text": "NEW TABLE"}])
+
+    class _UploadMidRequest(_DummyRetriever):
+        def retrieve(self, query, query_vec=None, deadline=None):
+            # Another thread finishes an upload while this chat is retrieving
+            supervisor.document = new_document
+            return [dict(r, tables=["t1"]) for r in super().retrieve(query)]
+
+    supervisor.document = DocumentSnapshot(_UploadMidRequest(), [{"id": "t1", "raw_text": "OLD TABLE"}])
+
+    prompts = []
+    monkeypatch.setattr(supervisor.hf_client, "generate", lambda prompt, **_: prompts.append(prompt) or "Answer.")
+
+    supervisor.handle("What is in the report?")
+
+    assert "OLD TABLE" in prompts[0] and "NEW TABLE" not in prompts[0]
+    assert supervisor.tables_raw == new_document.tables_raw
+
+
+def test_warm_up_survives_an_unreachable_llm(supervisor, monkeypatch):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    monkeypatch.setattr("agent.supervisor.get_embedding_model", lambda: None)
+    monkeypatch.setattr("agent.supervisor.load_embedding_tokenizer", lambda: None)
+    monkeypatch.setattr("agent.supervisor.load_generation_tokenizer", lambda: None)
+    supervisor.reranker = types.SimpleNamespace(model=None)
+    supervisor.hf_client = OllamaClient(url=f"http://127.0.0.1:{port}/api/generate")
+
+    timings = supervisor.warm_up(run_models=False)
+
+    assert "llm_backend" in timings
@@ -0,0 +1,59 @@
+import json
+import pathlib
+
+import pytest
+
+from ingestion.table_processor import process_tables
+from ingestion.table_renderer import parse_html_table, render_table
+from utils.tokens import count_tokens
+
+FIXTURE = pathlib.Path(__file__).parent / "fixtures" / "table_elements.json"
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    monkeypatch.setattr("utils.tokens._tokenizer", False)
+
+
+def test_stacked_headers_are_merged():
+    html = (
+        "<table><thead>"
+        "<tr><th rowspan='2'>Segment</th><th colspan='2'>FY25</th></tr>"
+        "<tr><th>Revenue</th><th>Growth</th></tr>"
+        "</thead><tbody><tr><td>IT</td><td>1,000</td><td>5%</td></tr></tbody></table>"
+    )
+
+    assert render_table(html) == (
+        "| Segment | FY25 / Revenue | FY25 / Growth |\n"
+        "|---|---|---|\n"
+        "| IT | 1,000 | 5% |"
+    )
+    assert render_table(html, "tsv").splitlines()[1] == "IT\t1,000\t5%"
+
+
+def test_plain_td_table_uses_first_row_as_header_and_drops_empty_columns():
+    html = "<table><tr><td>Region</td><td></td></tr><tr><td>India</td><td></td></tr></table>"
+
+    header_rows, body_rows = parse_html_table(html)
+
+    assert header_rows == [["Region", ""]]
+    assert render_table(html) == "| Region |\n|---|\n| India |"
+
+
+def test_process_tables_stores_prompt_rendering(tmp_path):
+    raw_path = tmp_path / "tables_raw.json"
+
+    process_tables(
+        input_path=str(FIXTURE),
+        raw_output_path=str(raw_path),
+        index_output_path=str(tmp_path / "tables_index.json"),
+    )
+
+    tables_raw = json.loads(raw_path.read_text(encoding="utf-8"))
+
+    for table in tables_raw:
+        assert "<td>" not in table["table_prompt"]
+        assert table["table_prompt"]
+
+    structured = [t for t in tables_raw if t["table_type"] == "structured"]
+    assert all(count_tokens(t["table_prompt"]) < len(t["table_html"]) / 4 for t in structured)
@@ -0,0 +1,265 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# -------------------------------
+# STRUCTURED LOGGING
+# -------------------------------
+# One JSON object per line, tagged with the request id of the
+# request that logged it. Callers only format the record and put
+# it on a bounded queue; a background listener thread does the
+# writing, so a slow terminal never stalls a request. When the
+# queue is full records are dropped (and counted), not waited on.
+# Logs go to stderr: stdout is left for program output (--json).
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# "json" for aggregation, "text" for reading locally
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# "stderr" or "stdout"
+LOG_STREAM = os.getenv("LOG_STREAM", "stderr")
+
+# Chatty at INFO (one line per HTTP call)
+QUIET_LOGGERS = ("httpx", "httpcore", "urllib3", "filelock", "huggingface_hub", "sentence_transformers")
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def current_trace():
+    """The Trace of this request, or None unless it asked for debug."""
+    return _trace.get()
+
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+
+        if record.request_id:
+            entry["request_id"] = record.request_id
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _RequestIdFilter(logging.Filter):
+    # Runs on the calling thread, where the request context is set
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Formats on the caller's thread (so the record no longer needs its
+    context) and drops instead of blocking when the queue is full.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    # Looked up per record: sys.stderr may be swapped (tests, reloaders)
+    @property
+    def stream(self):
+        return sys.stdout if LOG_STREAM == "stdout" else sys.stderr
+
+    @stream.setter
+    def stream(self, _value):
+        pass
+
+
+def _start_listener(log_queue):
+    global _listener
+
+    output = _ConsoleHandler()
+    output.setFormatter(logging.Formatter("%(message)s"))
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        # Flushes whatever is still queued
+        _listener.stop()
+
+
+def _make_handler() -> _DroppingQueueHandler:
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(_RequestIdFilter())
+
+    if LOG_FORMAT == "text":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    else:
+        handler.setFormatter(JSONFormatter())
+
+    return handler
+
+
+def _after_fork_in_child():
+    """
+    Threads do not survive fork, and the parent's queue may have been
+    forked mid-put (its lock held, records the child never wrote):
+    give the child a fresh queue and handler, then its own listener.
+    """
+    root = logging.getLogger()
+
+    handler = _make_handler()
+
+    for old in [h for h in root.handlers if isinstance(h, _DroppingQueueHandler)]:
+        root.removeHandler(old)
+
+    root.addHandler(handler)
+
+    _start_listener(handler.queue)
+
+
+def configure_logging():
+    """
+    Install the queue handler on the root logger (once per process).
+    """
+    root = logging.getLogger()
+
+    with _configure_lock:
+        if any(isinstance(h, _DroppingQueueHandler) for h in root.handlers):
+            return
+
+        handler = _make_handler()
+
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+        _start_listener(handler.queue)
+
+        atexit.register(_stop_listener)
+
+        # gunicorn workers need their own queue and listener
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
+
+
+def dropped_records() -> int:
+    return _DroppingQueueHandler.dropped
+
+
+# -------------------------------
+# REQUEST TRACING
+# -------------------------------
+
+class Trace:
+    """
+    Spans and events of one request, returned as the `debug` field
+    of a chat response. Only built when the client asks for it.
+    """
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans = []
+        self.events = {}
+
+        # Hedged LLM calls record from several threads
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, seconds: float, **attrs):
+        span = {
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 1),
+            "duration_ms": round(seconds * 1000, 1),
+            **attrs,
+        }
+
+        with self._lock:
+            self.spans.append(span)
+
+    def add_event(self, name: str, value):
+        with self._lock:
+            self.events[name] = value
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+            events = dict(self.events)
+
+        return {
+            "request_id": self.request_id,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "spans": spans,
+            **events,
+        }
+
+
+@contextmanager
+def request_context(request_id: str = None, debug: bool = False):
+    """
+    Tag everything logged inside with `request_id` (the current one,
+    or a new one) and, with debug, collect a Trace. Yields the trace
+    or None.
+    """
+    request_id = request_id or _request_id.get() or new_request_id()
+    trace = Trace(request_id) if debug else None
+
+    id_token = _request_id.set(request_id)
+    trace_token = _trace.set(trace)
+
+    try:
+        yield trace
+    finally:
+        _trace.reset(trace_token)
+        _request_id.reset(id_token)
+
@@ -0,0 +1,300 @@
+import bisect
+import inspect
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from utils.logger import dropped_records, get_logger
+
+logger = get_logger(__name__)
+
+# -------------------------------
+# PROMETHEUS METRICS
+# -------------------------------
+# Process-wide counters, gauges and histograms rendered in the
+# Prometheus text format by GET /metrics. Recording is a dict
+# lookup and an increment under a per-metric lock; callback
+# metrics are only evaluated when scraped.
+#
+# Under gunicorn every worker keeps its own registry, so each
+# scrape reports the worker that answered it.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: a ~1 ms intent check up to a slow LLM call
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+
+    if isinstance(value, bool):
+        return str(int(value))
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames=(), function=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.function = function
+
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        # A missing label renders empty rather than failing the hot path
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> list:
+        """
+        (suffix, label values, extra label, value) per series. A
+        callback returns one number, or {label values: number}.
+        """
+        if self.function is not None:
+            collected = self.function()
+
+            if not isinstance(collected, dict):
+                collected = {(): collected}
+
+            return [
+                ("", key if isinstance(key, tuple) else (key,), None, value)
+                for key, value in collected.items()
+                if value is not None
+            ]
+
+        with self._lock:
+            return [("", key, None, value) for key, value in self._values.items()]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+        for suffix, values, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}"
+            )
+
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._values.get(key)
+
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series[2] if series else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """
+        Decorator observing every call, sync or async.
+        """
+        def decorate(func):
+
+            if inspect.iscoroutinefunction(func):
+
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.time(**labels):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def samples(self) -> list:
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+
+        rows = []
+
+        for key, counts, total, count in series:
+            cumulative = 0
+
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                rows.append(("_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+
+            rows.append(("_sum", key, None, total))
+            rows.append(("_count", key, None, count))
+
+        return rows
+
+
+# -------------------------------
+# REGISTRY
+# -------------------------------
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+
+        # Re-registering a callback metric rebinds it (e.g. a new app instance)
+        if existing is not None and metric.function is None:
+            return existing
+
+        _registry[metric.name] = metric
+        return metric
+
+
+def counter(name: str, help: str, labelnames=(), function=None) -> Counter:
+    """
+    Process-wide counter; registering an existing name returns it.
+    """
+    return _register(Counter(name, help, labelnames, function))
+
+
+def gauge(name: str, help: str, labelnames=(), function=None) -> Gauge:
+    return _register(Gauge(name, help, labelnames, function))
+
+
+def histogram(name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text format.
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    lines = []
+
+    for metric in metrics:
+        try:
+            lines.extend(metric.render())
+        except Exception as e:
+            # One broken callback must not fail the whole scrape
+            logger.warning("Metric callback failed", extra={"metric": metric.name, "error": str(e)})
+
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------
+# PROCESS
+# -------------------------------
+
+def process_rss_bytes():
+    """
+    Resident memory of this process, or None when unavailable.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # No /proc (macOS): peak RSS is the closest available figure
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+gauge(
+    "process_resident_memory_bytes",
+    "Resident memory of this worker process.",
+    function=process_rss_bytes,
+)
+
+counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+    function=dropped_records,
+)
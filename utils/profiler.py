@@ -0,0 +1,264 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter as Tally
+
+from utils.logger import get_logger
+from utils.metrics import counter
+
+# -------------------------------
+# ON-DEMAND REQUEST PROFILING
+# -------------------------------
+# A pure-Python sampling profiler: a background thread reads the
+# stacks of the profiled threads every PROFILE_INTERVAL_MS and
+# counts them. Output per request:
+#   <id>.folded  one "frame;frame;frame count" line per stack
+#                (flamegraph.pl, speedscope, inferno)
+#   <id>.txt     top-N frames by self and total time
+# Time inside torch/faiss shows up on the Python frame that
+# called into them (e.g. CrossEncoder.predict, Index.search).
+
+logger = get_logger(__name__)
+
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(tempfile.gettempdir(), "corporate_bot_profiles")
+)
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+
+# At most one profile at a time, and no more than one per interval
+PROFILE_MIN_INTERVAL_S = float(os.getenv("PROFILE_MIN_INTERVAL_S", "60"))
+
+# The sampler stops on its own after this long
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "180"))
+
+PROFILES = counter("profiles_total", "Profiling requests by result.", ("result",))
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _short_path(path: str) -> str:
+    if path.startswith(_REPO_ROOT):
+        return os.path.relpath(path, _REPO_ROOT)
+
+    marker = "site-packages" + os.sep
+
+    if marker in path:
+        return path.split(marker, 1)[1]
+
+    return os.path.basename(path)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # ";" separates frames in the folded format
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of `thread_ids` (every thread but its own
+    when None) until stop(). With more than one thread, each stack
+    starts with its thread's name.
+    """
+
+    def __init__(self, thread_ids=None, interval_s: float = None, max_seconds: float = None):
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.interval_s = interval_s or PROFILE_INTERVAL_MS / 1000
+        self.max_seconds = max_seconds or PROFILE_MAX_SECONDS
+
+        self.stacks = Tally()
+        self.samples = 0
+        self.duration_s = 0.0
+
+        self.profile_id = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+
+        self.duration_s = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.max_seconds
+
+        while not self._stop.wait(self.interval_s) and time.monotonic() < deadline:
+            several = self.thread_ids is None or len(self.thread_ids) > 1
+            names = {t.ident: t.name for t in threading.enumerate()} if several else None
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+
+                stack = []
+
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+
+                if names is not None:
+                    stack.append(f"thread {names.get(ident, ident)}")
+
+                self.stacks[tuple(reversed(stack))] += 1
+
+            self.samples += 1
+
+    def folded(self) -> str:
+        return "\n".join(
+            f"{';'.join(stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        ) + "\n"
+
+    def top(self, n: int = None) -> str:
+        """
+        Frames with the most samples: self (innermost frame) and total
+        (anywhere on the stack), in samples and estimated ms.
+        """
+        n = n or PROFILE_TOP_N
+        own, total = Tally(), Tally()
+
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+
+            for label in set(stack):
+                total[label] += count
+
+        sampled = sum(self.stacks.values()) or 1
+        ms = self.interval_s * 1000
+
+        lines = [
+            f"duration: {self.duration_s * 1000:.1f} ms, samples: {self.samples}, interval: {ms:g} ms",
+            "",
+            f"{'self %':>7} {'self ms':>9} {'total %':>8} {'total ms':>9}  frame",
+        ]
+
+        for label, _ in own.most_common(n):
+            lines.append(
+                f"{100 * own[label] / sampled:>6.1f}% {own[label] * ms:>9.1f} "
+                f"{100 * total[label] / sampled:>7.1f}% {total[label] * ms:>9.1f}  {label}"
+            )
+
+        lines += ["", "Top frames by total time:", ""]
+
+        for label, count in total.most_common(n):
+            lines.append(f"{100 * count / sampled:>6.1f}% {count * ms:>9.1f}  {label}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: str, profile_id: str) -> dict:
+        os.makedirs(directory, exist_ok=True)
+
+        paths = {
+            "folded": os.path.join(directory, f"{profile_id}.folded"),
+            "summary": os.path.join(directory, f"{profile_id}.txt"),
+        }
+
+        with open(paths["folded"], "w", encoding="utf-8") as f:
+            f.write(self.folded())
+
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write(self.top())
+
+        return paths
+
+
+class ProfileGate:
+    """
+    Rate limit: one profile in flight, and `min_interval_s` between
+    the starts of two profiles.
+    """
+
+    def __init__(self, min_interval_s: float = None):
+        self.min_interval_s = PROFILE_MIN_INTERVAL_S if min_interval_s is None else min_interval_s
+        self._lock = threading.Lock()
+        self._active = False
+        self._last_start = None
+
+    def acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+
+            if self._active:
+                return False
+
+            if self._last_start is not None and now - self._last_start < self.min_interval_s:
+                return False
+
+            self._active = True
+            self._last_start = now
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active = False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._last_start is None:
+                return 0.0
+            return max(self.min_interval_s - (time.monotonic() - self._last_start), 0.0)
+
+
+PROFILE_GATE = ProfileGate()
+
+
+def start_profile(name: str, thread_ids=None):
+    """
+    A running profiler with its profile_id set, or None when the
+    rate limit says no.
+    """
+    if not PROFILE_GATE.acquire():
+        PROFILES.inc(result="rate_limited")
+        return None
+
+    profiler = SamplingProfiler(thread_ids)
+    profiler.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{name}"
+
+    return profiler.start()
+
+
+def finish_profile(profiler: SamplingProfiler) -> dict:
+    """
+    Stop the profiler, write its files and free the gate. Returns
+    the file paths, or None when they could not be written.
+    """
+    try:
+        profiler.stop()
+
+        try:
+            paths = profiler.write(PROFILE_DIR, profiler.profile_id)
+        except OSError:
+            logger.exception("Could not write profile", extra={"profile_id": profiler.profile_id})
+            return None
+
+        PROFILES.inc(result="written")
+
+        logger.info("Profile written", extra={
+            "profile_id": profiler.profile_id,
+            "samples": profiler.samples,
+            "duration_ms": round(profiler.duration_s * 1000, 1),
+            **paths,
+        })
+
+        return paths
+
+    finally:
+        PROFILE_GATE.release()
@@ -0,0 +1,67 @@
+import os
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# -------------------------------
+# GENERATION-MODEL TOKEN COUNTS
+# -------------------------------
+# Prompt budgets are in the generation model's tokens. Its tokenizer
+# is loaded once; when it cannot be (gated repo, offline) counts fall
+# back to ~4 characters per token.
+
+_tokenizer = None
+
+
+def _default_tokenizer_name():
+
+    model = os.getenv(
+        "HF_GENERATION_MODEL",
+        "meta-llama/Llama-3.2-1B-Instruct:novita"
+    )
+
+    # Router models carry a ":provider" suffix the hub does not know
+    return os.getenv("PROMPT_TOKENIZER", model.split(":")[0])
+
+
+def load_generation_tokenizer():
+    """
+    Tokenizer of the generation model, loaded once.
+    Returns None when it cannot be loaded (gated repo, offline).
+    """
+
+    global _tokenizer
+
+    if _tokenizer is None:
+
+        try:
+
+            from transformers import AutoTokenizer
+
+            _tokenizer = AutoTokenizer.from_pretrained(
+                _default_tokenizer_name(),
+                token=os.getenv("HF_TOKEN") or None,
+            )
+
+        except Exception as e:
+
+            logger.warning("Generation tokenizer unavailable, estimating tokens", extra={"error": str(e)})
+
+            _tokenizer = False
+
+    return _tokenizer or None
+
+
+def count_tokens(text: str) -> int:
+
+    if not text:
+        return 0
+
+    tokenizer = load_generation_tokenizer()
+
+    if tokenizer is None:
+        # ~4 characters per token for English text
+        return (len(text) + 3) // 4
+
+    return len(tokenizer.encode(text, add_special_tokens=False))
@@ -1,12 +1,28 @@
+import hmac
+import logging
 import os
 import tempfile
-import traceback
+import threading
+import time
 
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from werkzeug.exceptions import RequestEntityTooLarge
 
+from agent.admission import INGEST_LIMIT, INGEST_QUEUE_TIMEOUT_S, Overloaded
+from agent.deadline import Deadline, DeadlineExceeded
 from agent.supervisor import AgentSupervisor
 from ingestion.runtime_ingestion import ingest_pdf_to_runtime
+from llm.completion_cache import completion_cache_snapshot
+from llm.generation_policy import model_stats_snapshots
+from llm.rate_limiter import rate_limiter_snapshots
+from llm.retry_policy import circuit_breaker_snapshots
+from retrieval.inference import INFERENCE
+from utils.logger import get_logger, new_request_id, request_context
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, gauge, render as render_metrics
+from utils.profiler import PROFILE_GATE, PROFILES, finish_profile, start_profile
+
+
+logger = get_logger(__name__)
 
 
 app = Flask(__name__)
@@ -17,6 +33,214 @@ app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024
 agent = AgentSupervisor()
 
 
+# =========================================================
+# BACKGROUND WARM-UP
+# =========================================================
+# The server binds right away; models load in a background
+# thread and /healthz/ready flips once they are resident.
+
+readiness = {
+    "ready": False,
+    "error": None,
+    "warmup_seconds": {},
+}
+
+
+def _warm_up():
+
+    started = time.perf_counter()
+
+    try:
+
+        warm_up = getattr(agent, "warm_up", None)
+
+        if warm_up is not None:
+            readiness["warmup_seconds"] = warm_up()
+
+        readiness["ready"] = True
+
+        logger.info("Models warm", extra={
+            "duration_s": round(time.perf_counter() - started, 1),
+            "warmup_seconds": readiness["warmup_seconds"],
+        })
+
+    except Exception as e:
+
+        logger.exception("Warm-up failed (models will load on first request)")
+
+        readiness["error"] = str(e)
+
+
+warmup_thread = None
+
+if os.getenv("WARMUP_ON_START", "1") == "1":
+
+    warmup_thread = threading.Thread(target=_warm_up, name="model-warmup", daemon=True)
+    warmup_thread.start()
+
+else:
+
+    readiness["ready"] = True
+
+
+# =========================================================
+# REQUEST IDS
+# =========================================================
+# Every log line of a request carries its id. Clients may send
+# their own in X-Request-ID; it is always echoed back.
+
+# Scraped/probed constantly: logged at DEBUG only
+QUIET_PATHS = ("/metrics", "/healthz/ready", "/healthz/upstream")
+
+
+def incoming_request_id(value):
+    """
+    The client's id when it is short and plain, otherwise a new one.
+    """
+
+    if value and len(value) <= 64 and value.replace("-", "").replace("_", "").isalnum():
+        return value
+
+    return new_request_id()
+
+
+@app.before_request
+def start_request():
+
+    g.started = time.perf_counter()
+    g.request_id = incoming_request_id(request.headers.get("X-Request-ID"))
+
+    g.log_context = request_context(g.request_id)
+    g.log_context.__enter__()
+
+
+@app.after_request
+def finish_request(response):
+
+    request_id = g.get("request_id")
+
+    if request_id:
+        response.headers["X-Request-ID"] = request_id
+
+    logger.log(
+        logging.DEBUG if request.path in QUIET_PATHS else logging.INFO,
+        "Request served",
+        extra={
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - g.get("started", time.perf_counter())) * 1000, 1),
+        }
+    )
+
+    return response
+
+
+@app.teardown_request
+def end_request(_error):
+
+    log_context = g.pop("log_context", None)
+
+    if log_context is not None:
+        log_context.__exit__(None, None, None)
+
+
+# =========================================================
+# PROFILING (admin only)
+# =========================================================
+# "X-Profile: 1" (or ?profile=1) with a valid X-Admin-Token runs
+# one chat or upload under the sampling profiler. Files land in
+# PROFILE_DIR; the id comes back in X-Profile-Id. Rate limited
+# (PROFILE_MIN_INTERVAL_S); disabled while ADMIN_TOKEN is unset.
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+PROFILED_ENDPOINTS = ("chat", "upload")
+
+
+def is_admin(token):
+
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(
+        (token or "").encode("utf-8"),
+        ADMIN_TOKEN.encode("utf-8")
+    )
+
+
+def profile_request(requested, admin_token, name, thread_ids=None):
+    """
+    Shared by the Flask and ASGI routes. Returns (profiler, headers,
+    rejection); rejection is (body, status) for a bad admin token.
+    """
+
+    if not requested:
+        return None, {}, None
+
+    if not is_admin(admin_token):
+
+        PROFILES.inc(result="forbidden")
+
+        return None, {}, ({
+            "success": False,
+            "error": {
+                "code": "PROFILING_FORBIDDEN",
+                "message": "Profiling requires a valid X-Admin-Token."
+            }
+        }, 403)
+
+    profiler = start_profile(name, thread_ids=thread_ids)
+
+    # Rate limited: serve the request without a profile
+    if profiler is None:
+
+        return None, {
+            "X-Profile-Skipped": "rate_limited",
+            "X-Profile-Retry-After": str(int(PROFILE_GATE.retry_after()) + 1),
+        }, None
+
+    return profiler, {"X-Profile-Id": profiler.profile_id}, None
+
+
+@app.before_request
+def start_request_profile():
+
+    if request.endpoint not in PROFILED_ENDPOINTS:
+        return None
+
+    profiler, headers, rejection = profile_request(
+        request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1",
+        request.headers.get("X-Admin-Token"),
+        f"{g.request_id}_{request.endpoint}",
+        # Model calls run on the inference threads, not this one
+        thread_ids=[threading.get_ident(), *INFERENCE.thread_ids()],
+    )
+
+    g.profiler = profiler
+    g.profile_headers = headers
+
+    if rejection:
+
+        body, status = rejection
+
+        return jsonify(body), status
+
+
+@app.after_request
+def add_profile_headers(response):
+
+    response.headers.update(g.get("profile_headers") or {})
+
+    return response
+
+
+@app.teardown_request
+def finish_request_profile(_error):
+
+    profiler = g.pop("profiler", None)
+
+    if profiler is not None:
+        finish_profile(profiler)
+
+
 # =========================================================
 # ERROR HANDLERS
 # =========================================================
@@ -33,11 +257,59 @@ def handle_file_too_large(e):
     }), 413
 
 
+def deadline_exceeded_body(e):
+    """
+    Timeout response shared by the Flask and ASGI chat routes.
+    """
+
+    return {
+        "success": False,
+        "error": {
+            "code": "DEADLINE_EXCEEDED",
+            "message": "The request did not finish within its time budget.",
+            "stage": e.stage,
+            "budget_ms": e.budget_ms,
+            "timings_ms": e.timings_ms,
+        }
+    }
+
+
+@app.errorhandler(DeadlineExceeded)
+def handle_deadline_exceeded(e):
+
+    return jsonify(deadline_exceeded_body(e)), 504
+
+
+def overloaded_response(e):
+    """
+    503 body and headers shared by the Flask and ASGI routes.
+    """
+
+    body = {
+        "success": False,
+        "error": {
+            "code": "OVERLOADED",
+            "message": "The server is busy. Please retry shortly.",
+            "stage": e.stage,
+            "retry_after_s": e.retry_after,
+        }
+    }
+
+    return body, {"Retry-After": str(e.retry_after)}
+
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e):
+
+    body, headers = overloaded_response(e)
+
+    return jsonify(body), 503, headers
+
+
 @app.errorhandler(Exception)
 def handle_exception(e):
 
-    print("\n🔥 ERROR OCCURRED:")
-    traceback.print_exc()
+    logger.exception("Unhandled error")
 
     return jsonify({
         "success": False,
@@ -64,29 +336,96 @@ def home():
     })
 
 
+@app.route("/healthz/ready")
+def ready():
+
+    status = 200 if readiness["ready"] else 503
+
+    return jsonify({
+        "success": readiness["ready"],
+        "data": {
+            "ready": readiness["ready"],
+            "warmup_seconds": readiness["warmup_seconds"],
+            "error": readiness["error"],
+        }
+    }), status
+
+
+@app.route("/healthz/upstream")
+def upstream():
+
+    # Circuit breaker state per LLM upstream
+    return jsonify({
+        "success": True,
+        "data": {
+            "circuit_breakers": circuit_breaker_snapshots(),
+            "rate_limits": rate_limiter_snapshots(),
+            "models": model_stats_snapshots(),
+            "completion_cache": completion_cache_snapshot()
+        }
+    })
+
+
+# =========================================================
+# METRICS
+# =========================================================
+# Prometheus text format. Per worker: under gunicorn each
+# scrape reports the worker process that answered it.
+
+def _document_chunks():
+
+    retriever = getattr(agent, "retriever", None)
+
+    return len(retriever.meta) if retriever is not None else 0
+
+
+gauge("documents_loaded", "1 while a document is loaded for chat.", function=lambda: int(bool(agent.doc_loaded)))
+
+gauge("document_chunks", "Chunks in the active document index.", function=_document_chunks)
+
+
+@app.route("/metrics")
+def metrics():
+
+    return app.response_class(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 # =========================================================
 # CHAT
 # =========================================================
 
-@app.route("/api/v1/chat", methods=["POST"])
-@app.route("/chat", methods=["POST"])
-def chat():
+def invalid_body_response():
+    """
+    (body, status) for a JSON body that is not an object, e.g. a
+    list or a scalar. Shared by the Flask and ASGI chat routes.
+    """
 
-    data = request.get_json() or {}
-    query = data.get("query", "").strip()
+    return {
+        "success": False,
+        "error": {
+            "code": "INVALID_REQUEST",
+            "message": "Request body must be a JSON object."
+        }
+    }, 400
+
+
+def check_chat_request(data, is_legacy):
+    """
+    Validation shared by the Flask and ASGI chat routes.
+    Returns (query, None) or (None, (body, status)).
+    """
+
+    query = (data.get("query") or "").strip()
 
     if not query:
 
-        return jsonify({
+        return None, ({
             "success": False,
             "error": {
                 "code": "EMPTY_QUERY",
                 "message": "Query cannot be empty"
             }
-        }), 400
-
-
-    is_legacy = request.path == "/chat"
+        }, 400)
 
 
     # -----------------------------------------
@@ -98,7 +437,7 @@ def chat():
         # pytest expects this exact format
         if is_legacy:
 
-            return jsonify({
+            return None, ({
 
                 "success": False,
 
@@ -107,12 +446,12 @@ def chat():
                     "message": "Please upload a PDF first."
                 }
 
-            }), 409
+            }, 409)
 
 
         # HuggingFace frontend format
 
-        return jsonify({
+        return None, ({
 
             "success": True,
 
@@ -121,24 +460,48 @@ def chat():
                 "answer": "Please upload a PDF first."
             }
 
-        }), 200
+        }, 200)
+
+
+    return query, None
+
+
+@app.route("/api/v1/chat", methods=["POST"])
+@app.route("/chat", methods=["POST"])
+def chat():
+
+    data = request.get_json() or {}
+
+    if not isinstance(data, dict):
+
+        body, status = invalid_body_response()
+
+        return jsonify(body), status
+
+    # Budget starts now; clients may ask for a shorter or longer one
+    deadline = Deadline.from_request(data.get("deadline_ms"))
+
+    query, rejection = check_chat_request(data, is_legacy=request.path == "/chat")
+
+    if rejection:
+
+        body, status = rejection
+
+        return jsonify(body), status
 
 
     # -----------------------------------------
     # HANDLE QUERY
     # -----------------------------------------
 
-    response = agent.handle(query)
-
+    # debug: true returns the trace (spans, scores, timings)
+    with request_context(debug=bool(data.get("debug"))) as trace:
 
-    if is_legacy:
+        response = agent.handle(query, deadline=deadline)
 
-        return jsonify({
+    if trace is not None:
 
-            "success": True,
-            "data": response
-
-        }), 200
+        response = {**response, "debug": trace.to_dict()}
 
 
     return jsonify({
@@ -225,7 +588,11 @@ def upload():
 
 
 
-        runtime_payload = ingest_pdf_to_runtime(temp_path)
+        # Own slots, so uploads never hold the ones chats need; a
+        # full queue or a long wait answers 503 with Retry-After
+        with INGEST_LIMIT.slot(INGEST_QUEUE_TIMEOUT_S):
+
+            runtime_payload = ingest_pdf_to_runtime(temp_path)
 
 
         agent.set_active_document(
@@ -247,17 +614,23 @@ def upload():
 
                 "status": "success",
                 "filename": file.filename,
-                "message": "PDF uploaded and indexed."
+                "message": "PDF uploaded and indexed.",
+                "ingestion": runtime_payload.get("stats", {})
 
             }
 
         }), 200
 
 
+    except Overloaded as e:
+
+        body, headers = overloaded_response(e)
+
+        return jsonify(body), 503, headers
+
     except Exception as e:
 
-        print("\n🔥 UPLOAD FAILED:")
-        traceback.print_exc()
+        logger.exception("Upload failed", extra={"upload": file.filename})
 
         return jsonify({
 